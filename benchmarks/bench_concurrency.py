@@ -0,0 +1,137 @@
+"""Постоянное и подбираемое число одновременных загрузок при перегрузке.
+
+Локальный сервер изображает канал ограниченной ёмкости: одновременно
+обслуживается --capacity запросов (каждый --latency секунд), ещё до
+--backlog ждут очереди, а остальные соединения сбрасываются - как при
+перегруженном канале или NAT, когда лишние подключения теряются.
+С постоянным большим числом загрузок часть сайтов теряется на ошибках;
+регулятор (ConcurrencyController) снижает число загрузок по росту доли
+ошибок. Прогоны: постоянное --workers, подбираемое до --workers и
+постоянное, равное ёмкости сервера (лучший результат ручной настройки).
+
+    python benchmarks/bench_concurrency.py --sites 3000 --capacity 50 --engine async --workers 400
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'email_checker'))
+
+from mass_scanner import MassWebsiteEmailScanner
+from stub_server import StubServer, parse_request
+
+
+class LimitedServer(StubServer):
+    """HTTP-сервер с ограниченным числом одновременно обслуживаемых запросов"""
+
+    def __init__(self, capacity, backlog, latency):
+        self.capacity = capacity
+        self.backlog = backlog
+        self.latency = latency
+        super().__init__()
+        self.reset()
+
+    def reset(self):
+        self.waiting = 0
+        self.dropped = 0
+        self.peak = 0
+
+    async def handle(self, reader, writer):
+        try:
+            head = await reader.readuntil(b'\r\n\r\n')
+            if self.waiting >= self.capacity + self.backlog:
+                # Канал переполнен: соединение сбрасывается без ответа
+                self.dropped += 1
+                writer.transport.abort()
+                return
+            _, host = parse_request(head)
+            self.waiting += 1
+            self.peak = max(self.peak, self.waiting)
+            try:
+                async with self.slots:
+                    await asyncio.sleep(self.latency)
+            finally:
+                self.waiting -= 1
+            body = f'<html><body><a href="mailto:info.{host.split(".", 1)[0]}@example.com">Контакты</a></body></html>'.encode()
+            writer.write(
+                b'HTTP/1.1 200 OK\r\nContent-Type: text/html; charset=utf-8\r\n'
+                + f'Content-Length: {len(body)}\r\nConnection: close\r\n\r\n'.encode() + body
+            )
+            await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    def setup(self):
+        self.slots = asyncio.Semaphore(self.capacity)
+
+
+def run(server, args, workers, adaptive):
+    scanner = MassWebsiteEmailScanner(proxies=[], max_workers=workers)
+    scanner.adaptive_concurrency = adaptive
+    urls = []
+    for i in range(args.sites):
+        host = f'site{i}.test'
+        scanner.resolved_ips[host] = ['127.0.0.1']
+        urls.append(f'http://{host}:{server.port}/')
+
+    # Число загрузок, выбранное регулятором, по секундам
+    limits = []
+    adjust_concurrency = scanner.adjust_concurrency
+
+    def recording_adjust():
+        adjust_concurrency()
+        limits.append(scanner.concurrency.limit)
+
+    scanner.adjust_concurrency = recording_adjust
+    server.reset()
+    started = time.perf_counter()
+    scanner.scan_domains(urls, engine=args.engine)
+    elapsed = time.perf_counter() - started
+    settled = sorted(limits[len(limits) // 2:])
+    return {
+        'elapsed': elapsed,
+        'emails': len(scanner.found_emails),
+        'dropped': server.dropped,
+        'limit': settled[len(settled) // 2] if settled else workers,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sites', type=int, default=3000)
+    parser.add_argument('--capacity', type=int, default=50, help='одновременно обслуживаемых запросов')
+    parser.add_argument('--backlog', type=int, default=50, help='запросов, ждущих в очереди сервера')
+    parser.add_argument('--latency', type=float, default=0.1, help='время обслуживания запроса, сек')
+    parser.add_argument('--engine', choices=('threads', 'async'), default='async')
+    parser.add_argument('--workers', type=int, default=400)
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    # Кэши и результаты сканер пишет в текущую папку
+    os.chdir(tempfile.mkdtemp(prefix='bench_concurrency_'))
+
+    server = LimitedServer(args.capacity, args.backlog, args.latency)
+    server.start()
+
+    print(f"Сайтов: {args.sites}, ёмкость сервера: {args.capacity} (+{args.backlog} в очереди), "
+          f"обслуживание: {args.latency * 1000:.0f} мс, движок: {args.engine}")
+    print(f"{'прогон':<28}{'время, с':>10}{'сайтов/с':>10}{'email':>7}{'сброшено':>10}{'загрузок':>10}")
+    runs = (
+        (f'постоянно {args.workers}', args.workers, False),
+        (f'автоматически до {args.workers}', args.workers, True),
+        (f'постоянно {args.capacity}', args.capacity, False),
+    )
+    for name, workers, adaptive in runs:
+        r = run(server, args, workers, adaptive)
+        print(f"{name:<28}{r['elapsed']:>10.2f}{args.sites / r['elapsed']:>10.1f}{r['emails']:>7}"
+              f"{r['dropped']:>10}{r['limit']:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""Скорость проверки существования доменов через DNS.
+
+Поднимает локальный DNS-сервер (UDP) с искусственной задержкой ответа.
+Существует каждый live-every домен, остальные отвечают NXDOMAIN; часть
+запросов можно терять (--loss), чтобы проверить таймауты и повторы.
+Сравниваются прежняя схема - пул из 50 потоков с блокирующими запросами -
+и асинхронный резолвер в find_existing_domains, а затем повторная
+проверка тех же доменов с заполненным кэшем DNS на диске.
+
+    python benchmarks/bench_dns.py --domains 30000 --latency 0.05 --concurrency 1000
+"""
+import argparse
+import asyncio
+import concurrent.futures
+import logging
+import os
+import random
+import socket
+import struct
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'email_checker'))
+
+from dns_resolver import QTYPE_A, build_query, encode_name, parse_response, skip_name
+from mass_scanner import MassWebsiteEmailScanner
+from stub_server import StubServer
+
+
+class StubDNSProtocol(asyncio.DatagramProtocol):
+
+    def __init__(self, server):
+        self.server = server
+        self.transport = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        if random.random() < self.server.loss:
+            return
+        response = self.server.answer(data)
+        asyncio.get_running_loop().call_later(self.server.latency, self.transport.sendto, response, addr)
+
+
+class StubDNSServer(StubServer):
+    """DNS-сервер в отдельном потоке: A-запись для живых доменов, иначе NXDOMAIN"""
+
+    def __init__(self, latency, live_every, loss=0.0):
+        self.latency = latency
+        self.live_every = live_every
+        self.loss = loss
+        super().__init__()
+
+    def is_live(self, domain):
+        number = domain.split('.', 1)[0][len('site'):]
+        return number.isdigit() and int(number) % self.live_every == 0
+
+    def answer(self, data):
+        query_id, flags = struct.unpack_from('!HH', data)
+        question_end = skip_name(data, 12) + 4
+        question = data[12:question_end]
+        labels = []
+        offset = 0
+        while question[offset]:
+            labels.append(question[offset + 1:offset + 1 + question[offset]].decode('ascii'))
+            offset += 1 + question[offset]
+        domain = '.'.join(labels)
+        qtype = struct.unpack_from('!H', question, offset + 1)[0]
+
+        if not self.is_live(domain):
+            return struct.pack('!HHHHHH', query_id, 0x8183 | (flags & 0x0100), 1, 0, 0, 0) + question
+        if qtype != QTYPE_A:
+            return struct.pack('!HHHHHH', query_id, 0x8180 | (flags & 0x0100), 1, 0, 0, 0) + question
+        record = struct.pack('!HHHIH', 0xC00C, QTYPE_A, 1, 300, 4) + socket.inet_aton('127.0.0.1')
+        return struct.pack('!HHHHHH', query_id, 0x8180 | (flags & 0x0100), 1, 1, 0, 0) + question + record
+
+    async def listen(self):
+        transport, _ = await self.loop.create_datagram_endpoint(
+            lambda: StubDNSProtocol(self), local_addr=(self.host, self.listen_port)
+        )
+        return transport.get_extra_info('sockname')[1]
+
+
+def blocking_exists(domain, port, timeout):
+    """Блокирующий запрос A-записи, как gethostbyname в прежнем check_domain_exists"""
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        sock.settimeout(timeout)
+        query_id = random.getrandbits(16)
+        sock.sendto(build_query(query_id, encode_name(domain), QTYPE_A), ('127.0.0.1', port))
+        try:
+            rcode, ips, _ = parse_response(sock.recv(512), QTYPE_A)
+        except socket.timeout:
+            return False
+        return rcode == 0 and bool(ips)
+
+
+def run_threads(domains, port, timeout):
+    existing = []
+    with concurrent.futures.ThreadPoolExecutor(max_workers=50) as executor:
+        futures = {executor.submit(blocking_exists, domain, port, timeout): domain for domain in domains}
+        for future in concurrent.futures.as_completed(futures):
+            if future.result():
+                existing.append(futures[future])
+    return existing
+
+
+def create_scanner(port, timeout, concurrency):
+    scanner = MassWebsiteEmailScanner(proxies=[], max_workers=20)
+    scanner.dns_servers = [('127.0.0.1', port)]
+    scanner.dns_timeout = timeout
+    scanner.dns_concurrency = concurrency
+    return scanner
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--domains', type=int, default=10000)
+    parser.add_argument('--latency', type=float, default=0.05, help='задержка ответа сервера, сек')
+    parser.add_argument('--live-every', type=int, default=10, help='существует каждый N-й домен')
+    parser.add_argument('--loss', type=float, default=0.0, help='доля потерянных запросов')
+    parser.add_argument('--timeout', type=float, default=1.0, help='таймаут одной попытки, сек')
+    parser.add_argument('--concurrency', type=int, default=500, help='одновременных запросов асинхронного резолвера')
+    parser.add_argument('--skip-threads', action='store_true', help='не запускать медленный потоковый вариант')
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    os.chdir(tempfile.mkdtemp(prefix='bench_dns_'))
+
+    server = StubDNSServer(args.latency, args.live_every, args.loss)
+    server.start()
+    domains = [f'site{i}.test' for i in range(args.domains)]
+    expected = sum(1 for domain in domains if server.is_live(domain))
+
+    print(f"Доменов: {args.domains}, живых: {expected}, задержка: {args.latency * 1000:.0f} мс, потери: {args.loss:.0%}")
+    print(f"{'способ':<10}{'параллельно':>12}{'время, с':>10}{'доменов/с':>11}{'найдено':>9}")
+    # Второй прогон тем же сканером: все ответы уже в кэше DNS (scan_state/dns_cache.sqlite)
+    scanner = create_scanner(server.port, args.timeout, args.concurrency)
+    runs = [
+        ('async', args.concurrency, lambda: scanner.find_existing_domains(domains, max_domains=len(domains))),
+        ('cached', args.concurrency, lambda: scanner.find_existing_domains(domains, max_domains=len(domains))),
+    ]
+    if not args.skip_threads:
+        runs.insert(0, ('threads', 50, lambda: run_threads(domains, server.port, args.timeout)))
+    for name, parallel, run in runs:
+        started = time.perf_counter()
+        existing = run()
+        elapsed = time.perf_counter() - started
+        print(f"{name:<10}{parallel:>12}{elapsed:>10.2f}{len(domains) / elapsed:>11.0f}{len(existing):>9}")
+    print(f"Попаданий в кэш DNS: {scanner.stats['dns_cache_hit_rate']:.0%}")
+
+
+if __name__ == "__main__":
+    main()
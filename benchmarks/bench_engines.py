@@ -0,0 +1,97 @@
+"""Сравнение потокового и асинхронного движков сканирования.
+
+Поднимает локальный HTTP-сервер с искусственной задержкой ответа (имитация
+сетевого RTT) и прогоняет через оба движка одинаковый набор URL.
+
+Движки сравниваются при постоянном числе загрузок (--workers и
+--concurrency). С --adaptive число загрузок подбирает ConcurrencyController:
+он начинает с 8 и удваивает их раз в полсекунды, так что в коротком
+прогоне время уходит в основном на разгон (до 200 загрузок - около 2.5 с).
+
+    python benchmarks/bench_engines.py --sites 2000 --latency 0.2 --workers 100 --concurrency 2000
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'email_checker'))
+
+from mass_scanner import MassWebsiteEmailScanner
+from stub_server import StubServer
+
+
+class StubHTTPServer(StubServer):
+    """Асинхронный HTTP-сервер в отдельном потоке: держит тысячи соединений"""
+
+    def __init__(self, latency, page_size):
+        self.latency = latency
+        self.page_size = page_size
+        super().__init__()
+
+    def page(self, path):
+        filler = '<p>Lorem ipsum dolor sit amet</p>\n' * (self.page_size // 34)
+        # Каждая десятая страница содержит уникальный email
+        email = f'<a href="mailto:info{path.strip("/").replace("/", "")}@example.com">Контакты</a>' if path.endswith('0') else ''
+        return f'<html><body>{filler}{email}</body></html>'.encode('utf-8')
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                head = await reader.readuntil(b'\r\n\r\n')
+                path = head.split(b' ', 2)[1].decode()
+                await asyncio.sleep(self.latency)
+                body = self.page(path)
+                writer.write(
+                    b'HTTP/1.1 200 OK\r\nContent-Type: text/html; charset=utf-8\r\n'
+                    + f'Content-Length: {len(body)}\r\n\r\n'.encode() + body
+                )
+                await writer.drain()
+                if b'connection: close' in head.lower():
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+
+def run_engine(engine, urls, workers, adaptive):
+    scanner = MassWebsiteEmailScanner(proxies=[], max_workers=workers)
+    scanner.adaptive_concurrency = adaptive
+    started = time.perf_counter()
+    scanner.scan_domains(urls, engine=engine)
+    elapsed = time.perf_counter() - started
+    stats = scanner.stats
+    return elapsed, stats['sites_processed'], len(scanner.found_emails), f"{stats['pool_hits']}/{stats['pool_misses']}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sites', type=int, default=1000)
+    parser.add_argument('--latency', type=float, default=0.2, help='задержка ответа сервера, сек')
+    parser.add_argument('--page-size', type=int, default=20000, help='размер страницы, байт')
+    parser.add_argument('--workers', type=int, default=100, help='потоков для движка threads')
+    parser.add_argument('--concurrency', type=int, default=1000, help='одновременных загрузок для движка async')
+    parser.add_argument('--adaptive', action='store_true', help='подбирать число загрузок (ConcurrencyController)')
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    # Сканер пишет found_emails.txt и scan_progress.json в текущую папку
+    os.chdir(tempfile.mkdtemp(prefix='bench_engines_'))
+
+    server = StubHTTPServer(args.latency, args.page_size)
+    server.start()
+    urls = [f'http://127.0.0.1:{server.port}/site/{i}' for i in range(args.sites)]
+
+    print(f"Сайтов: {args.sites}, задержка сервера: {args.latency * 1000:.0f} мс, страница: {args.page_size} байт")
+    print(f"{'движок':<10}{'параллельно':>12}{'время, с':>10}{'сайтов/с':>10}{'обработано':>12}{'email':>8}{'пул +/-':>14}")
+    for engine, workers in (('threads', args.workers), ('async', args.concurrency)):
+        elapsed, processed, emails, pool = run_engine(engine, urls, workers, args.adaptive)
+        print(f"{engine:<10}{workers:>12}{elapsed:>10.2f}{processed / elapsed:>10.1f}{processed:>12}{emails:>8}{pool:>14}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+"""Скорость и точность извлечения email на корпусе страниц.
+
+Корпус лежит в benchmarks/corpus, эталонные адреса - в corpus/expected.json.
+Для каждого способа извлечения выводятся страниц/с, МБ/с и число ложных
+срабатываний и пропусков относительно эталона. Отдельно сравнивается
+определение кодировки: статистическое (apparent_encoding в requests) и
+CharsetResolver по BOM и <meta>. С --processes измеряется поиск в пуле
+процессов ExtractionPool (страницы передаются порциями) - масштабирование
+по ядрам; 0 - поиск в текущем процессе.
+
+    python benchmarks/bench_extract.py --seconds 2 --processes 0 1 2 4
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'email_checker'))
+
+from extractor import StreamingEmailExtractor, extract_emails
+from charset import CharsetResolver
+from extraction_pool import ExtractionPool
+
+try:
+    import charset_normalizer
+except ImportError:
+    charset_normalizer = None
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'corpus')
+CHUNK_SIZE = 16384
+
+
+def legacy_extract(body):
+    """Прежний способ: декодирование страницы и два прохода re.findall по строковым шаблонам"""
+    text = body.decode('utf-8', errors='replace')
+    emails = list(set(re.findall(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b', text)))
+    emails.extend(re.findall(r'mailto:([A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,})', text))
+    return set(emails)
+
+
+def single_pass_text_extract(body):
+    """Один проход по декодированному тексту страницы"""
+    return extract_emails(body.decode('utf-8', errors='replace'))
+
+
+def single_pass_bytes_extract(body):
+    """Один проход по байтам: декодируются только найденные адреса"""
+    return extract_emails(body)
+
+
+def streaming_extract(body):
+    extractor = StreamingEmailExtractor()
+    for offset in range(0, len(body), CHUNK_SIZE):
+        extractor.feed(body[offset:offset + CHUNK_SIZE])
+    return set(extractor.finish())
+
+
+EXTRACTORS = [
+    ('legacy', legacy_extract),
+    ('single-pass', single_pass_text_extract),
+    ('bytes', single_pass_bytes_extract),
+    ('streaming', streaming_extract),
+]
+
+
+def apparent_decode(body):
+    """Как response.text в requests для ответа без charset: статистическое определение"""
+    encoding = charset_normalizer.from_bytes(body).best().encoding
+    return encoding, body.decode(encoding, errors='replace')
+
+
+def sniff_decode(body):
+    """BOM, <meta> и проверка UTF-8 без статистики; кэш хостов не используется"""
+    encoding = CharsetResolver().resolve(body)
+    return encoding, body.decode(encoding, errors='replace')
+
+
+DECODERS = [
+    ('apparent', apparent_decode),
+    ('sniff', sniff_decode),
+]
+
+
+def load_corpus():
+    with open(os.path.join(CORPUS_DIR, 'expected.json'), encoding='utf-8') as f:
+        expected = json.load(f)
+    pages = []
+    for name in sorted(expected):
+        with open(os.path.join(CORPUS_DIR, name), 'rb') as f:
+            pages.append((name, f.read(), set(expected[name])))
+    return pages
+
+
+def measure(extract, pages, seconds):
+    """Прогон корпуса по кругу не меньше seconds секунд"""
+    processed_pages = 0
+    processed_bytes = 0
+    started = time.perf_counter()
+    while time.perf_counter() - started < seconds:
+        for _, body, _ in pages:
+            extract(body)
+            processed_pages += 1
+            processed_bytes += len(body)
+    elapsed = time.perf_counter() - started
+    return processed_pages / elapsed, processed_bytes / elapsed / 1048576
+
+
+def measure_pool(processes, pages, seconds):
+    """Поиск по корпусу в пуле процессов: страницы отправляются, пока не пройдёт seconds"""
+    pool = ExtractionPool(processes)
+    try:
+        # Запуск процессов не входит в замер
+        for future in [pool.submit(body) for _, body, _ in pages * processes]:
+            future.result()
+        futures = []
+        processed_pages = 0
+        processed_bytes = 0
+        started = time.perf_counter()
+        while time.perf_counter() - started < seconds:
+            for _, body, _ in pages:
+                futures.append(pool.submit(body))
+                processed_pages += 1
+                processed_bytes += len(body)
+            # Не больше нескольких порций на процесс в очереди
+            if len(futures) >= processes * pool.batch_size * 4:
+                futures.pop(0).result()
+        for future in futures:
+            future.result()
+        elapsed = time.perf_counter() - started
+    finally:
+        pool.close()
+    return processed_pages / elapsed, processed_bytes / elapsed / 1048576
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--seconds', type=float, default=2.0, help='время прогона каждого способа')
+    parser.add_argument('--verbose', action='store_true', help='показать ложные срабатывания по страницам')
+    parser.add_argument('--processes', type=int, nargs='*', default=[], help='размеры пула процессов для поиска')
+    args = parser.parse_args()
+
+    pages = load_corpus()
+    total_size = sum(len(body) for _, body, _ in pages)
+    print(f"Корпус: {len(pages)} страниц, {total_size / 1024:.0f} КБ")
+    print(f"{'способ':<14}{'страниц/с':>12}{'МБ/с':>10}{'ложных':>10}{'пропусков':>12}")
+
+    for name, extract in EXTRACTORS:
+        false_positives = 0
+        misses = 0
+        for page_name, body, expected in pages:
+            found = extract(body)
+            extra = found - expected
+            missing = expected - found
+            false_positives += len(extra)
+            misses += len(missing)
+            if args.verbose and (extra or missing):
+                print(f"  {name} / {page_name}: лишние {sorted(extra)[:5]}, пропущены {sorted(missing)[:5]}")
+
+        pages_per_second, mb_per_second = measure(extract, pages, args.seconds)
+        print(f"{name:<14}{pages_per_second:>12.1f}{mb_per_second:>10.1f}{false_positives:>10}{misses:>12}")
+
+    print()
+    print(f"{'кодировка':<14}{'страниц/с':>12}{'МБ/с':>10}{'замен U+FFFD':>14}")
+    for name, decode in DECODERS:
+        if decode is apparent_decode and charset_normalizer is None:
+            print(f"{name:<14}{'нет charset_normalizer':>36}")
+            continue
+        replacements = 0
+        for page_name, body, _ in pages:
+            encoding, text = decode(body)
+            replacements += text.count('\ufffd')
+            if args.verbose:
+                print(f"  {name} / {page_name}: {encoding}")
+
+        pages_per_second, mb_per_second = measure(decode, pages, args.seconds)
+        print(f"{name:<14}{pages_per_second:>12.1f}{mb_per_second:>10.1f}{replacements:>14}")
+
+    if args.processes:
+        print()
+        print(f"Ядер: {os.cpu_count()}")
+        print(f"{'процессов':<14}{'страниц/с':>12}{'МБ/с':>10}")
+        for processes in args.processes:
+            if processes:
+                pages_per_second, mb_per_second = measure_pool(processes, pages, args.seconds)
+            else:
+                pages_per_second, mb_per_second = measure(streaming_extract, pages, args.seconds)
+            print(f"{processes:<14}{pages_per_second:>12.1f}{mb_per_second:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
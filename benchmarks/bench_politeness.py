@@ -0,0 +1,194 @@
+"""Скорость сканирования в вежливом режиме.
+
+Локальный HTTP-сервер изображает виртуальный хостинг: сайты site<N>.test
+разложены по нескольким адресам 127.0.0.x подряд (все сайты одного IP
+идут в очереди один за другим - худший случай для раздачи по порядку).
+Часть сайтов просит Crawl-delay, часть запрещает всё в robots.txt.
+Сервер считает наибольшее число одновременных запросов к одному IP и
+к одному хосту, чтобы проверить соблюдение ограничений.
+
+Первые --parked-ips адресов изображают парковку: все их сайты отдают
+одну и ту же страницу без email. Планировщик сравнивает первые страницы
+каждой группы адресов и отодвигает остальные сайты однородной группы в
+конец, поэтому email с живых сайтов находятся раньше ("email за, с" -
+когда найден последний email). Все адреса 127.0.0.x лежат в одной сети
+/24, поэтому группа здесь - один IP (--group-prefix 32).
+
+Прогоны: без ограничений, вежливый режим с пустым кэшем robots.txt,
+вежливый с заполненным кэшем без сравнения групп и с ним.
+
+    python benchmarks/bench_politeness.py --sites 1000 --ips 20 --parked-ips 10 --per-ip 4 --engine async --workers 500
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'email_checker'))
+
+from mass_scanner import MassWebsiteEmailScanner
+from stub_server import StubServer, parse_request
+
+
+class HostingServer(StubServer):
+    """Асинхронный HTTP-сервер на всех адресах 127.0.0.x со счётчиками параллельности"""
+
+    host = '0.0.0.0'
+
+    def __init__(self, latency, delay_every, deny_every, crawl_delay, parked_hosts):
+        self.latency = latency
+        self.parked_hosts = parked_hosts
+        self.delay_every = delay_every
+        self.deny_every = deny_every
+        self.crawl_delay = crawl_delay
+        super().__init__()
+        self.reset()
+
+    def reset(self):
+        self.active = {}
+        self.peak = {}
+        self.requests = 0
+        self.robots_requests = 0
+
+    def enter(self, key):
+        self.active[key] = self.active.get(key, 0) + 1
+        self.peak[key[0]] = max(self.peak.get(key[0], 0), self.active[key])
+
+    def leave(self, key):
+        self.active[key] -= 1
+
+    def robots(self, host):
+        number = int(host[4:].split('.', 1)[0])
+        if self.deny_every and number % self.deny_every == 0:
+            return 'User-agent: *\nDisallow: /\n'
+        if self.delay_every and number % self.delay_every == 0:
+            return f'User-agent: *\nCrawl-delay: {self.crawl_delay}\nDisallow: /private/\n'
+        return 'User-agent: *\nDisallow: /private/\n'
+
+    def page(self, host):
+        filler = '<p>Lorem ipsum dolor sit amet</p>\n' * 300
+        if host in self.parked_hosts:
+            return f'<html><head><title>{host}</title></head><body><h1>Домен {host} продаётся</h1>{filler}</body></html>'
+        return f'<html><body>{filler}<a href="mailto:info.{host.split(".", 1)[0]}@example.com">Контакты</a></body></html>'
+
+    async def handle(self, reader, writer):
+        ip = writer.get_extra_info('sockname')[0]
+        try:
+            path, host = parse_request(await reader.readuntil(b'\r\n\r\n'))
+            keys = [('ip', ip), ('host', host)]
+            for key in keys:
+                self.enter(key)
+            self.requests += 1
+            try:
+                await asyncio.sleep(self.latency)
+                if path == '/robots.txt':
+                    self.robots_requests += 1
+                    body, content_type = self.robots(host), 'text/plain'
+                else:
+                    body, content_type = self.page(host), 'text/html'
+            finally:
+                for key in keys:
+                    self.leave(key)
+            body = body.encode('utf-8')
+            writer.write(
+                f'HTTP/1.1 200 OK\r\nContent-Type: {content_type}; charset=utf-8\r\n'
+                f'Content-Length: {len(body)}\r\nConnection: close\r\n\r\n'.encode() + body
+            )
+            await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+
+def site_ip(i, sites, ips):
+    # Сайты одного адреса идут подряд
+    return 1 + i * ips // sites
+
+
+def run(server, args, politeness, sampling=True):
+    scanner = MassWebsiteEmailScanner(proxies=[], max_workers=args.workers)
+    if politeness:
+        scanner.enable_politeness(per_host=1, per_ip=politeness, per_group=politeness, group_prefix=args.group_prefix)
+        if not sampling:
+            scanner.politeness.sample_size = 0
+    urls = []
+    for i in range(args.sites):
+        host = f'site{i}.test'
+        scanner.resolved_ips[host] = [f'127.0.0.{site_ip(i, args.sites, args.ips)}']
+        urls.append(f'http://{host}:{server.port}/')
+
+    # Момент, когда найден последний email
+    last_email = 0.0
+    record_page_emails = scanner.record_page_emails
+
+    def timed_record(original_url, final_url, emails, result=None):
+        nonlocal last_email
+        if emails:
+            last_email = time.perf_counter() - started
+        return record_page_emails(original_url, final_url, emails, result)
+
+    scanner.record_page_emails = timed_record
+    server.reset()
+    started = time.perf_counter()
+    scanner.scan_domains(urls, engine=args.engine)
+    elapsed = time.perf_counter() - started
+    stats = scanner.stats.snapshot()
+    return {
+        'elapsed': elapsed,
+        'last_email': last_email,
+        'groups': stats['groups_deprioritized'],
+        'processed': stats['sites_processed'],
+        'emails': len(scanner.found_emails),
+        'blocked': stats['robots_blocked'],
+        'deferred': stats['politeness_deferred'],
+        'robots': server.robots_requests,
+        'peak_ip': server.peak.get('ip', 0),
+        'peak_host': server.peak.get('host', 0),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sites', type=int, default=1000)
+    parser.add_argument('--ips', type=int, default=20, help='адресов хостинга')
+    parser.add_argument('--parked-ips', type=int, default=10, help='из них адресов парковки (одинаковые страницы)')
+    parser.add_argument('--group-prefix', type=int, default=32, help='длина префикса сети группы адресов')
+    parser.add_argument('--per-ip', type=int, default=4, help='одновременных загрузок на IP в вежливом режиме')
+    parser.add_argument('--latency', type=float, default=0.1, help='задержка ответа сервера, сек')
+    parser.add_argument('--delay-every', type=int, default=10, help='каждый N-й сайт просит Crawl-delay')
+    parser.add_argument('--deny-every', type=int, default=25, help='каждый N-й сайт запрещает всё в robots.txt')
+    parser.add_argument('--crawl-delay', type=float, default=1.0)
+    parser.add_argument('--engine', choices=('threads', 'async'), default='async')
+    parser.add_argument('--workers', type=int, default=500)
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    # Кэш robots.txt, результаты и прогресс сканер пишет в текущую папку
+    os.chdir(tempfile.mkdtemp(prefix='bench_politeness_'))
+
+    parked_hosts = {f'site{i}.test' for i in range(args.sites) if site_ip(i, args.sites, args.ips) <= args.parked_ips}
+    server = HostingServer(args.latency, args.delay_every, args.deny_every, args.crawl_delay, parked_hosts)
+    server.start()
+
+    print(f"Сайтов: {args.sites} на {args.ips} IP (парковка: {args.parked_ips} IP, {len(parked_hosts)} сайтов), "
+          f"задержка сервера: {args.latency * 1000:.0f} мс, движок: {args.engine} ({args.workers})")
+    print(f"{'прогон':<30}{'время, с':>10}{'сайтов/с':>10}{'email':>7}{'email за, с':>13}{'robots':>8}{'запрещено':>11}"
+          f"{'отложено':>10}{'групп':>7}{'макс/IP':>9}{'макс/хост':>11}")
+    runs = (
+        ('без ограничений', 0, False),
+        ('вежливый, кэш пуст', args.per_ip, True),
+        ('вежливый, кэш, без групп', args.per_ip, False),
+        ('вежливый, кэш, группы', args.per_ip, True),
+    )
+    for name, politeness, sampling in runs:
+        r = run(server, args, politeness, sampling)
+        print(f"{name:<30}{r['elapsed']:>10.2f}{r['processed'] / r['elapsed']:>10.1f}{r['emails']:>7}{r['last_email']:>13.2f}"
+              f"{r['robots']:>8}{r['blocked']:>11}{r['deferred']:>10}{r['groups']:>7}{r['peak_ip']:>9}{r['peak_host']:>11}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""Выбор схемы для домена без схемы: по очереди, наперегонки, из кэша.
+
+Половина сайтов лежит на адресе 127.0.0.2, где порт 443 "мёртвый":
+сокет слушает, но очередь подключений заполнена, и SYN теряются - как
+за фаерволом, который молча отбрасывает пакеты. У второй половины
+(127.0.0.3) порт 443 закрыт (отказ сразу). HTTP-сервер на порту 80
+отвечает всем; чётные сайты сначала редиректят / -> /home.
+
+Прогоны: по очереди (https, затем http, как раньше), гонка схем с
+форой --stagger и повторный прогон с кэшем итоговых адресов - сразу
+по http://.../home, без гонки и без редиректов. "запросов" - сколько
+HTTP-запросов получил сервер.
+
+Нужны права на порты 80 и 443 (root).
+
+    python benchmarks/bench_schemes.py --sites 200 --engine threads --workers 50
+"""
+import argparse
+import asyncio
+import logging
+import os
+import socket
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'email_checker'))
+
+from mass_scanner import MassWebsiteEmailScanner
+from stub_server import StubServer, parse_request
+
+DEAD_TLS_IP = '127.0.0.2'
+CLOSED_TLS_IP = '127.0.0.3'
+
+
+def blackhole(ip, port):
+    """Порт, на котором подключения зависают: слушающий сокет с заполненной очередью"""
+    listener = socket.socket()
+    listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    listener.bind((ip, port))
+    listener.listen(0)
+    fillers = []
+    for _ in range(3):
+        client = socket.socket()
+        client.setblocking(False)
+        client.connect_ex((ip, port))
+        fillers.append(client)
+    time.sleep(0.2)
+    return [listener] + fillers
+
+
+class RedirectingServer(StubServer):
+    """HTTP-сервер на порту 80 всех адресов 127.0.0.x"""
+
+    host = '0.0.0.0'
+    listen_port = 80
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.requests = 0
+        super().__init__()
+
+    async def handle(self, reader, writer):
+        try:
+            path, host = parse_request(await reader.readuntil(b'\r\n\r\n'))
+            self.requests += 1
+            await asyncio.sleep(self.latency)
+            number = int(host[4:].split('.', 1)[0])
+            if path == '/' and number % 2 == 0:
+                response = b'HTTP/1.1 301 Moved Permanently\r\nLocation: /home\r\nContent-Length: 0\r\nConnection: close\r\n\r\n'
+            else:
+                body = f'<html><body><a href="mailto:info{number}@example.com">Контакты</a></body></html>'.encode()
+                response = (
+                    b'HTTP/1.1 200 OK\r\nContent-Type: text/html; charset=utf-8\r\n'
+                    + f'Content-Length: {len(body)}\r\nConnection: close\r\n\r\n'.encode() + body
+                )
+            writer.write(response)
+            await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+
+def run(server, args, stagger, use_cache):
+    scanner = MassWebsiteEmailScanner(proxies=[], max_workers=args.workers)
+    scanner.scheme_stagger = stagger
+    if not use_cache:
+        scanner.scheme_cache = None
+    domains = []
+    for i in range(args.sites):
+        domain = f'site{i}.test'
+        scanner.resolved_ips[domain] = [DEAD_TLS_IP if i % 2 else CLOSED_TLS_IP]
+        domains.append(domain)
+
+    server.requests = 0
+    started = time.perf_counter()
+    scanner.scan_domains(domains, engine=args.engine)
+    elapsed = time.perf_counter() - started
+    stats = scanner.stats.snapshot()
+    return elapsed, stats['sites_processed'], len(scanner.found_emails), server.requests, stats['scheme_cache_hits']
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sites', type=int, default=200)
+    parser.add_argument('--latency', type=float, default=0.05, help='задержка ответа сервера, сек')
+    parser.add_argument('--stagger', type=float, default=0.3, help='фора https в гонке схем, сек')
+    parser.add_argument('--engine', choices=('threads', 'async'), default='threads')
+    parser.add_argument('--workers', type=int, default=50)
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    # Кэш адресов и результаты сканер пишет в текущую папку
+    os.chdir(tempfile.mkdtemp(prefix='bench_schemes_'))
+
+    sockets = blackhole(DEAD_TLS_IP, 443)
+    server = RedirectingServer(args.latency)
+    server.start()
+
+    print(f"Сайтов: {args.sites} (половина - с зависающим портом 443), движок: {args.engine} ({args.workers})")
+    print(f"{'прогон':<18}{'время, с':>10}{'сайтов/с':>10}{'обработано':>12}{'email':>7}{'запросов':>10}{'из кэша':>9}")
+    runs = (
+        ('по очереди', None, False),
+        ('гонка схем', args.stagger, True),
+        ('кэш адресов', args.stagger, True),
+    )
+    for name, stagger, use_cache in runs:
+        elapsed, processed, emails, requests, hits = run(server, args, stagger, use_cache)
+        print(f"{name:<18}{elapsed:>10.2f}{processed / elapsed:>10.1f}{processed:>12}{emails:>7}{requests:>10}{hits:>9}")
+    for sock in sockets:
+        sock.close()
+
+
+if __name__ == "__main__":
+    main()
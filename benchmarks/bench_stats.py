@@ -0,0 +1,100 @@
+"""Обновление статистики сканера из многих потоков.
+
+Каждый поток много раз учитывает сайт так же, как record_page_emails:
+словарь под общей блокировкой, как stats_lock до ScanStats, и ScanStats
+(та же блокировка, плюс вызов метода). Параллельно читатель снимает
+снимки, как окно GUI, и проверяет, что сайтов с email не больше, чем
+обработанных (иначе снимок "рваный").
+
+    python benchmarks/bench_stats.py --updates 100000 --threads 1 8 32 100
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'email_checker'))
+
+from stats import ScanStats
+
+
+class LockedStats:
+    """Словарь и одна блокировка на все потоки без обёртки"""
+
+    def __init__(self):
+        self.stats = {'sites_processed': 0, 'sites_with_emails': 0, 'total_emails_found': 0}
+        self.lock = threading.Lock()
+
+    def record(self):
+        with self.lock:
+            self.stats['sites_processed'] += 1
+            self.stats['sites_with_emails'] += 1
+            self.stats['total_emails_found'] += 2
+
+    def snapshot(self):
+        with self.lock:
+            return dict(self.stats)
+
+
+class Scan:
+
+    def __init__(self):
+        self.stats = ScanStats({'sites_processed': 0, 'sites_with_emails': 0, 'total_emails_found': 0})
+
+    def record(self):
+        self.stats.update({'sites_processed': 1, 'sites_with_emails': 1, 'total_emails_found': 2})
+
+    def snapshot(self):
+        return self.stats.snapshot()
+
+
+def run(stats, threads, updates):
+    per_thread = updates // threads
+    finished = threading.Event()
+    torn = 0
+    snapshots = 0
+
+    def writer():
+        for _ in range(per_thread):
+            stats.record()
+
+    def reader():
+        nonlocal torn, snapshots
+        while not finished.is_set():
+            values = stats.snapshot()
+            snapshots += 1
+            if values['sites_with_emails'] > values['sites_processed']:
+                torn += 1
+            time.sleep(0.001)
+
+    watcher = threading.Thread(target=reader)
+    watcher.start()
+    workers = [threading.Thread(target=writer) for _ in range(threads)]
+    started = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - started
+    finished.set()
+    watcher.join()
+    assert stats.snapshot()['sites_processed'] == per_thread * threads
+    return elapsed, snapshots, torn
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--updates', type=int, default=100000, help='всего учтённых сайтов')
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 8, 32, 100])
+    args = parser.parse_args()
+
+    print(f"{'способ':<10}{'потоков':>9}{'время, с':>10}{'сайтов/с':>11}{'снимков':>9}{'рваных':>8}")
+    for threads in args.threads:
+        for name, factory in (('lock', LockedStats), ('ScanStats', Scan)):
+            elapsed, snapshots, torn = run(factory(), threads, args.updates)
+            print(f"{name:<10}{threads:>9}{elapsed:>10.2f}{args.updates / elapsed:>11.0f}{snapshots:>9}{torn:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""Постоянные и адаптивные таймауты при медленном хвосте сайтов.
+
+Локальный HTTP-сервер отвечает большинству сайтов за --latency секунд,
+а каждый --slow-every-й сайт "зависает" на --slow-delay секунд перед
+заголовками (чуть меньше прежнего таймаута 8 с, поэтому такой сайт
+держит воркер почти весь таймаут). С постоянными таймаутами воркеры
+ждут медленные сайты; адаптивные по процентилю задержек обрывают их
+через несколько секунд, и обычные сайты проходят быстрее. "email" -
+найдено всего, "быстрых" - из них с обычных сайтов.
+
+    python benchmarks/bench_timeouts.py --sites 1000 --slow-every 20 --engine async --workers 100
+"""
+import argparse
+import asyncio
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'email_checker'))
+
+from mass_scanner import MassWebsiteEmailScanner
+from stub_server import StubServer, parse_request
+
+
+class TailServer(StubServer):
+    """HTTP-сервер, у которого часть сайтов отвечает с большой задержкой"""
+
+    def __init__(self, latency, slow_every, slow_delay):
+        self.latency = latency
+        self.slow_every = slow_every
+        self.slow_delay = slow_delay
+        super().__init__()
+
+    def is_slow(self, number):
+        return self.slow_every and number % self.slow_every == 0
+
+    async def handle(self, reader, writer):
+        try:
+            _, host = parse_request(await reader.readuntil(b'\r\n\r\n'))
+            number = int(host[4:].split('.', 1)[0])
+            if self.is_slow(number):
+                await asyncio.sleep(self.slow_delay)
+            else:
+                # Небольшой разброс, чтобы у процентилей было что измерять
+                await asyncio.sleep(self.latency * random.uniform(0.5, 1.5))
+            body = f'<html><body><a href="mailto:info{number}@example.com">Контакты</a></body></html>'.encode()
+            writer.write(
+                b'HTTP/1.1 200 OK\r\nContent-Type: text/html; charset=utf-8\r\n'
+                + f'Content-Length: {len(body)}\r\nConnection: close\r\n\r\n'.encode() + body
+            )
+            await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+
+def run(server, args, fixed):
+    scanner = MassWebsiteEmailScanner(proxies=[], max_workers=args.workers)
+    if fixed:
+        # Прежнее поведение: таймауты не зависят от задержек сайтов
+        scanner.set_timeouts(**scanner.timeouts.limits)
+    urls = []
+    for i in range(args.sites):
+        host = f'site{i}.test'
+        scanner.resolved_ips[host] = ['127.0.0.1']
+        urls.append(f'http://{host}:{server.port}/')
+
+    started = time.perf_counter()
+    scanner.scan_domains(urls, engine=args.engine)
+    elapsed = time.perf_counter() - started
+    fast = sum(1 for email in scanner.found_emails if not server.is_slow(int(email[4:].split('@', 1)[0])))
+    return elapsed, len(scanner.found_emails), fast, scanner.timeouts.snapshot(), scanner.timeouts.expired_counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sites', type=int, default=1000)
+    parser.add_argument('--latency', type=float, default=0.1, help='задержка ответа обычного сайта, сек')
+    parser.add_argument('--slow-every', type=int, default=20, help='каждый N-й сайт медленный')
+    parser.add_argument('--slow-delay', type=float, default=7.0, help='задержка ответа медленного сайта, сек')
+    parser.add_argument('--engine', choices=('threads', 'async'), default='async')
+    parser.add_argument('--workers', type=int, default=100)
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    # Кэши и результаты сканер пишет в текущую папку
+    os.chdir(tempfile.mkdtemp(prefix='bench_timeouts_'))
+
+    server = TailServer(args.latency, args.slow_every, args.slow_delay)
+    server.start()
+
+    print(f"Сайтов: {args.sites}, медленных: каждый {args.slow_every}-й ({args.slow_delay} с), "
+          f"движок: {args.engine} ({args.workers})")
+    print(f"{'таймауты':<14}{'время, с':>10}{'сайтов/с':>10}{'email':>7}{'быстрых':>9}"
+          f"  {'итог (подкл./TLS/ответ/всего)':<32}{'истекло'}")
+    for name, fixed in (('постоянные', True), ('адаптивные', False)):
+        elapsed, emails, fast, timeouts, expired = run(server, args, fixed)
+        final = '/'.join(f"{value:g}" for value in timeouts.values())
+        print(f"{name:<14}{elapsed:>10.2f}{args.sites / elapsed:>10.1f}{emails:>7}{fast:>9}"
+              f"  {final:<32}{'/'.join(str(count) for count in expired.values())}")
+
+
+if __name__ == "__main__":
+    main()
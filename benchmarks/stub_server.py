@@ -0,0 +1,54 @@
+"""Общая основа локальных серверов для бенчмарков."""
+import asyncio
+import threading
+
+
+def parse_request(head):
+    """Путь и имя хоста (без порта) из заголовков HTTP-запроса"""
+    path = head.split(b' ', 2)[1].decode()
+    host = ''
+    for line in head.decode('latin-1').split('\r\n')[1:]:
+        if line.lower().startswith('host:'):
+            host = line.split(':', 2)[1].strip()
+    return path, host
+
+
+class StubServer:
+    """Асинхронный TCP-сервер в отдельном потоке со своим циклом событий.
+
+    Подкласс задаёт handle(reader, writer). Сервер слушает host:listen_port
+    (порт 0 - любой свободный); после start() номер порта - в self.port.
+    setup() вызывается в потоке сервера до начала приёма подключений -
+    там создаются объекты asyncio, привязанные к его циклу. Сервер
+    другого вида (например, UDP) переопределяет listen().
+    """
+
+    host = '127.0.0.1'
+    listen_port = 0
+
+    def __init__(self):
+        self.port = None
+        self.loop = asyncio.new_event_loop()
+        self.ready = threading.Event()
+
+    def setup(self):
+        pass
+
+    async def listen(self):
+        """Начало приёма подключений; возвращает номер порта"""
+        server = await asyncio.start_server(self.handle, self.host, self.listen_port, backlog=4096)
+        return server.sockets[0].getsockname()[1]
+
+    async def handle(self, reader, writer):
+        raise NotImplementedError
+
+    def start(self):
+        def serve():
+            asyncio.set_event_loop(self.loop)
+            self.setup()
+            self.port = self.loop.run_until_complete(self.listen())
+            self.ready.set()
+            self.loop.run_forever()
+
+        threading.Thread(target=serve, daemon=True).start()
+        self.ready.wait()
@@ -16,7 +16,28 @@ a = Analysis(
         'queue',
         'urllib.parse',
         'threading',
+        'sqlite3',
+        'psutil',
         'email_checker.mass_scanner',
+        'email_checker.async_engine',
+        'email_checker.session_pool',
+        'email_checker.extractor',
+        'email_checker.tlds',
+        'email_checker.charset',
+        'email_checker.dns_resolver',
+        'email_checker.sqlite_cache',
+        'email_checker.dns_cache',
+        'email_checker.disk_state',
+        'email_checker.bloom',
+        'email_checker.batch_writer',
+        'email_checker.email_journal',
+        'email_checker.result_store',
+        'email_checker.stats',
+        'email_checker.extraction_pool',
+        'email_checker.politeness',
+        'email_checker.scheme_probe',
+        'email_checker.timeouts',
+        'email_checker.concurrency',
         'email_checker.interface',
         'bs4.builder._htmlparser',
         'urllib3.packages.six.moves'
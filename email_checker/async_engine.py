@@ -0,0 +1,514 @@
+import asyncio
+import base64
+import logging
+import random
+import ssl
+import zlib
+from contextlib import aclosing
+from urllib.parse import unquote, urljoin, urlsplit
+
+from politeness import RobotsBody, robots_urls
+
+logger = logging.getLogger(__name__)
+
+REDIRECT_STATUSES = {301, 302, 303, 307, 308}
+
+# Максимальный размер заголовков ответа
+HEADER_LIMIT = 2 ** 17
+BODY_CHUNK_SIZE = 65536
+
+
+class AsyncFetchEngine:
+    """Асинхронный движок сканирования.
+
+    Все загрузки выполняются в одном потоке через asyncio, поэтому число
+    одновременных запросов ограничено только параметром concurrency, а не
+    количеством потоков ОС. Результаты передаются в сканер через
+    record_page_emails/record_site_failure, так что stats и found_emails
+    заполняются так же, как в потоковом режиме.
+    """
+
+    def __init__(self, scanner, concurrency=1000, max_redirects=5):
+        self.scanner = scanner
+        self.concurrency = max(1, concurrency)
+        # Таймауты фаз общие с потоковым движком (AdaptiveTimeouts сканера)
+        self.timeouts = scanner.timeouts
+        # Бюджет на страницу общий с потоковым движком
+        self.max_bytes = scanner.max_page_bytes
+        self.max_seconds = scanner.max_page_seconds
+        self.max_redirects = max_redirects
+
+        # Как и в потоковом движке, сертификаты не проверяем (verify=False)
+        self.ssl_context = ssl.create_default_context()
+        self.ssl_context.check_hostname = False
+        self.ssl_context.verify_mode = ssl.CERT_NONE
+
+    def run(self, domains):
+        """Синхронная точка входа: сканирование доменов в собственном event loop.
+
+        domains - список или генератор (например, чтение url_queue конвейера).
+        """
+        asyncio.run(self.scan_all(domains))
+
+    async def scan_all(self, domains):
+        """Раздача доменов корутинам-воркерам.
+
+        Воркеров concurrency; если у сканера есть ConcurrencyController,
+        сайты загружают только воркеры с номером меньше его limit.
+        """
+        queue = asyncio.Queue(maxsize=self.concurrency * 2)
+        controller = self.scanner.concurrency
+        loop = asyncio.get_running_loop()
+        self.resized = asyncio.Event()
+
+        def on_resize():
+            # Вызывается из потока, где работает регулятор
+            try:
+                loop.call_soon_threadsafe(self.wake_workers)
+            except RuntimeError:
+                pass
+
+        async def producer():
+            loop = asyncio.get_running_loop()
+            urls = iter(domains)
+            while not self.scanner.stop_event.is_set():
+                # Источник может ждать данных (очередь стадии DNS), поэтому читается вне event loop
+                domain = await loop.run_in_executor(None, next, urls, None)
+                if domain is None:
+                    break
+                await queue.put(domain)
+            for _ in range(self.concurrency):
+                await queue.put(None)
+
+        async def worker(index):
+            while True:
+                while controller is not None and not controller.allowed(index):
+                    resized = self.resized
+                    if controller.allowed(index):
+                        break
+                    await resized.wait()
+                url = await queue.get()
+                if url is None:
+                    if controller is not None:
+                        controller.finish()
+                    break
+                await self.scan_single_url(url)
+
+        if controller is not None:
+            controller.listeners.append(on_resize)
+        try:
+            await asyncio.gather(producer(), *(worker(index) for index in range(self.concurrency)))
+        finally:
+            if controller is not None:
+                controller.listeners.remove(on_resize)
+
+    def wake_workers(self):
+        """Число загрузок изменилось: ожидающие воркеры проверяют свой номер заново"""
+        resized, self.resized = self.resized, asyncio.Event()
+        resized.set()
+
+    async def scan_single_url(self, url):
+        """Асинхронный аналог MassWebsiteEmailScanner.scan_single_url"""
+        if self.scanner.stop_event.is_set():
+            return None
+
+        result = self.scanner.new_site_result(url)
+        requeued = False
+        try:
+            if self.scanner.politeness is not None and self.scanner.respect_robots:
+                decision = await self.check_robots(url)
+                if decision == 'defer':
+                    requeued = True
+                    return None
+                if decision == 'deny':
+                    result['status'] = 'robots_disallowed'
+                    await self.blocking(self.scanner.record_site_failure, result)
+                    return None
+            
+            fingerprint = self.scanner.politeness.fingerprint(url) if self.scanner.politeness is not None else None
+            # Общий срок загрузки сайта (все попытки, редиректы и тело страницы)
+            loop = asyncio.get_running_loop()
+            fetch_started = loop.time()
+            total_timeout = self.timeouts.get('total')
+            deadline = fetch_started + total_timeout
+            # Сохранённый адрес сайта, затем обе схемы наперегонки, если не указана
+            async with aclosing(self.candidate_urls(url)) as candidates:
+                async for test_url, connection in candidates:
+                    if loop.time() >= deadline:
+                        self.timeouts.expired('total')
+                        # Соединение победителя гонки уже открыто (для https - после TLS)
+                        if connection is not None:
+                            connection[1].close()
+                        break
+                    try:
+                        logger.debug(f"Попытка подключения к: {test_url}")
+                        status, headers, extractor = await asyncio.wait_for(
+                            self.fetch(test_url, result, fingerprint=fingerprint, connection=connection),
+                            deadline - loop.time()
+                        )
+                    except Exception as e:
+                        logger.debug(f"Ошибка подключения к {test_url}: {e}")
+                        if loop.time() >= deadline:
+                            self.timeouts.expired('total')
+                            break
+                        continue
+
+                    if status == 200:
+                        await self.blocking(self.scanner.remember_site_url, url, result['final_url'])
+                        if extractor is None:
+                            logger.debug(f"Пропуск {test_url}: {headers.get('content-type')}")
+                            result['status'] = 'non_text'
+                            await self.blocking(self.scanner.record_site_failure, result)
+                            return None
+                        self.scanner.record_sample(url, fingerprint)
+                        self.scanner.record_total_time(loop.time() - fetch_started, total_timeout)
+                        return await self.blocking(self.scanner.record_page_emails, url, test_url, extractor.emails, result)
+                    logger.debug(f"Статус {status} для {test_url}")
+                    result['status'] = 'http_error'
+
+            await self.blocking(self.scanner.record_site_failure, result)
+            return None
+
+        except Exception as e:
+            result['status'] = 'error'
+            await self.blocking(self.scanner.record_site_failure, result)
+            logger.debug(f"Ошибка при сканировании {url}: {e}")
+            return {
+                'url': url,
+                'emails': [],
+                'status': f'error: {str(e)}'
+            }
+        finally:
+            self.scanner.finish_site(url, requeued)
+
+    async def candidate_urls(self, url):
+        """Асинхронный аналог MassWebsiteEmailScanner.candidate_urls: пары (URL, соединение или None)"""
+        if url.startswith('http'):
+            yield url, None
+            return
+        cached = await self.blocking(self.scanner.cached_site_url, url)
+        if cached:
+            yield cached, None
+            # Сюда доходим, только если по сохранённому адресу страница не загрузилась
+            await self.blocking(self.scanner.scheme_cache.forget, url)
+        async with aclosing(self.race_urls([f'https://{url}', f'http://{url}'])) as candidates:
+            async for candidate in candidates:
+                yield candidate
+
+    async def race_urls(self, urls):
+        """URL в порядке гонки подключений: пары (URL, соединение или None).
+
+        Первый URL получает фору scheme_stagger секунд, следующий
+        стартует, если предыдущий не подключился за это время или отказал.
+        Первым отдаётся подключившийся раньше всех вместе с соединением
+        (для https - уже после TLS), затем не отказавшие остальные - без
+        соединения, на случай если ответ первого не подойдёт. Через прокси
+        и при scheme_stagger None - по очереди, как раньше.
+        """
+        stagger = self.scanner.scheme_stagger
+        if stagger is None or self.scanner.current_proxy:
+            for url in urls:
+                yield url, None
+            return
+
+        tasks = {}
+        waiting = list(urls)
+        failed = set()
+        winner = None
+        try:
+            self.start_connect(tasks, waiting.pop(0))
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + self.timeouts.handshake()
+            while tasks and winner is None and loop.time() < deadline:
+                timeout = stagger if waiting else deadline - loop.time()
+                done, _ = await asyncio.wait(tasks, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    url = tasks.pop(task)
+                    if task.exception() is not None:
+                        failed.add(url)
+                    elif winner is None:
+                        winner = (url, task.result())
+                    else:
+                        task.result()[1].close()
+                # Фора истекла или подключение отказало - стартует следующий URL
+                if winner is None and waiting:
+                    self.start_connect(tasks, waiting.pop(0))
+        finally:
+            for task in tasks:
+                # Подключение, завершившееся после последнего wait, отмена уже не закроет
+                if task.done() and not task.cancelled() and task.exception() is None:
+                    task.result()[1].close()
+                else:
+                    task.cancel()
+        if winner is None:
+            return
+        yield winner
+        for url in urls:
+            if url != winner[0] and url not in failed:
+                yield url, None
+
+    async def blocking(self, func, *args):
+        """Вызов func(*args) в пуле потоков: обращения к SQLite и диску не останавливают event loop.
+
+        Так вызываются кэши (схемы, robots.txt) и учёт результата сайта
+        (record_page_emails, record_site_failure): он удаляет проверенные
+        домены из фронтира и в режиме масштаба пишет email в DiskSet.
+        """
+        return await asyncio.get_running_loop().run_in_executor(None, func, *args)
+
+    def start_connect(self, tasks, url):
+        """Подключение к url в фоне; задача запоминается в tasks вместе с URL"""
+        tasks[asyncio.ensure_future(self.connect(url))] = url
+
+    async def check_robots(self, url):
+        """Асинхронный аналог MassWebsiteEmailScanner.check_robots"""
+        if self.scanner.politeness.take_robots_checked(url):
+            return 'allow'
+        verdict = await self.blocking(self.scanner.robots_cached, url)
+        if verdict is not None:
+            return self.scanner.robots_decision(url, verdict, fetched=False)
+        status, text = await self.fetch_robots(url)
+        verdict = await self.blocking(self.scanner.robots_fetched, url, status, text)
+        return self.scanner.robots_decision(url, verdict, fetched=True)
+
+    async def fetch_robots(self, url):
+        """Загрузка robots.txt сайта: (код ответа или None, если подключиться не удалось; текст)"""
+        known = None
+        if not url.startswith('http') and self.scanner.scheme_cache is not None:
+            known = await self.blocking(self.scanner.scheme_cache.get, url)
+        # Схема - как у страницы: сохранённая в прошлом запуске или по гонке подключений
+        async with aclosing(self.race_urls(robots_urls(known or url))) as candidates:
+            async for robots_url, connection in candidates:
+                try:
+                    status, _, body = await asyncio.wait_for(
+                        self.fetch(robots_url, body_factory=RobotsBody, connection=connection), self.timeouts.get('total')
+                    )
+                except Exception as e:
+                    logger.debug(f"Ошибка загрузки {robots_url}: {e}")
+                    continue
+                return status, body.text if body is not None else ''
+        return None, ''
+
+    async def fetch(self, url, result=None, body_factory=None, fingerprint=None, connection=None):
+        """GET-запрос с переходом по редиректам.
+
+        Для ответа 200 возвращается экстрактор с найденными email (или
+        объект body_factory(), например RobotsBody); при нетекстовом
+        Content-Type тело не читается и вместо него None.
+        Итоговый URL, код ответа, время и байты записываются в result сайта,
+        начало страницы - в fingerprint (PageFingerprint), если он передан.
+        connection - открытое соединение для первого запроса.
+        """
+        for _ in range(self.max_redirects + 1):
+            status, headers, extractor = await self.request(url, result, body_factory, fingerprint, connection)
+            connection = None
+            location = headers.get('location')
+            if status in REDIRECT_STATUSES and location:
+                url = urljoin(url, location)
+                continue
+            if result is not None and status == 200:
+                result['final_url'] = url
+            return status, headers, extractor
+        raise ConnectionError(f"Слишком много редиректов: {url}")
+
+    async def connect(self, url):
+        """Соединение для запроса к url напрямую или через прокси: (reader, writer, цель запроса, доп. заголовки)"""
+        parts = urlsplit(url)
+        secure = parts.scheme == 'https'
+        host = parts.hostname
+        port = parts.port or (443 if secure else 80)
+        target = parts.path or '/'
+        if parts.query:
+            target += '?' + parts.query
+
+        extra_headers = []
+        proxy = (self.scanner.current_proxy or {}).get(parts.scheme)
+        if proxy:
+            proxy_parts = urlsplit(proxy)
+            proxy_auth = None
+            if proxy_parts.username:
+                credentials = f"{unquote(proxy_parts.username)}:{unquote(proxy_parts.password or '')}"
+                proxy_auth = 'Basic ' + base64.b64encode(credentials.encode()).decode()
+
+            reader, writer = await self.timed('connect', asyncio.open_connection(
+                proxy_parts.hostname, proxy_parts.port or 80, limit=HEADER_LIMIT
+            ))
+            if secure:
+                # Туннель через CONNECT, TLS поверх соединения с прокси
+                connect_lines = [f"CONNECT {host}:{port} HTTP/1.1", f"Host: {host}:{port}"]
+                if proxy_auth:
+                    connect_lines.append(f"Proxy-Authorization: {proxy_auth}")
+                writer.write(('\r\n'.join(connect_lines) + '\r\n\r\n').encode('latin-1'))
+                try:
+                    status, _ = await self.timed('first_byte', self.read_head(reader))
+                    if status != 200:
+                        raise ConnectionError(f"Прокси отклонил CONNECT: {status}")
+                    await self.timed('tls', writer.start_tls(self.ssl_context, server_hostname=host))
+                except BaseException:
+                    writer.close()
+                    raise
+            else:
+                target = url.split('#', 1)[0]
+                if proxy_auth:
+                    extra_headers.append(f"Proxy-Authorization: {proxy_auth}")
+        else:
+            # Адрес, найденный при проверке домена; Host и SNI остаются именем домена
+            connect_host = (self.scanner.resolved_ips.get(host) or [host])[0]
+            loop = asyncio.get_running_loop()
+            started = loop.time()
+            reader, writer = await self.timed('connect', asyncio.open_connection(connect_host, port, limit=HEADER_LIMIT))
+            if secure:
+                # TLS отдельно от TCP-подключения: у рукопожатия свой таймаут, но вместе
+                # с подключением не дольше общего таймаута подключения
+                remaining = self.timeouts.handshake() - (loop.time() - started)
+                try:
+                    await self.timed('tls', writer.start_tls(self.ssl_context, server_hostname=host),
+                                     min(self.timeouts.get('tls'), max(0.0, remaining)))
+                except BaseException:
+                    writer.close()
+                    raise
+        return reader, writer, target, extra_headers
+
+    async def timed(self, phase, awaitable, timeout=None):
+        """Ожидание awaitable с таймаутом фазы phase (или timeout); время успешной фазы идёт в замеры"""
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        try:
+            result = await asyncio.wait_for(awaitable, self.timeouts.get(phase) if timeout is None else timeout)
+        except asyncio.TimeoutError:
+            self.timeouts.expired(phase)
+            raise
+        self.timeouts.observe(phase, loop.time() - started)
+        return result
+
+    async def request(self, url, result=None, body_factory=None, fingerprint=None, connection=None):
+        """Один HTTP/1.1 запрос без keep-alive; тело читается только для текстового ответа 200.
+
+        connection - уже открытое соединение из connect (например, победитель гонки схем).
+        """
+        parts = urlsplit(url)
+        reader, writer, target, extra_headers = connection or await self.connect(url)
+        try:
+            host_header = parts.netloc.rsplit('@', 1)[-1].encode('idna').decode('ascii')
+            request_lines = [
+                f"GET {target} HTTP/1.1",
+                f"Host: {host_header}",
+                f"User-Agent: {random.choice(self.scanner.user_agents)}",
+                'Accept: text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+                'Accept-Language: ru-RU,ru;q=0.9,en-US;q=0.8,en;q=0.7',
+                'Accept-Encoding: gzip, deflate',
+                'Connection: close',
+            ] + extra_headers
+            writer.write(('\r\n'.join(request_lines) + '\r\n\r\n').encode('latin-1'))
+            await writer.drain()
+
+            status, headers = await self.timed('first_byte', self.read_head(reader))
+            if result is not None:
+                self.scanner.record_first_byte(result, status)
+            extractor = None
+            if status == 200:
+                try:
+                    content_length = int(headers.get('content-length', 0))
+                except ValueError:
+                    content_length = 0
+
+                if not self.scanner.is_text_content_type(headers.get('content-type')):
+                    self.scanner.record_non_text_skip(content_length)
+                    return status, headers, None
+
+                encoding = self.scanner.charset_resolver.from_content_type(headers.get('content-type'))
+                extractor = body_factory() if body_factory else self.scanner.create_extractor(encoding)
+                downloaded = await self.read_body(reader, headers, extractor, fingerprint)
+                saved = max(0, content_length - downloaded) if content_length else 0
+                self.scanner.record_transfer(downloaded, saved)
+                if result is not None:
+                    result['bytes'] += downloaded
+                if hasattr(extractor, 'submit'):
+                    # Страница ищется в пуле процессов сканера (PageBuffer)
+                    extractor.found = await asyncio.wrap_future(extractor.submit())
+                else:
+                    extractor.finish()
+            return status, headers, extractor
+        finally:
+            writer.close()
+
+    async def read_head(self, reader):
+        """Чтение статусной строки и заголовков (промежуточные 1xx пропускаются)"""
+        while True:
+            head = await reader.readuntil(b'\r\n\r\n')
+            lines = head.decode('latin-1').split('\r\n')
+            status = int(lines[0].split(' ', 2)[1])
+            if 100 <= status < 200:
+                continue
+
+            headers = {}
+            for line in lines[1:]:
+                if ':' in line:
+                    name, value = line.split(':', 1)
+                    headers[name.strip().lower()] = value.strip()
+            return status, headers
+
+    async def read_body(self, reader, headers, extractor, fingerprint=None):
+        """Чтение тела с поиском email на лету в пределах max_bytes и max_seconds.
+
+        Возвращает число байт, полученных из сети (до распаковки).
+        """
+        content_encoding = headers.get('content-encoding', '').lower()
+        decompressor = self.create_decompressor(content_encoding)
+        downloaded = 0
+        size = 0
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.max_seconds
+
+        async with aclosing(self.iter_body(reader, headers)) as chunks:
+            async for chunk in chunks:
+                downloaded += len(chunk)
+                data = chunk
+                if decompressor is not None:
+                    try:
+                        data = decompressor.decompress(chunk, self.max_bytes - size)
+                    except zlib.error:
+                        if content_encoding != 'deflate' or downloaded != len(chunk):
+                            raise
+                        # Некоторые серверы отдают deflate без zlib-заголовка
+                        decompressor = zlib.decompressobj(-zlib.MAX_WBITS)
+                        data = decompressor.decompress(chunk, self.max_bytes - size)
+
+                data = data[:self.max_bytes - size]
+                size += len(data)
+                if fingerprint is not None:
+                    fingerprint.feed(data)
+                if extractor.feed(data):
+                    break
+                if size >= self.max_bytes or loop.time() >= deadline:
+                    break
+
+        return downloaded
+
+    async def iter_body(self, reader, headers):
+        """Части тела ответа в том виде, в каком они приходят из сети"""
+        if headers.get('transfer-encoding', '').lower() == 'chunked':
+            while True:
+                line = await reader.readline()
+                chunk_size = int(line.split(b';')[0].strip() or b'0', 16)
+                if chunk_size == 0:
+                    return
+                yield await reader.readexactly(chunk_size)
+                await reader.readexactly(2)
+
+        remaining = int(headers['content-length']) if 'content-length' in headers else None
+        while remaining is None or remaining > 0:
+            chunk = await reader.read(BODY_CHUNK_SIZE if remaining is None else min(BODY_CHUNK_SIZE, remaining))
+            if not chunk:
+                return
+            if remaining is not None:
+                remaining -= len(chunk)
+            yield chunk
+
+    def create_decompressor(self, content_encoding):
+        """Потоковый распаковщик для gzip/deflate"""
+        if content_encoding == 'gzip':
+            return zlib.decompressobj(16 + zlib.MAX_WBITS)
+        if content_encoding == 'deflate':
+            return zlib.decompressobj()
+        return None
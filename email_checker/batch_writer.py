@@ -0,0 +1,119 @@
+import logging
+import threading
+import time
+from queue import Queue, Empty
+
+logger = logging.getLogger(__name__)
+
+# Сигнал потоку записи: дописать очередь и закрыть файл/соединение
+STOP = object()
+
+
+class BatchWriter:
+    """Запись в отдельном потоке порциями до batch_size элементов.
+
+    Воркеры только кладут элементы в очередь (put не ждёт диска); поток
+    записи запускается при первом элементе, открывает хранилище (open) и
+    пишет накопившееся одной операцией на порцию (write_batch).
+    Подклассы задают open, write_batch и при необходимости rollback и
+    close_resource.
+
+    Ошибка открытия или записи не останавливает поток: порция
+    отбрасывается с записью в лог, а открыть хранилище он пробует снова
+    на следующей порции. Каждый взятый элемент отмечается task_done,
+    поэтому flush не зависает.
+    """
+
+    error_message = "Ошибка записи"
+
+    def __init__(self, batch_size):
+        self.batch_size = batch_size
+        self.queue = Queue()
+        self.writer = None
+        self.lock = threading.Lock()
+
+    def put(self, item):
+        with self.lock:
+            if self.writer is None or not self.writer.is_alive():
+                self.writer = threading.Thread(target=self.write_loop, daemon=True)
+                self.writer.start()
+            # Под блокировкой: элемент не попадёт в очередь после STOP остановленного потока
+            self.queue.put(item)
+
+    def open(self):
+        """Хранилище для записи (файл, соединение) или None"""
+        return None
+
+    def write_batch(self, resource, batch):
+        raise NotImplementedError
+
+    def rollback(self, resource):
+        """Откат неудачной записи порции"""
+
+    def close_resource(self, resource):
+        """Закрытие хранилища при остановке потока"""
+
+    def write_loop(self):
+        resource = None
+        try:
+            while True:
+                batch = [self.queue.get()]
+                while len(batch) < self.batch_size and batch[-1] is not STOP:
+                    try:
+                        batch.append(self.queue.get_nowait())
+                    except Empty:
+                        break
+                stop = batch[-1] is STOP
+                items = batch[:-1] if stop else batch
+                try:
+                    if items:
+                        if resource is None:
+                            resource = self.open()
+                        self.write_batch(resource, items)
+                except Exception as e:
+                    if resource is not None:
+                        try:
+                            self.rollback(resource)
+                        except Exception:
+                            pass
+                    logger.error(f"{self.error_message}: {e}")
+                finally:
+                    for _ in batch:
+                        self.queue.task_done()
+                if stop:
+                    return
+        finally:
+            if resource is not None:
+                try:
+                    self.close_resource(resource)
+                except Exception as e:
+                    logger.error(f"{self.error_message}: {e}")
+
+    def flush(self, timeout=None):
+        """Ожидание, пока всё принятое будет записано.
+
+        False - не дождались: истёк timeout или поток записи остановился.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.queue.all_tasks_done:
+            while self.queue.unfinished_tasks:
+                writer = self.writer
+                if writer is None or not writer.is_alive():
+                    logger.error(f"{self.error_message}: поток записи остановлен, не записано {self.queue.unfinished_tasks}")
+                    return False
+                wait = 1.0 if deadline is None else min(1.0, deadline - time.monotonic())
+                if wait <= 0:
+                    return False
+                self.queue.all_tasks_done.wait(wait)
+        return True
+
+    def close(self, timeout=None):
+        """Запись очереди и остановка потока с закрытием хранилища; put снова запускает поток"""
+        with self.lock:
+            writer = self.writer
+            if writer is None or not writer.is_alive():
+                return True
+            self.queue.put(STOP)
+        written = self.flush(timeout)
+        writer.join(timeout)
+        return written
@@ -0,0 +1,131 @@
+import hashlib
+import json
+import math
+import os
+import threading
+
+MAGIC = b'BLM1'
+
+
+class BloomFilter:
+    """Фильтр Блума фиксированной ёмкости.
+
+    Размер и число хэш-функций выбираются по capacity и error_rate:
+    при 1% ложных срабатываний это около 1.2 байта на элемент.
+    Индексы считаются двойным хэшированием одного blake2b.
+    """
+
+    def __init__(self, capacity, error_rate, bits=None, count=0):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.size = max(8, int(math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)))
+        self.hashes = max(1, int(round(self.size / capacity * math.log(2))))
+        self.bits = bits if bits is not None else bytearray((self.size + 7) // 8)
+        self.count = count
+
+    def positions(self, item):
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def contains_positions(self, positions):
+        bits = self.bits
+        return all(bits[p >> 3] & (1 << (p & 7)) for p in positions)
+
+    def set_positions(self, positions):
+        for p in positions:
+            self.bits[p >> 3] |= 1 << (p & 7)
+        self.count += 1
+
+    def __contains__(self, item):
+        return self.contains_positions(self.positions(item))
+
+    @property
+    def full(self):
+        return self.count >= self.capacity
+
+
+class ScalableBloomFilter:
+    """Множество посещённых доменов с заданной долей ложных срабатываний.
+
+    Когда текущий фильтр заполнен, добавляется следующий - вдвое больше и
+    с вдвое меньшей долей ошибок, так что суммарная доля ложных
+    срабатываний остаётся в пределах error_rate при любом числе доменов.
+    Ложное срабатывание означает, что новый домен будет пропущен; обратной
+    ошибки (повторное сканирование уже посещённого) не бывает.
+
+    Фильтр сохраняется в файл целиком (save) и загружается при создании.
+    """
+
+    def __init__(self, path=None, error_rate=0.001, initial_capacity=100000):
+        self.path = path
+        self.error_rate = error_rate
+        self.initial_capacity = initial_capacity
+        self.filters = []
+        self.lock = threading.Lock()
+        if path and os.path.exists(path):
+            self.load(path)
+
+    def new_filter(self):
+        index = len(self.filters)
+        # Ряд error_rate/2 + error_rate/4 + ... не превышает error_rate
+        bloom = BloomFilter(self.initial_capacity * 2 ** index, self.error_rate / 2 ** (index + 1))
+        self.filters.append(bloom)
+        return bloom
+
+    def add(self, item):
+        """Добавление; False, если элемент (вероятно) уже был"""
+        with self.lock:
+            for bloom in self.filters:
+                if item in bloom:
+                    return False
+            current = self.filters[-1] if self.filters and not self.filters[-1].full else self.new_filter()
+            current.set_positions(current.positions(item))
+            return True
+
+    def __contains__(self, item):
+        with self.lock:
+            return any(item in bloom for bloom in self.filters)
+
+    def __len__(self):
+        return sum(bloom.count for bloom in self.filters)
+
+    def clear(self):
+        """Удаление всех элементов (файл перезаписывается при следующем save)"""
+        with self.lock:
+            self.filters = []
+
+    def size_bytes(self):
+        return sum(len(bloom.bits) for bloom in self.filters)
+
+    def save(self, path=None):
+        """Атомарная запись в файл: заголовок JSON и битовые массивы фильтров"""
+        path = path or self.path
+        if not path:
+            return
+        with self.lock:
+            header = json.dumps({
+                'error_rate': self.error_rate,
+                'initial_capacity': self.initial_capacity,
+                'filters': [{'capacity': b.capacity, 'error_rate': b.error_rate, 'count': b.count} for b in self.filters]
+            }).encode('utf-8')
+            temp_path = f"{path}.tmp"
+            with open(temp_path, 'wb') as f:
+                f.write(MAGIC + len(header).to_bytes(4, 'little') + header)
+                for bloom in self.filters:
+                    f.write(bloom.bits)
+        os.replace(temp_path, path)
+
+    def load(self, path):
+        with open(path, 'rb') as f:
+            if f.read(4) != MAGIC:
+                raise ValueError(f"Не файл фильтра: {path}")
+            header = json.loads(f.read(int.from_bytes(f.read(4), 'little')))
+            self.error_rate = header['error_rate']
+            self.initial_capacity = header['initial_capacity']
+            self.filters = []
+            for info in header['filters']:
+                bloom = BloomFilter(info['capacity'], info['error_rate'], count=info['count'])
+                bloom.bits = bytearray(f.read(len(bloom.bits)))
+                self.filters.append(bloom)
@@ -0,0 +1,84 @@
+import codecs
+import re
+import threading
+
+CONTENT_TYPE_CHARSET_RE = re.compile(r'charset\s*=\s*["\']?([\w.:-]+)', re.IGNORECASE)
+# <meta charset="..."> и <meta http-equiv="Content-Type" content="...; charset=...">
+META_CHARSET_RE = re.compile(rb'<meta[^>]+charset\s*=\s*["\']?\s*([\w.:-]+)', re.IGNORECASE)
+
+BOMS = [
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF32_LE, 'utf-32'),
+    (codecs.BOM_UTF32_BE, 'utf-32'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+]
+
+
+def normalize_encoding(name):
+    """Каноническое имя кодировки или None, если Python её не знает"""
+    try:
+        return codecs.lookup(name.strip()).name
+    except (LookupError, AttributeError):
+        return None
+
+
+class CharsetResolver:
+    """Определение кодировки страницы без статистического анализа текста.
+
+    Порядок как в браузерах: BOM, charset из Content-Type, <meta> в первых
+    sniff_bytes байтах. Если ничего не указано, используется кодировка,
+    найденная ранее для этого хоста, иначе проверка на корректный UTF-8 с
+    откатом на fallback_encoding (для ru/ua/by/kz это windows-1251).
+    """
+
+    def __init__(self, sniff_bytes=4096, fallback_encoding='windows-1251'):
+        self.sniff_bytes = sniff_bytes
+        self.fallback_encoding = fallback_encoding
+        self.host_cache = {}
+        self.lock = threading.Lock()
+
+    def from_bom(self, head):
+        for bom, encoding in BOMS:
+            if head.startswith(bom):
+                return encoding
+        return None
+
+    def from_content_type(self, content_type):
+        match = CONTENT_TYPE_CHARSET_RE.search(content_type or '')
+        return normalize_encoding(match.group(1)) if match else None
+
+    def from_meta(self, head):
+        match = META_CHARSET_RE.search(head[:self.sniff_bytes])
+        return normalize_encoding(match.group(1).decode('ascii', 'ignore')) if match else None
+
+    def resolve(self, body, content_type=None, host=None):
+        """Кодировка для тела ответа; найденная явно запоминается для хоста"""
+        encoding = self.from_bom(body) or self.from_content_type(content_type) or self.from_meta(body)
+        if encoding:
+            if host:
+                with self.lock:
+                    self.host_cache[host] = encoding
+            return encoding
+
+        if host:
+            with self.lock:
+                cached = self.host_cache.get(host)
+            if cached:
+                return cached
+
+        try:
+            body.decode('utf-8')
+            encoding = 'utf-8'
+        except UnicodeDecodeError:
+            encoding = self.fallback_encoding
+
+        if host:
+            with self.lock:
+                self.host_cache[host] = encoding
+        return encoding
+
+    def decode(self, body, content_type=None, host=None):
+        """Декодирование тела ответа в текст"""
+        encoding = self.resolve(body, content_type, host)
+        return body.decode(encoding, errors='replace')
@@ -0,0 +1,179 @@
+import threading
+import time
+
+
+class ConcurrencyController:
+    """Число одновременных загрузок, подбираемое по ходу сканирования (AIMD).
+
+    Воркеров запускается max_limit, но загружают сайты только воркеры с
+    номером меньше limit, остальные ждут (wait_for_slot). Раз в interval
+    секунд update сравнивает показатели за прошедший интервал:
+
+    - перегрузка - загрузка CPU выше cpu_limit, доля ошибок подключения
+      или истёкших таймаутов выросла больше чем на error_margin и
+      timeout_margin относительно сглаженного уровня, либо пропускная
+      способность упала больше чем на drop_share после прошлого
+      увеличения. Тогда limit умножается на decrease (не ниже min_limit);
+    - иначе, если сайты ждут свободного воркера, limit растёт: сначала
+      вдвое (медленный старт с initial, до первой перегрузки), затем на
+      step. Начало с малого числа загрузок нужно и для того, чтобы
+      уровень ошибок первых интервалов не был замерен при перегрузке.
+      Цена - разгон: до max_limit limit доходит примерно за
+      interval * log2(max_limit / initial) секунд (с 8 до 1000 - около
+      3.5 с), короткое сканирование идёт медленнее постоянного числа загрузок.
+
+    Лишние загрузки при перегрузке часто отказывают сразу, и каждая такая
+    загрузка за интервал теряет много сайтов. Поэтому вблизи предела, на
+    котором была последняя перегрузка (ceiling), limit за него выходит
+    только раз в probe_every интервалов: сначала на одну загрузку, после
+    каждой удачной пробы - вдвое больше (ёмкость могла вырасти), после
+    перегрузки - снова на одну.
+    Интервал сразу после снижения пропускается: в нём ещё досчитываются
+    ошибки той же перегрузки.
+
+    Ошибки сами по себе не повод уменьшать limit: у массового сканирования
+    много мёртвых доменов, поэтому сравнивается не доля, а её рост.
+    При enabled=False limit всегда равен max_limit.
+    """
+
+    def __init__(self, max_limit, min_limit=1, initial=8, enabled=True, interval=0.5, step=None,
+                 decrease=0.75, cpu_limit=90.0, error_margin=0.05, timeout_margin=0.05, drop_share=0.2, min_sites=20,
+                 probe_every=10):
+        self.max_limit = max(1, max_limit)
+        self.min_limit = max(1, min(min_limit, self.max_limit))
+        self.enabled = enabled
+        if not enabled:
+            initial = self.max_limit
+        self.limit = max(self.min_limit, min(self.max_limit, initial))
+        self.interval = interval
+        self.step = step or max(1, self.max_limit // 100)
+        self.probe_every = probe_every
+        self.ceiling = None
+        self.probe_size = 1
+        self.calm_intervals = 0
+        self.decrease = decrease
+        self.cpu_limit = cpu_limit
+        self.error_margin = error_margin
+        self.timeout_margin = timeout_margin
+        self.drop_share = drop_share
+        # Меньше сайтов за интервал - доли ошибок слишком шумные, чтобы по ним судить
+        self.min_sites = min_sites
+        self.slow_start = True
+        # Сглаженные доли ошибок и таймаутов (None - ещё нет замеров)
+        self.error_level = None
+        self.timeout_level = None
+        self.last = None
+        self.last_throughput = None
+        self.increased = False
+        self.decreased = False
+        self.decreases = 0
+        self.finished = False
+        self.condition = threading.Condition()
+        # Вызываются при изменении limit (асинхронный движок будит свои воркеры)
+        self.listeners = []
+
+    def wait_for_slot(self, index, timeout=None):
+        """Ожидание, пока воркер index может загружать сайт; False - истёк timeout"""
+        with self.condition:
+            return self.condition.wait_for(lambda: self.allowed(index), timeout)
+
+    def allowed(self, index):
+        return self.finished or index < self.limit
+
+    def finish(self):
+        """Сайты кончились: ожидающие воркеры отпускаются, чтобы прочитать сигнал окончания"""
+        with self.condition:
+            self.finished = True
+        self.changed()
+
+    def set_limit(self, limit):
+        limit = max(self.min_limit, min(self.max_limit, int(limit)))
+        if limit == self.limit:
+            return
+        with self.condition:
+            self.limit = limit
+        self.changed()
+
+    def changed(self):
+        with self.condition:
+            self.condition.notify_all()
+        for listener in list(self.listeners):
+            listener()
+
+    def update(self, processed, errors, timeouts, cpu_percent, waiting, now=None):
+        """Шаг регулятора по счётчикам с начала сканирования: обработано сайтов,
+        ошибок подключения, истёкших таймаутов; загрузка CPU, %; ждут ли сайты воркеров.
+
+        Возвращает новый limit.
+        """
+        now = time.monotonic() if now is None else now
+        if not self.enabled:
+            return self.limit
+        if self.last is None:
+            self.last = (now, processed, errors, timeouts)
+            return self.limit
+        last_time, last_processed, last_errors, last_timeouts = self.last
+        elapsed = now - last_time
+        if elapsed < self.interval:
+            return self.limit
+        self.last = (now, processed, errors, timeouts)
+
+        if self.decreased:
+            self.decreased = False
+            self.last_throughput = None
+            return self.limit
+
+        done = processed - last_processed
+        throughput = done / elapsed
+        congested = cpu_percent >= self.cpu_limit
+        if done >= self.min_sites:
+            error_share = (errors - last_errors) / done
+            timeout_share = (timeouts - last_timeouts) / done
+            if self.error_level is not None:
+                congested = congested or error_share > self.error_level + self.error_margin
+                congested = congested or timeout_share > self.timeout_level + self.timeout_margin
+            if self.error_level is None:
+                self.error_level, self.timeout_level = error_share, timeout_share
+            else:
+                # При перегрузке уровень сдвигается медленно: короткий всплеск не становится нормой,
+                # а долгое изменение (например, пошли мёртвые домены) со временем принимается
+                weight = 0.05 if congested else 0.2
+                self.error_level += (error_share - self.error_level) * weight
+                self.timeout_level += (timeout_share - self.timeout_level) * weight
+        if self.increased and self.last_throughput and throughput < self.last_throughput * (1 - self.drop_share):
+            # Больше воркеров - меньше сайтов в секунду: предел пройден
+            congested = True
+        self.last_throughput = throughput
+
+        probed = self.increased and self.ceiling is not None and self.limit > self.ceiling
+        self.increased = False
+        if congested:
+            self.slow_start = False
+            self.decreases += 1
+            self.ceiling = self.limit
+            self.probe_size = 1
+            self.calm_intervals = 0
+            self.decreased = True
+            self.set_limit(self.limit * self.decrease)
+            return self.limit
+        if probed:
+            self.ceiling = self.limit + 1
+            self.probe_size *= 2
+        self.calm_intervals += 1
+        if not waiting or self.limit >= self.max_limit:
+            return self.limit
+        if self.slow_start:
+            limit = self.limit * 2
+        else:
+            limit = self.limit + self.step
+            if self.ceiling is not None and limit >= self.ceiling:
+                # У прошлого предела перегрузки: проба раз в probe_every интервалов
+                if self.limit < self.ceiling - 1 or self.calm_intervals < self.probe_every:
+                    limit = min(limit, self.ceiling - 1)
+                else:
+                    limit = self.limit + self.probe_size
+                    self.calm_intervals = 0
+        if limit > self.limit:
+            self.increased = True
+            self.set_limit(limit)
+        return self.limit
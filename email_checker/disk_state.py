@@ -0,0 +1,216 @@
+import json
+import os
+import sqlite3
+import threading
+
+# Размер порции при постраничном чтении множеств
+ITER_BATCH = 1000
+
+
+class DiskStore:
+    """База SQLite с состоянием сканирования (фронтир, контрольная точка, множества).
+
+    Одно соединение на всю базу, запросы сериализуются блокировкой.
+    WAL и synchronous=NORMAL: запись не ждёт fsync на каждой вставке.
+    Папка и база создаются при первом запросе, тогда же структуры
+    создают свои таблицы (register); после close следующий запрос
+    открывает базу снова.
+    """
+
+    def __init__(self, state_dir='scan_state', filename='state.sqlite'):
+        self.state_dir = state_dir
+        self.path = os.path.join(state_dir, filename)
+        self.lock = threading.Lock()
+        self.connection = None
+        self.setups = []
+
+    def register(self, setup):
+        """setup(connection) создаёт таблицы структуры при открытии базы"""
+        with self.lock:
+            self.setups.append(setup)
+            if self.connection is not None:
+                setup(self.connection)
+                self.connection.commit()
+
+    def connect(self):
+        """Соединение с базой (под self.lock)"""
+        if self.connection is None:
+            os.makedirs(self.state_dir, exist_ok=True)
+            connection = sqlite3.connect(self.path, check_same_thread=False)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            for setup in self.setups:
+                setup(connection)
+            connection.commit()
+            self.connection = connection
+        return self.connection
+
+    def execute(self, sql, params=()):
+        with self.lock:
+            connection = self.connect()
+            cursor = connection.execute(sql, params)
+            rows = cursor.fetchall()
+            connection.commit()
+            return rows, cursor.rowcount
+
+    def executemany(self, sql, rows):
+        with self.lock:
+            connection = self.connect()
+            cursor = connection.executemany(sql, rows)
+            connection.commit()
+            return cursor.rowcount
+
+    def close(self):
+        with self.lock:
+            if self.connection is not None:
+                self.connection.close()
+                self.connection = None
+
+
+class DiskSet:
+    """Множество строк в таблице DiskStore.
+
+    Поддерживает то, что сканер делает с set: add, update, in, len,
+    итерацию (в отсортированном порядке, порциями, без загрузки в память).
+    """
+
+    def __init__(self, store, table):
+        self.store = store
+        self.table = table
+        self.count = 0
+        store.register(self.setup)
+
+    def setup(self, connection):
+        connection.execute(f'CREATE TABLE IF NOT EXISTS {self.table} (value TEXT PRIMARY KEY) WITHOUT ROWID')
+        self.count = connection.execute(f'SELECT COUNT(*) FROM {self.table}').fetchone()[0]
+
+    def add(self, value):
+        """True, если значения ещё не было"""
+        return bool(self.update([value]))
+
+    def update(self, values):
+        """Добавление значений; возвращает список новых"""
+        added = []
+        with self.store.lock:
+            connection = self.store.connect()
+            for value in values:
+                if connection.execute(f'INSERT OR IGNORE INTO {self.table} VALUES (?)', (value,)).rowcount > 0:
+                    added.append(value)
+            connection.commit()
+            self.count += len(added)
+        return added
+
+    def __contains__(self, value):
+        rows, _ = self.store.execute(f'SELECT 1 FROM {self.table} WHERE value = ?', (value,))
+        return bool(rows)
+
+    def __len__(self):
+        with self.store.lock:
+            self.store.connect()
+            return self.count
+
+    def __bool__(self):
+        return len(self) > 0
+
+    def __iter__(self):
+        last = ''
+        while True:
+            rows, _ = self.store.execute(
+                f'SELECT value FROM {self.table} WHERE value > ? ORDER BY value LIMIT {ITER_BATCH}', (last,)
+            )
+            if not rows:
+                return
+            for (value,) in rows:
+                yield value
+            last = rows[-1][0]
+
+    def clear(self):
+        with self.store.lock:
+            connection = self.store.connect()
+            connection.execute(f'DELETE FROM {self.table}')
+            connection.commit()
+            self.count = 0
+
+
+class DiskFrontier:
+    """Очередь доменов, ожидающих проверки, в таблице DiskStore (FIFO).
+
+    Выданный домен не удаляется, а помечается взятым (taken) и удаляется
+    после done_many, когда сайт проверен. Взятые, но не проверенные
+    домены (сканирование прервано) возвращаются в очередь release_taken.
+    """
+
+    def __init__(self, store, table='frontier'):
+        self.store = store
+        self.table = table
+        store.register(self.setup)
+
+    def setup(self, connection):
+        table = self.table
+        connection.execute(
+            f'CREATE TABLE IF NOT EXISTS {table} ('
+            'id INTEGER PRIMARY KEY AUTOINCREMENT, domain TEXT NOT NULL, taken INTEGER NOT NULL DEFAULT 0)'
+        )
+        # Таблица из версии без пометки взятых доменов
+        columns = connection.execute(f'PRAGMA table_info({table})').fetchall()
+        if 'taken' not in [column[1] for column in columns]:
+            connection.execute(f'ALTER TABLE {table} ADD COLUMN taken INTEGER NOT NULL DEFAULT 0')
+        connection.execute(f'CREATE INDEX IF NOT EXISTS {table}_domain ON {table} (domain)')
+
+    def push_many(self, domains):
+        self.store.executemany(f'INSERT INTO {self.table} (domain) VALUES (?)', [(domain,) for domain in domains])
+
+    def pop_many(self, limit):
+        """До limit доменов из начала очереди; выданные помечаются взятыми"""
+        with self.store.lock:
+            connection = self.store.connect()
+            rows = connection.execute(
+                f'SELECT id, domain FROM {self.table} WHERE taken = 0 ORDER BY id LIMIT ?', (limit,)
+            ).fetchall()
+            if rows:
+                connection.execute(f'UPDATE {self.table} SET taken = 1 WHERE taken = 0 AND id <= ?', (rows[-1][0],))
+                connection.commit()
+        return [domain for _, domain in rows]
+
+    def done_many(self, domains):
+        """Удаление проверенных доменов"""
+        self.store.executemany(f'DELETE FROM {self.table} WHERE domain = ?', [(domain,) for domain in domains])
+
+    def release_taken(self):
+        """Возврат взятых доменов в очередь; возвращает их список"""
+        with self.store.lock:
+            connection = self.store.connect()
+            rows = connection.execute(f'SELECT domain FROM {self.table} WHERE taken = 1').fetchall()
+            connection.execute(f'UPDATE {self.table} SET taken = 0 WHERE taken = 1')
+            connection.commit()
+        return [domain for (domain,) in rows]
+
+    def clear(self):
+        self.store.execute(f'DELETE FROM {self.table}')
+
+    def __len__(self):
+        rows, _ = self.store.execute(f'SELECT COUNT(*) FROM {self.table} WHERE taken = 0')
+        return rows[0][0]
+
+
+class DiskCheckpoint:
+    """Контрольная точка сканирования: словарь, сохраняемый в DiskStore как JSON"""
+
+    def __init__(self, store, table='checkpoint'):
+        self.store = store
+        self.table = table
+        store.register(self.setup)
+
+    def setup(self, connection):
+        connection.execute(f'CREATE TABLE IF NOT EXISTS {self.table} (key TEXT PRIMARY KEY, value TEXT NOT NULL)')
+
+    def save(self, data):
+        self.store.execute(f'INSERT OR REPLACE INTO {self.table} VALUES (?, ?)', ('campaign', json.dumps(data, ensure_ascii=False)))
+
+    def load(self):
+        """Сохранённый словарь или None"""
+        rows, _ = self.store.execute(f'SELECT value FROM {self.table} WHERE key = ?', ('campaign',))
+        return json.loads(rows[0][0]) if rows else None
+
+    def clear(self):
+        self.store.execute(f'DELETE FROM {self.table}')
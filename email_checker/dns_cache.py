@@ -0,0 +1,49 @@
+import json
+
+from sqlite_cache import SQLiteCache
+
+# Статусы резолвера, которые означают, что домена нет
+NEGATIVE_STATUSES = {'nxdomain', 'nodata', 'invalid'}
+
+
+class DNSCache(SQLiteCache):
+    """Кэш результатов DNS на диске (SQLite) между запусками.
+
+    Хранятся найденные адреса, NXDOMAIN (и NODATA) и SERVFAIL, у каждого
+    статуса своё время жизни: positive_ttl для живых доменов,
+    negative_ttl для несуществующих, servfail_ttl для сбоев сервера.
+    Таймауты не кэшируются - это чаще проблема нашей сети, чем домена.
+    """
+
+    table = 'dns'
+    key_column = 'domain'
+    value_columns = ('status TEXT NOT NULL', 'ips TEXT NOT NULL')
+
+    def __init__(self, path='dns_cache.sqlite', positive_ttl=6 * 3600, negative_ttl=3 * 86400, servfail_ttl=3600):
+        super().__init__(path)
+        self.positive_ttl = positive_ttl
+        self.negative_ttl = negative_ttl
+        self.servfail_ttl = servfail_ttl
+
+    def ttl_for(self, status):
+        if status == 'ok':
+            return self.positive_ttl
+        if status in NEGATIVE_STATUSES:
+            return self.negative_ttl
+        if status == 'servfail':
+            return self.servfail_ttl
+        return None
+
+    def get_many(self, domains):
+        """Неустаревшие записи для доменов: {domain: result} в формате AsyncDNSResolver"""
+        return {
+            domain: {'domain': domain, 'status': status, 'ips': json.loads(ips), 'ttl': None}
+            for domain, (status, ips) in self.get_rows(domains).items()
+        }
+
+    def put_many(self, results):
+        """Сохранение результатов резолвера; некэшируемые статусы пропускаются"""
+        self.put_rows(
+            (result['domain'], (result['status'], json.dumps(result['ips'])), self.ttl_for(result['status']))
+            for result in results
+        )
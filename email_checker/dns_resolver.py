@@ -0,0 +1,458 @@
+import asyncio
+import inspect
+import itertools
+import logging
+import os
+import random
+import socket
+import struct
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+QTYPE_A = 1
+QTYPE_AAAA = 28
+QCLASS_IN = 1
+
+RCODE_NOERROR = 0
+RCODE_NXDOMAIN = 3
+
+# Флаг TC: ответ не поместился в UDP-пакет, полный ответ - по TCP
+FLAG_TC = 0x0200
+
+# Одновременных запросов на один UDP-сокет: при большем числе пачка ответов
+# не помещается в приёмный буфер ядра и часть из них теряется
+QUERIES_PER_SOCKET = 200
+RECEIVE_BUFFER = 2 ** 20
+
+# Порция доменов, которая читается из источника и сверяется с кэшем за раз
+BATCH_SIZE = 256
+
+# Потоков getaddrinfo, если DNS-серверы системы узнать не удалось
+SYSTEM_RESOLVER_THREADS = 64
+
+# Параметры TCP/IP Windows: серверы, заданные вручную (NameServer) и по DHCP
+WINDOWS_TCPIP_KEY = r'SYSTEM\CurrentControlSet\Services\Tcpip\Parameters'
+
+
+def system_nameservers(path='/etc/resolv.conf'):
+    """DNS-серверы системы: из реестра в Windows, иначе из resolv.conf.
+
+    Пустой список - серверы не найдены; тогда AsyncDNSResolver
+    разрешает имена через getaddrinfo системы.
+    """
+    if os.name == 'nt':
+        return windows_nameservers()
+    nameservers = []
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) >= 2 and parts[0] == 'nameserver':
+                    nameservers.append((parts[1].split('%', 1)[0], 53))
+    except OSError:
+        pass
+    return nameservers
+
+
+def windows_nameservers():
+    """DNS-серверы Windows из реестра: общие параметры TCP/IP и каждого сетевого интерфейса"""
+    try:
+        import winreg
+    except ImportError:
+        return []
+
+    def read_servers(key):
+        servers = []
+        # Заданные вручную серверы важнее полученных по DHCP
+        for name in ('NameServer', 'DhcpNameServer'):
+            try:
+                value, _ = winreg.QueryValueEx(key, name)
+            except OSError:
+                continue
+            servers.extend(value.replace(',', ' ').split())
+            if servers:
+                break
+        return servers
+
+    addresses = []
+    try:
+        with winreg.OpenKey(winreg.HKEY_LOCAL_MACHINE, WINDOWS_TCPIP_KEY) as parameters:
+            addresses.extend(read_servers(parameters))
+            with winreg.OpenKey(parameters, 'Interfaces') as interfaces:
+                for index in itertools.count():
+                    try:
+                        name = winreg.EnumKey(interfaces, index)
+                    except OSError:
+                        break
+                    try:
+                        with winreg.OpenKey(interfaces, name) as interface:
+                            addresses.extend(read_servers(interface))
+                    except OSError:
+                        continue
+    except OSError as e:
+        logger.debug(f"Не удалось прочитать DNS-серверы из реестра: {e}")
+    return [(address, 53) for address in dict.fromkeys(addresses)]
+
+
+def encode_name(domain):
+    """Имя домена в формате DNS; UnicodeError для недопустимого имени"""
+    labels = domain.rstrip('.').encode('idna').split(b'.')
+    if not labels or any(not label or len(label) > 63 for label in labels):
+        raise UnicodeError(f"Недопустимое имя: {domain}")
+    return b''.join(bytes([len(label)]) + label for label in labels) + b'\0'
+
+
+def randomize_case(qname):
+    """Имя со случайным регистром букв (0x20): сервер повторяет вопрос как есть,
+    поэтому подделанный ответ должен угадать ещё и регистр"""
+    bits = random.getrandbits(len(qname))
+    return bytes(
+        byte ^ 0x20 if bits >> index & 1 and (0x41 <= byte <= 0x5A or 0x61 <= byte <= 0x7A) else byte
+        for index, byte in enumerate(qname)
+    )
+
+
+def build_query(query_id, qname, qtype):
+    """DNS-запрос с флагом RD (рекурсия) и одним вопросом"""
+    return struct.pack('!HHHHHH', query_id, 0x0100, 1, 0, 0, 0) + qname + struct.pack('!HH', qtype, QCLASS_IN)
+
+
+def skip_name(data, offset):
+    """Смещение сразу после имени (с учётом сжатия ссылками)"""
+    while True:
+        length = data[offset]
+        if length == 0:
+            return offset + 1
+        if length & 0xC0 == 0xC0:
+            return offset + 2
+        offset += 1 + length
+
+
+def is_truncated(data):
+    return bool(struct.unpack_from('!H', data, 2)[0] & FLAG_TC)
+
+
+def parse_response(data, qtype):
+    """(rcode, ips, ttl) из ответа сервера; ttl - минимальный среди записей"""
+    _, flags, qdcount, ancount, _, _ = struct.unpack_from('!HHHHHH', data)
+    rcode = flags & 0x000F
+    offset = 12
+    for _ in range(qdcount):
+        offset = skip_name(data, offset) + 4
+
+    ips = []
+    ttl = None
+    family = socket.AF_INET if qtype == QTYPE_A else socket.AF_INET6
+    for _ in range(ancount):
+        offset = skip_name(data, offset)
+        rtype, rclass, record_ttl, rdlength = struct.unpack_from('!HHIH', data, offset)
+        offset += 10
+        rdata = data[offset:offset + rdlength]
+        offset += rdlength
+        # CNAME и прочие записи цепочки пропускаем, берём только адреса
+        if rtype == qtype and rclass == QCLASS_IN:
+            ips.append(socket.inet_ntop(family, rdata))
+            ttl = record_ttl if ttl is None else min(ttl, record_ttl)
+    return rcode, ips, ttl
+
+
+class DNSProtocol(asyncio.DatagramProtocol):
+    """UDP-сокет к одному серверу; ответы сопоставляются с запросами по ID.
+
+    Вопрос в ответе должен совпасть с запросом вместе с регистром букв
+    (0x20). Если сервер прислал его в другом регистре, preserves_case
+    сбрасывается и следующие запросы идут без случайного регистра.
+    """
+
+    def __init__(self):
+        self.transport = None
+        self.pending = {}
+        self.preserves_case = True
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        if len(data) < 12:
+            return
+        query_id = struct.unpack_from('!H', data)[0]
+        entry = self.pending.get(query_id)
+        if entry is None:
+            return
+        question, future = entry
+        # Ответ должен повторять вопрос, иначе это чужой или подделанный пакет
+        echoed = data[12:12 + len(question)]
+        if echoed != question:
+            if echoed.lower() == question.lower():
+                self.preserves_case = False
+            return
+        if not future.done():
+            future.set_result(data)
+
+    def error_received(self, exc):
+        logger.debug(f"Ошибка DNS-сокета: {exc}")
+
+    def connection_lost(self, exc):
+        for _, future in self.pending.values():
+            if not future.done():
+                future.set_exception(ConnectionError("DNS-сокет закрыт"))
+
+    def next_query_id(self):
+        while True:
+            query_id = random.getrandbits(16)
+            if query_id not in self.pending:
+                return query_id
+
+
+class AsyncDNSResolver:
+    """Асинхронное разрешение имён по UDP без блокирующего getaddrinfo.
+
+    Запросы идут через несколько UDP-сокетов на сервер (по
+    QUERIES_PER_SOCKET одновременных запросов на сокет), поэтому
+    одновременных запросов могут быть тысячи при одном потоке. Каждая
+    попытка ограничена timeout секундами; при неудаче запрос повторяется
+    через следующий сервер (retries раз). При ipv6=True вместе с A запрашивается AAAA.
+    Обрезанный ответ (флаг TC) запрашивается повторно по TCP.
+
+    Если DNS-серверы системы узнать не удалось, имена разрешаются через
+    getaddrinfo в SYSTEM_RESOLVER_THREADS потоках: медленнее, зато так же,
+    как у браузера (например, в сети, где закрыт UDP-порт 53).
+
+    Если задан cache (DNSCache), домены сначала ищутся в нём, а новые
+    ответы сохраняются туда порциями.
+
+    Результат для домена - словарь:
+        {'domain', 'status', 'ips', 'ttl', 'cached'}
+    где status: 'ok', 'nxdomain', 'nodata', 'servfail', 'timeout' или 'invalid'.
+    """
+
+    def __init__(self, nameservers=None, concurrency=500, timeout=2.0, retries=1, ipv6=False, cache=None):
+        self.nameservers = [
+            ns if isinstance(ns, tuple) else (ns, 53)
+            for ns in (nameservers or system_nameservers())
+        ]
+        self.concurrency = max(1, concurrency)
+        self.timeout = timeout
+        self.retries = retries
+        self.qtypes = (QTYPE_A, QTYPE_AAAA) if ipv6 else (QTYPE_A,)
+        self.cache = cache
+        self.protocols = []
+        self.executor = None
+        if not self.nameservers:
+            logger.warning("⚠️ DNS-серверы системы не найдены: домены проверяются через getaddrinfo")
+
+    def resolve_many(self, domains, on_result=None):
+        """Синхронная точка входа: разрешение доменов в собственном event loop.
+
+        domains - любой итерируемый источник, в том числе ленивый генератор:
+        он читается порциями по мере освобождения воркеров.
+
+        on_result(result) вызывается по мере готовности; если он вернул True,
+        оставшиеся домены не запрашиваются. on_result может вернуть корутину -
+        тогда воркер ждёт её (так передаётся обратное давление следующей
+        стадии). Без on_result возвращается {domain: result}.
+        """
+        return asyncio.run(self.resolve_all(domains, on_result))
+
+    async def resolve_all(self, domains, on_result=None):
+        """Раздача доменов фиксированному числу корутин-воркеров"""
+        results = {}
+        fresh = []
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(maxsize=self.concurrency * 2)
+        stop = asyncio.Event()
+        domains = iter(domains)
+
+        def next_batch():
+            """Следующая порция доменов и уже известные для неё результаты из кэша"""
+            batch = list(itertools.islice(domains, BATCH_SIZE))
+            cached = self.cache.get_many(batch) if self.cache is not None and batch else {}
+            return batch, cached
+
+        async def producer():
+            while not stop.is_set():
+                # Источник может быть медленным генератором, поэтому читается вне event loop
+                batch, cached = await loop.run_in_executor(None, next_batch)
+                if not batch:
+                    break
+                for domain in batch:
+                    if stop.is_set():
+                        break
+                    await queue.put(cached.get(domain) or domain)
+            for _ in range(self.concurrency):
+                await queue.put(None)
+
+        async def worker():
+            nonlocal fresh
+            while True:
+                item = await queue.get()
+                if item is None:
+                    break
+                if stop.is_set():
+                    continue
+
+                if isinstance(item, dict):
+                    result = dict(item, cached=True)
+                else:
+                    result = await self.resolve(item)
+                    result['cached'] = False
+                    if self.cache is not None:
+                        fresh.append(result)
+                        if len(fresh) >= BATCH_SIZE:
+                            batch, fresh = fresh, []
+                            await loop.run_in_executor(None, self.cache.put_many, batch)
+
+                if on_result is None:
+                    results[result['domain']] = result
+                    continue
+                outcome = on_result(result)
+                if inspect.isawaitable(outcome):
+                    outcome = await outcome
+                if outcome:
+                    stop.set()
+
+        await self.open()
+        try:
+            await asyncio.gather(producer(), *(worker() for _ in range(self.concurrency)))
+        finally:
+            self.close()
+            if fresh:
+                self.cache.put_many(fresh)
+        return results
+
+    async def open(self):
+        """Сокеты к каждому серверу: self.protocols[i] - список сокетов i-го сервера"""
+        if not self.nameservers:
+            self.executor = ThreadPoolExecutor(SYSTEM_RESOLVER_THREADS, thread_name_prefix='getaddrinfo')
+            return
+        loop = asyncio.get_running_loop()
+        sockets_per_server = max(1, -(-self.concurrency * len(self.qtypes) // QUERIES_PER_SOCKET))
+        self.protocols = []
+        for host, port in self.nameservers:
+            server_protocols = []
+            for _ in range(sockets_per_server):
+                transport, protocol = await loop.create_datagram_endpoint(DNSProtocol, remote_addr=(host, port))
+                try:
+                    transport.get_extra_info('socket').setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, RECEIVE_BUFFER)
+                except OSError:
+                    pass
+                server_protocols.append(protocol)
+            self.protocols.append(server_protocols)
+
+    def close(self):
+        for server_protocols in self.protocols:
+            for protocol in server_protocols:
+                if protocol.transport is not None:
+                    protocol.transport.close()
+        self.protocols = []
+        if self.executor is not None:
+            # Зависший getaddrinfo не задерживает закрытие
+            self.executor.shutdown(wait=False)
+            self.executor = None
+
+    async def resolve(self, domain):
+        """Адреса домена по всем запрошенным типам записей"""
+        try:
+            qname = encode_name(domain)
+        except UnicodeError:
+            return {'domain': domain, 'status': 'invalid', 'ips': [], 'ttl': None}
+        if self.executor is not None:
+            return await self.resolve_system(domain)
+
+        answers = await asyncio.gather(*(self.query(qname, qtype) for qtype in self.qtypes))
+
+        ips = []
+        ttls = []
+        statuses = []
+        for status, found_ips, ttl in answers:
+            statuses.append(status)
+            ips.extend(found_ips)
+            if ttl is not None:
+                ttls.append(ttl)
+
+        if ips:
+            status = 'ok'
+        else:
+            # Самый определённый из ответов: несуществование важнее сбоя
+            for status in ('nxdomain', 'nodata', 'servfail', 'timeout'):
+                if status in statuses:
+                    break
+        return {'domain': domain, 'status': status, 'ips': ips, 'ttl': min(ttls) if ttls else None}
+
+    async def resolve_system(self, domain):
+        """Адреса домена через getaddrinfo системы (TTL неизвестен)"""
+        loop = asyncio.get_running_loop()
+        family = socket.AF_UNSPEC if QTYPE_AAAA in self.qtypes else socket.AF_INET
+        try:
+            infos = await asyncio.wait_for(
+                loop.run_in_executor(self.executor, socket.getaddrinfo, domain, None, family, socket.SOCK_STREAM),
+                self.timeout * (self.retries + 1)
+            )
+        except asyncio.TimeoutError:
+            status = 'timeout'
+        except socket.gaierror as e:
+            if e.errno == socket.EAI_NONAME:
+                status = 'nxdomain'
+            elif e.errno == getattr(socket, 'EAI_NODATA', None):
+                status = 'nodata'
+            elif e.errno == socket.EAI_AGAIN:
+                status = 'timeout'
+            else:
+                status = 'servfail'
+        except (OSError, UnicodeError):
+            status = 'servfail'
+        else:
+            ips = list(dict.fromkeys(info[4][0] for info in infos))
+            return {'domain': domain, 'status': 'ok' if ips else 'nodata', 'ips': ips, 'ttl': None}
+        return {'domain': domain, 'status': status, 'ips': [], 'ttl': None}
+
+    async def query_tcp(self, server, qname, qtype):
+        """Ответ сервера по TCP (для обрезанного UDP-ответа)"""
+        query = build_query(random.getrandbits(16), qname, qtype)
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(*server), self.timeout)
+        try:
+            writer.write(struct.pack('!H', len(query)) + query)
+            length = struct.unpack('!H', await asyncio.wait_for(reader.readexactly(2), self.timeout))[0]
+            return await asyncio.wait_for(reader.readexactly(length), self.timeout)
+        finally:
+            writer.close()
+
+    async def query(self, qname, qtype):
+        """(status, ips, ttl) для одного типа записи с повторами через другие серверы"""
+        loop = asyncio.get_running_loop()
+        start = random.randrange(len(self.protocols))
+        status = 'timeout'
+
+        for attempt in range(self.retries + 1):
+            server = (start + attempt) % len(self.protocols)
+            protocol = random.choice(self.protocols[server])
+            sent_name = randomize_case(qname) if protocol.preserves_case else qname
+            question = sent_name + struct.pack('!HH', qtype, QCLASS_IN)
+            query_id = protocol.next_query_id()
+            future = loop.create_future()
+            protocol.pending[query_id] = (question, future)
+            try:
+                protocol.transport.sendto(build_query(query_id, sent_name, qtype))
+                data = await asyncio.wait_for(future, self.timeout)
+                if is_truncated(data):
+                    data = await self.query_tcp(self.nameservers[server], qname, qtype)
+                rcode, ips, ttl = parse_response(data, qtype)
+            except asyncio.TimeoutError:
+                status = 'timeout'
+                continue
+            except (ConnectionError, OSError, asyncio.IncompleteReadError, struct.error, IndexError, ValueError) as e:
+                logger.debug(f"Ошибка DNS-запроса: {e}")
+                status = 'servfail'
+                continue
+            finally:
+                protocol.pending.pop(query_id, None)
+
+            if rcode == RCODE_NXDOMAIN:
+                return 'nxdomain', [], ttl
+            if rcode != RCODE_NOERROR:
+                status = 'servfail'
+                continue
+            return ('ok' if ips else 'nodata'), ips, ttl
+
+        return status, [], None
@@ -0,0 +1,25 @@
+from batch_writer import BatchWriter
+
+
+class EmailJournal(BatchWriter):
+    """Журнал новых уникальных email: файл только дописывается.
+
+    Воркеры сканера кладут адреса в очередь (append не ждёт диска),
+    отдельный поток пишет накопившиеся адреса порциями до batch_size
+    строк, одной записью на порцию. Отсортированный список
+    делается отдельно, экспортом в конце сканирования или по запросу.
+    """
+
+    error_message = "Ошибка записи журнала email"
+
+    def __init__(self, path='found_emails.journal', batch_size=500):
+        super().__init__(batch_size)
+        self.path = path
+
+    def append(self, emails):
+        for email in emails or ():
+            self.put(email)
+
+    def write_batch(self, resource, batch):
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.writelines(f"{email}\n" for email in batch)
@@ -0,0 +1,131 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from functools import partial
+
+from extractor import StreamingEmailExtractor
+
+
+def extract_batch(pages, max_emails=None, stop_at_footer=False):
+    """Поиск email в порции страниц (выполняется в дочернем процессе).
+
+    pages - [(тело в байтах, заявленная кодировка), ...]; результат -
+    список email для каждой страницы в том же порядке.
+    """
+    results = []
+    for body, encoding in pages:
+        extractor = StreamingEmailExtractor(encoding, max_emails=max_emails, stop_at_footer=stop_at_footer)
+        extractor.feed(body)
+        results.append(extractor.finish())
+    return results
+
+
+class ExtractionPool:
+    """Пул процессов для поиска email в загруженных страницах.
+
+    Загрузка остаётся в родительском процессе; тела страниц копятся и
+    отправляются в пул порциями по batch_size (или раз в max_delay
+    секунд, если порция не набралась), так что расходы на передачу между
+    процессами делятся на несколько страниц. submit возвращает Future
+    со списком email страницы.
+
+    Процессы запускаются через spawn: fork процесса, в котором уже
+    работают потоки загрузки, небезопасен, а в Windows spawn - единственный
+    вариант.
+    """
+
+    def __init__(self, processes=None, batch_size=16, max_delay=0.02, max_emails=None, stop_at_footer=False):
+        self.processes = processes or os.cpu_count() or 1
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self.max_emails = max_emails
+        self.stop_at_footer = stop_at_footer
+        self.executor = ProcessPoolExecutor(self.processes, mp_context=multiprocessing.get_context('spawn'))
+        self.pending = []
+        self.lock = threading.Lock()
+        self.closed = threading.Event()
+        self.flusher = threading.Thread(target=self.flush_loop, daemon=True)
+        self.flusher.start()
+
+    def submit(self, body, encoding=None):
+        future = Future()
+        with self.lock:
+            self.pending.append((body, encoding, future))
+            if len(self.pending) < self.batch_size:
+                return future
+            batch, self.pending = self.pending, []
+        self.send(batch)
+        return future
+
+    def flush(self):
+        with self.lock:
+            batch, self.pending = self.pending, []
+        if batch:
+            self.send(batch)
+
+    def flush_loop(self):
+        while not self.closed.wait(self.max_delay):
+            self.flush()
+
+    def send(self, batch):
+        futures = [future for _, _, future in batch]
+        try:
+            batch_future = self.executor.submit(
+                extract_batch, [(body, encoding) for body, encoding, _ in batch], self.max_emails, self.stop_at_footer
+            )
+        except Exception as e:
+            for future in futures:
+                future.set_exception(e)
+            return
+        batch_future.add_done_callback(partial(self.distribute, futures))
+
+    def distribute(self, futures, batch_future):
+        error = batch_future.exception()
+        if error is not None:
+            for future in futures:
+                future.set_exception(error)
+            return
+        for future, emails in zip(futures, batch_future.result()):
+            future.set_result(emails)
+
+    def close(self):
+        """Обработка оставшихся страниц и остановка процессов"""
+        self.closed.set()
+        self.flusher.join()
+        self.flush()
+        self.executor.shutdown(wait=True)
+
+
+class PageBuffer:
+    """Тело страницы для ExtractionPool с интерфейсом StreamingEmailExtractor.
+
+    feed только накапливает части: политики ранней остановки применяются
+    в дочернем процессе, поэтому страница читается в пределах бюджета
+    целиком. finish ждёт результата (потоковый движок), асинхронный
+    движок вместо этого ждёт Future из submit и кладёт результат в found.
+    """
+
+    def __init__(self, pool, encoding=None):
+        self.pool = pool
+        self.encoding = encoding
+        self.chunks = []
+        self.found = []
+
+    def feed(self, chunk, final=False):
+        if chunk:
+            self.chunks.append(chunk)
+        return False
+
+    def submit(self):
+        body = b''.join(self.chunks)
+        self.chunks = []
+        return self.pool.submit(body, self.encoding)
+
+    def finish(self):
+        self.found = self.submit().result()
+        return self.emails
+
+    @property
+    def emails(self):
+        return list(self.found)
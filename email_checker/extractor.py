@@ -0,0 +1,238 @@
+import codecs
+import re
+
+from tlds import KNOWN_TLDS
+
+# Поиск идёт от символа @: шаблон с литеральным префиксом regex-движок
+# проматывает быстрым поиском подстроки, а не пробует совпадение с каждой
+# позиции текста. Локальная часть добирается назад от @ вручную.
+# mailto:-ссылки находятся этим же проходом.
+#
+# Адреса состоят только из ASCII, поэтому для ASCII-совместимых кодировок
+# (utf-8, windows-1251, koi8-r, iso-8859-*) шаблон применяется прямо к
+# байтам страницы и декодируются только найденные фрагменты.
+DOMAIN_PATTERN = re.compile(r'@((?:[A-Za-z0-9-]{1,63}\.)+[A-Za-z]{2,24})(?![A-Za-z0-9-])')
+DOMAIN_PATTERN_BYTES = re.compile(DOMAIN_PATTERN.pattern.encode('ascii'))
+LOCAL_CHARS = frozenset('ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789._%+-')
+LOCAL_BYTES = frozenset(''.join(LOCAL_CHARS).encode('ascii'))
+MAX_LOCAL_LENGTH = 64
+FOOTER_END_PATTERN = re.compile(r'</footer\s*>', re.IGNORECASE)
+FOOTER_END_PATTERN_BYTES = re.compile(rb'</footer\s*>', re.IGNORECASE)
+
+# Символы, из которых может состоять email
+EMAIL_CHARS = LOCAL_CHARS | {'@'}
+EMAIL_BYTES = LOCAL_BYTES | {ord('@')}
+
+# BOM кодировок, в которых ASCII-символы занимают больше одного байта
+WIDE_BOMS = [
+    (codecs.BOM_UTF32_LE, 'utf-32'),
+    (codecs.BOM_UTF32_BE, 'utf-32'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+]
+
+# Дольше этого непрерывная последовательность email-символов не буферизуется
+MAX_TOKEN_LENGTH = 1024
+
+# Окончания ресурсов: logo@2x.png, icon@3x.webp, bundle@1.2.js и т.п.
+ASSET_SUFFIXES = frozenset('''
+    png jpg jpeg gif svg webp bmp ico tif tiff avif heic
+    css js mjs map json xml txt woff woff2 ttf eot otf
+    mp3 mp4 m4a mov avi webm ogg wav flv pdf zip rar gz tgz 7z
+'''.split())
+
+
+def normalize_email(candidate):
+    """Нормализация найденного адреса: None, если это не email.
+
+    Домен приводится к нижнему регистру, локальная часть сохраняется как есть.
+    Отбрасываются адреса ресурсов (logo@2x.png), TLD не из корневой зоны
+    (tlds.KNOWN_TLDS) и синтаксически невозможные локальные части и метки
+    домена.
+    """
+    local, _, domain = candidate.rpartition('@')
+    domain = domain.lower()
+    tld = domain.rsplit('.', 1)[-1]
+
+    if tld in ASSET_SUFFIXES or tld not in KNOWN_TLDS:
+        return None
+    if local.startswith('.') or local.endswith('.') or '..' in local:
+        return None
+    if len(domain) > 253:
+        return None
+    for label in domain.split('.'):
+        if label.startswith('-') or label.endswith('-'):
+            return None
+
+    return f"{local}@{domain}"
+
+
+def is_ascii_compatible(encoding):
+    """Совпадают ли ASCII-символы в этой кодировке с их байтами"""
+    try:
+        return 'a.b-c_1@x.com'.encode(encoding) == b'a.b-c_1@x.com'
+    except (LookupError, UnicodeError):
+        return False
+
+
+def extract_emails(data, start=0, end=None):
+    """Все уникальные корректные адреса в data[start:end] за один проход.
+
+    data может быть str или bytes в ASCII-совместимой кодировке; во втором
+    случае страница не декодируется, декодируются только найденные адреса.
+    """
+    if isinstance(data, str):
+        pattern, local_chars = DOMAIN_PATTERN, LOCAL_CHARS
+    else:
+        pattern, local_chars = DOMAIN_PATTERN_BYTES, LOCAL_BYTES
+
+    emails = set()
+    for match in pattern.finditer(data, start, len(data) if end is None else end):
+        at = match.start()
+        local_start = at
+        limit = max(start, at - MAX_LOCAL_LENGTH - 1)
+        while local_start > limit and data[local_start - 1] in local_chars:
+            local_start -= 1
+        # Пустая или слишком длинная локальная часть - это не адрес
+        if local_start == at or at - local_start > MAX_LOCAL_LENGTH:
+            continue
+        if local_start > start and data[local_start - 1] in local_chars:
+            continue
+
+        candidate = data[local_start:match.end()]
+        if not isinstance(candidate, str):
+            candidate = candidate.decode('ascii')
+        email = normalize_email(candidate)
+        if email:
+            emails.add(email)
+    return emails
+
+
+class StreamingEmailExtractor:
+    """Поиск email в странице по мере её загрузки.
+
+    Части тела подаются в feed() в том виде, в каком приходят из сети.
+    Хвост, который может оказаться началом адреса, разрезанного границей
+    частей, откладывается до следующей части, поэтому результат совпадает
+    с extract_emails() по целой странице.
+
+    Для ASCII-совместимых кодировок поиск идёт прямо по байтам, без
+    декодирования. Текстовый режим с инкрементальным декодером включается
+    только для UTF-16/UTF-32 (по заявленной кодировке или по BOM).
+
+    Политики ранней остановки:
+        max_emails - остановиться после N уникальных адресов;
+        stop_at_footer - остановиться после закрывающего </footer>.
+    """
+
+    def __init__(self, encoding=None, max_emails=None, stop_at_footer=False):
+        self.max_emails = max_emails
+        self.stop_at_footer = stop_at_footer
+        self.found = set()
+        self.skipping_token = False
+        self.started = False
+        self.done = False
+        self.use_bytes()
+        if encoding and not is_ascii_compatible(encoding):
+            self.use_text(encoding)
+
+    def use_bytes(self):
+        """Поиск по сырым байтам"""
+        self.decoder = None
+        self.email_chars = EMAIL_BYTES
+        self.footer_pattern = FOOTER_END_PATTERN_BYTES
+        # Необработанный хвост; первый символ - контекст для начала адреса, если has_context
+        self.pending = b''
+        self.has_context = False
+        self.footer_tail = b''
+
+    def use_text(self, encoding):
+        """Поиск по тексту для кодировок, несовместимых с ASCII"""
+        try:
+            self.decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+        except LookupError:
+            self.decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        self.email_chars = EMAIL_CHARS
+        self.footer_pattern = FOOTER_END_PATTERN
+        self.pending = ''
+        self.has_context = False
+        self.footer_tail = ''
+
+    def feed(self, chunk, final=False):
+        """Обработка очередной части тела; возвращает True, если дальше читать не нужно"""
+        if self.done:
+            return True
+
+        if not self.started and chunk:
+            self.started = True
+            if self.decoder is None:
+                for bom, encoding in WIDE_BOMS:
+                    if chunk.startswith(bom):
+                        self.use_text(encoding)
+                        break
+
+        data = self.decoder.decode(chunk, final) if self.decoder else chunk
+        if self.skipping_token:
+            # Дочитываем слишком длинную последовательность до её конца
+            index = 0
+            while index < len(data) and data[index] in self.email_chars:
+                index += 1
+            if index == len(data) and not final:
+                return False
+            data = data[index:]
+            self.skipping_token = False
+
+        text = self.pending + data
+        start = 1 if self.has_context else 0
+
+        if final:
+            boundary = len(text)
+        else:
+            # Граница - сразу после последнего символа, который не может входить в email
+            boundary = len(text)
+            while boundary > start and text[boundary - 1] in self.email_chars:
+                boundary -= 1
+
+        self.scan(text, start, boundary)
+
+        if final:
+            self.done = True
+        elif len(text) - boundary > MAX_TOKEN_LENGTH:
+            # Такой длинный токен не может быть адресом: пропускаем его целиком
+            self.pending = text[:0]
+            self.has_context = False
+            self.skipping_token = True
+        elif boundary > start:
+            self.pending = text[boundary - 1:]
+            self.has_context = True
+        else:
+            self.pending = text
+
+        return self.done
+
+    def scan(self, text, start, end):
+        """Поиск в уже полностью полученном участке text[start:end]"""
+        if end <= start:
+            return
+
+        self.found.update(extract_emails(text, start, end))
+
+        if self.max_emails and len(self.found) >= self.max_emails:
+            self.done = True
+        if self.stop_at_footer:
+            # Тег тоже может быть разрезан границей частей
+            region = self.footer_tail + text[start:end]
+            if self.footer_pattern.search(region):
+                self.done = True
+            self.footer_tail = region[-16:]
+
+    def finish(self):
+        """Обработка оставшегося хвоста после конца тела"""
+        if not self.done:
+            self.feed(b'', final=True)
+        return self.emails
+
+    @property
+    def emails(self):
+        """Найденные уникальные адреса"""
+        return list(self.found)
@@ -1,6 +1,7 @@
 import tkinter as tk
 from tkinter import ttk, scrolledtext, messagebox, filedialog
 import threading
+import multiprocessing
 import json
 import time
 from datetime import datetime
@@ -19,21 +20,30 @@ except ImportError as e:
     
     # Заглушка для тестирования GUI
     class MassWebsiteEmailScanner:
-        def __init__(self, proxies=None, max_workers=20):
+        def __init__(self, proxies=None, max_workers=20, scale_mode=False, state_dir='scan_state', memory_budget_mb=None):
             self.stats = {
                 'total_sites_checked': 0,
                 'sites_with_emails': 0,
                 'total_emails_found': 0,
                 'start_time': datetime.now().isoformat(),
                 'sites_processed': 0,
-                'search_sites_found': 0
+                'search_sites_found': 0,
+                'unique_emails': 0
             }
             self.found_emails = set()
             self.stop_event = threading.Event()
             self.proxies = proxies
             self.max_workers = max_workers
+            self.scale_mode = scale_mode
+            self.adaptive_concurrency = True
             
-        def run_mass_scan(self, total_sites=1000, search_query=None):
+        def enable_politeness(self, per_host=1, per_ip=4, min_delay=0.0, max_delay=10.0):
+            self.log_message(f"🔧 ТЕСТОВЫЙ РЕЖИМ: вежливый режим, до {per_ip} загрузок на IP")
+        
+        def set_timeouts(self, connect=None, tls=None, first_byte=None, total=None):
+            self.log_message(f"🔧 ТЕСТОВЫЙ РЕЖИМ: таймауты {connect}/{tls}/{first_byte}/{total}")
+        
+        def run_mass_scan(self, total_sites=1000, search_query=None, engine='threads', resume=False):
             # Имитация работы сканера для тестирования GUI
             self.log_message(f"🔧 ТЕСТОВЫЙ РЕЖИМ: Запуск сканирования {total_sites} сайтов")
             if search_query:
@@ -55,6 +65,7 @@ except ImportError as e:
                     email = f"contact{i}@example.com"
                     self.found_emails.add(email)
                     self.stats['total_emails_found'] = len(self.found_emails)
+                    self.stats['unique_emails'] = len(self.found_emails)
                     self.stats['sites_with_emails'] += 1
                     self.log_message(f"🎯 Найден email: {email}")
                 
@@ -64,6 +75,14 @@ except ImportError as e:
             
             self.log_message("✅ Тестовое сканирование завершено")
         
+        def reset_visited(self):
+            self.log_message("🔧 ТЕСТОВЫЙ РЕЖИМ: список проверенных доменов очищен")
+        
+        def export_emails(self, filename):
+            with open(filename, 'w', encoding='utf-8') as f:
+                for email in sorted(self.found_emails):
+                    f.write(f"{email}\n")
+        
         def log_message(self, message):
             # В реальном сканере это будет работать через logging
             print(f"[SCANNER] {message}")
@@ -144,6 +163,54 @@ class EmailScannerGUI:
         ttk.Radiobutton(settings_frame, text="С прокси", variable=self.proxy_mode, value="with_proxy").grid(row=3, column=1, sticky=tk.W, pady=2)
         ttk.Radiobutton(settings_frame, text="Без прокси", variable=self.proxy_mode, value="without_proxy").grid(row=3, column=2, sticky=tk.W, pady=2)
         
+        # Движок загрузки
+        ttk.Label(settings_frame, text="Движок:").grid(row=4, column=0, sticky=tk.W, pady=2)
+        self.engine_var = tk.StringVar(value="threads")
+        ttk.Radiobutton(settings_frame, text="Потоки (до 500)", variable=self.engine_var, value="threads").grid(row=4, column=1, sticky=tk.W, pady=2)
+        ttk.Radiobutton(settings_frame, text="Asyncio (до 5000)", variable=self.engine_var, value="async").grid(row=4, column=2, sticky=tk.W, pady=2)
+        
+        # Режим масштаба: состояние на диске, ограничение памяти
+        self.scale_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(settings_frame, text="Режим масштаба (до 10 млн сайтов, состояние на диске)",
+                        variable=self.scale_var).grid(row=5, column=0, columnspan=2, sticky=tk.W, pady=2)
+        memory_frame = ttk.Frame(settings_frame)
+        memory_frame.grid(row=5, column=2, sticky=tk.W, pady=2)
+        ttk.Label(memory_frame, text="Память, МБ:").grid(row=0, column=0, sticky=tk.W)
+        self.memory_var = tk.StringVar(value="1024")
+        ttk.Entry(memory_frame, textvariable=self.memory_var, width=8).grid(row=0, column=1, sticky=tk.W, padx=(5, 0))
+        
+        # Продолжение прерванного сканирования из контрольной точки
+        self.resume_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(settings_frame, text="Продолжить прерванное сканирование (запрос и число сайтов - как в нём)",
+                        variable=self.resume_var).grid(row=6, column=0, columnspan=3, sticky=tk.W, pady=2)
+        
+        # Вежливый режим: robots.txt, паузы crawl-delay, ограничение загрузок на хост и IP
+        self.polite_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(settings_frame, text="Вежливый режим (robots.txt, не больше 4 загрузок на IP хостинга)",
+                        variable=self.polite_var).grid(row=7, column=0, columnspan=3, sticky=tk.W, pady=2)
+        
+        # Таймауты фаз загрузки: пустое поле - подбираются по задержкам сайтов в этом запуске
+        ttk.Label(settings_frame, text="Таймауты, с:").grid(row=8, column=0, sticky=tk.W, pady=2)
+        timeouts_frame = ttk.Frame(settings_frame)
+        timeouts_frame.grid(row=8, column=1, columnspan=2, sticky=tk.W, pady=2, padx=(5, 0))
+        self.timeout_vars = {}
+        timeout_fields = [
+            ("подключение", "connect"),
+            ("TLS", "tls"),
+            ("первый байт", "first_byte"),
+            ("загрузка", "total")
+        ]
+        for i, (label, phase) in enumerate(timeout_fields):
+            ttk.Label(timeouts_frame, text=label).grid(row=0, column=i*2, sticky=tk.W, padx=(0 if i == 0 else 10, 0))
+            self.timeout_vars[phase] = tk.StringVar()
+            ttk.Entry(timeouts_frame, textvariable=self.timeout_vars[phase], width=5).grid(row=0, column=i*2+1, sticky=tk.W, padx=(5, 0))
+        ttk.Label(timeouts_frame, text="(пусто - авто)").grid(row=0, column=len(timeout_fields)*2, sticky=tk.W, padx=(10, 0))
+        
+        # Число одновременных загрузок подбирается по скорости, ошибкам и загрузке CPU
+        self.adaptive_var = tk.BooleanVar(value=True)
+        ttk.Checkbutton(settings_frame, text="Подбирать число загрузок автоматически (количество потоков - верхний предел)",
+                        variable=self.adaptive_var).grid(row=9, column=0, columnspan=3, sticky=tk.W, pady=2)
+        
         # Фрейм управления
         control_frame = ttk.Frame(main_frame)
         control_frame.grid(row=2, column=0, columnspan=3, sticky=(tk.W, tk.E), pady=(0, 10))
@@ -158,6 +225,10 @@ class EmailScannerGUI:
         self.export_button = ttk.Button(control_frame, text="💾 Экспорт email", command=self.export_emails)
         self.export_button.grid(row=0, column=2, padx=(0, 10))
         
+        # Домены, проверенные в прошлых запусках, пропускаются; кнопка очищает их список
+        self.reset_visited_button = ttk.Button(control_frame, text="🧹 Забыть проверенные домены", command=self.reset_visited)
+        self.reset_visited_button.grid(row=0, column=3, padx=(0, 10))
+        
         # Фрейм прогресса
         progress_frame = ttk.LabelFrame(main_frame, text="Прогресс сканирования", padding="10")
         progress_frame.grid(row=3, column=0, columnspan=3, sticky=(tk.W, tk.E), pady=(0, 10))
@@ -189,7 +260,9 @@ class EmailScannerGUI:
             ("Сайтов с email:", "sites_with_emails"),
             ("Найдено email:", "emails_found"),
             ("Уникальных email:", "unique_emails"),
-            ("Сайтов из поиска:", "search_sites")
+            ("Сайтов из поиска:", "search_sites"),
+            ("Таймауты (подкл./TLS/ответ/всего), с:", "timeouts"),
+            ("Одновременных загрузок:", "concurrency")
         ]
         
         for i, (label, key) in enumerate(stats_data):
@@ -280,6 +353,15 @@ class EmailScannerGUI:
                     self.sites_var.set(config.get('sites_count', '100'))
                     self.threads_var.set(config.get('threads_count', '10'))
                     self.proxy_mode.set(config.get('proxy_mode', 'with_proxy'))
+                    self.engine_var.set(config.get('engine', 'threads'))
+                    self.scale_var.set(config.get('scale_mode', False))
+                    self.memory_var.set(config.get('memory_budget_mb', '1024'))
+                    self.resume_var.set(config.get('resume', False))
+                    self.polite_var.set(config.get('polite', False))
+                    self.adaptive_var.set(config.get('adaptive_concurrency', True))
+                    for phase, value in config.get('timeouts', {}).items():
+                        if phase in self.timeout_vars:
+                            self.timeout_vars[phase].set(value)
         except Exception as e:
             self.log_message(f"Ошибка загрузки конфигурации: {e}", "ERROR")
     
@@ -290,7 +372,14 @@ class EmailScannerGUI:
                 'search_query': self.search_var.get(),
                 'sites_count': self.sites_var.get(),
                 'threads_count': self.threads_var.get(),
-                'proxy_mode': self.proxy_mode.get()
+                'proxy_mode': self.proxy_mode.get(),
+                'engine': self.engine_var.get(),
+                'scale_mode': self.scale_var.get(),
+                'memory_budget_mb': self.memory_var.get(),
+                'resume': self.resume_var.get(),
+                'polite': self.polite_var.get(),
+                'adaptive_concurrency': self.adaptive_var.get(),
+                'timeouts': {phase: var.get() for phase, var in self.timeout_vars.items()}
             }
             with open('scanner_config.json', 'w', encoding='utf-8') as f:
                 json.dump(config, f, ensure_ascii=False, indent=2)
@@ -303,12 +392,24 @@ class EmailScannerGUI:
             sites = int(self.sites_var.get())
             threads = int(self.threads_var.get())
             
-            if sites <= 0 or sites > 10000:
-                messagebox.showerror("Ошибка", "Количество сайтов должно быть от 1 до 10000")
+            # Без режима масштаба всё состояние в памяти, поэтому предел ниже
+            max_sites = 10000000 if self.scale_var.get() else 10000
+            if sites <= 0 or sites > max_sites:
+                messagebox.showerror("Ошибка", f"Количество сайтов должно быть от 1 до {max_sites}")
+                return False
+            
+            if self.scale_var.get() and int(self.memory_var.get()) < 256:
+                messagebox.showerror("Ошибка", "Бюджет памяти должен быть не меньше 256 МБ")
                 return False
                 
-            if threads <= 0 or threads > 100:
-                messagebox.showerror("Ошибка", "Количество потоков должно быть от 1 до 100")
+            # Асинхронный движок не создаёт поток на каждый запрос
+            max_threads = 5000 if self.engine_var.get() == "async" else 500
+            if threads <= 0 or threads > max_threads:
+                messagebox.showerror("Ошибка", f"Количество потоков должно быть от 1 до {max_threads}")
+                return False
+            
+            if any(value is not None and value <= 0 for value in self.timeout_overrides().values()):
+                messagebox.showerror("Ошибка", "Таймауты должны быть больше нуля (или пустыми)")
                 return False
                 
             return True
@@ -317,6 +418,13 @@ class EmailScannerGUI:
             messagebox.showerror("Ошибка", "Введите корректные числовые значения")
             return False
     
+    def timeout_overrides(self):
+        """Таймауты фаз из полей интерфейса: {фаза: секунды или None}"""
+        return {
+            phase: float(var.get().replace(',', '.')) if var.get().strip() else None
+            for phase, var in self.timeout_vars.items()
+        }
+    
     def start_scan(self):
         """Запуск сканирования"""
         if not self.validate_inputs():
@@ -336,6 +444,13 @@ class EmailScannerGUI:
             
         total_sites = int(self.sites_var.get())
         max_workers = int(self.threads_var.get())
+        engine = self.engine_var.get()
+        scale_mode = self.scale_var.get()
+        memory_budget_mb = int(self.memory_var.get()) if scale_mode else None
+        resume = self.resume_var.get()
+        polite = self.polite_var.get()
+        timeouts = self.timeout_overrides()
+        adaptive = self.adaptive_var.get()
         
         # Список прокси
         proxy_list = []
@@ -347,7 +462,16 @@ class EmailScannerGUI:
         
         # Создание сканера
         try:
-            self.scanner = MassWebsiteEmailScanner(proxies=proxy_list, max_workers=max_workers)
+            self.scanner = MassWebsiteEmailScanner(
+                proxies=proxy_list,
+                max_workers=max_workers,
+                scale_mode=scale_mode,
+                memory_budget_mb=memory_budget_mb
+            )
+            if polite:
+                self.scanner.enable_politeness()
+            self.scanner.set_timeouts(**timeouts)
+            self.scanner.adaptive_concurrency = adaptive
             self.log_message("✅ Сканер инициализирован успешно", "SUCCESS")
         except Exception as e:
             self.log_message(f"❌ Ошибка инициализации сканера: {e}", "ERROR")
@@ -357,6 +481,7 @@ class EmailScannerGUI:
         self.is_scanning = True
         self.start_button.config(state=tk.DISABLED)
         self.stop_button.config(state=tk.NORMAL)
+        self.reset_visited_button.config(state=tk.DISABLED)
         self.progress_var.set(0)
         self.start_time = datetime.now()
         self.log_counter = 0
@@ -372,15 +497,25 @@ class EmailScannerGUI:
         if search_query:
             self.log_message(f"🔍 Поисковый запрос: {search_query}")
         self.log_message(f"📊 Целевое количество сайтов: {total_sites}")
-        self.log_message(f"⚡ Количество потоков: {max_workers}")
+        self.log_message(f"⚡ Количество потоков: {max_workers}{' (предел, число загрузок - автоматически)' if adaptive else ''}")
+        self.log_message(f"⚙️ Движок: {'Asyncio' if engine == 'async' else 'Потоки'}")
         self.log_message(f"🔗 Режим прокси: {'Включен' if proxy_list else 'Выключен'}")
+        if scale_mode:
+            self.log_message(f"💽 Режим масштаба: состояние в {self.scanner.state_dir}, память до {memory_budget_mb} МБ")
+        if polite:
+            self.log_message("🤝 Вежливый режим: robots.txt и не больше 4 загрузок на IP")
+        if any(value is not None for value in timeouts.values()):
+            fixed = ', '.join(f"{phase} {value:g} с" for phase, value in timeouts.items() if value is not None)
+            self.log_message(f"⏱️ Заданные таймауты: {fixed} (остальные - по задержкам сайтов)")
+        if resume:
+            self.log_message("♻️ Продолжение прерванного сканирования, если оно есть")
         if not SCANNER_AVAILABLE:
             self.log_message("🔧 РЕЖИМ ТЕСТИРОВАНИЯ: Используется заглушка сканера", "WARNING")
         
         # Запуск потока сканирования
         self.scan_thread = threading.Thread(
             target=self.run_scan,
-            args=(total_sites, search_query),
+            args=(total_sites, search_query, engine, resume),
             daemon=True
         )
         self.scan_thread.start()
@@ -391,10 +526,10 @@ class EmailScannerGUI:
         # Запуск таймера
         self.update_time()
     
-    def run_scan(self, total_sites, search_query):
+    def run_scan(self, total_sites, search_query, engine='threads', resume=False):
         """Запуск сканирования в отдельном потоке"""
         try:
-            self.scanner.run_mass_scan(total_sites=total_sites, search_query=search_query)
+            self.scanner.run_mass_scan(total_sites=total_sites, search_query=search_query, engine=engine, resume=resume)
         except Exception as e:
             self.log_message(f"❌ Критическая ошибка при сканировании: {e}", "ERROR")
         finally:
@@ -409,22 +544,29 @@ class EmailScannerGUI:
         
         if self.scanner:
             try:
-                # Обновление статистики
-                stats = self.scanner.stats
+                # Обновление статистики: согласованный снимок, а не чтение по полям во время работы
+                stats = self.scanner_stats()
                 self.stats_vars['sites_checked'].set(str(stats['sites_processed']))
                 self.stats_vars['sites_with_emails'].set(str(stats['sites_with_emails']))
                 self.stats_vars['emails_found'].set(str(stats['total_emails_found']))
-                self.stats_vars['unique_emails'].set(str(len(self.scanner.found_emails)))
+                # Счётчик из статистики: len(found_emails) в режиме масштаба - запрос к базе на диске
+                self.stats_vars['unique_emails'].set(str(stats['unique_emails']))
                 self.stats_vars['search_sites'].set(str(stats.get('search_sites_found', 0)))
+                if stats.get('concurrency'):
+                    self.stats_vars['concurrency'].set(f"{stats['concurrency']} из {self.scanner.max_workers}")
+                timeouts = getattr(self.scanner, 'timeouts', None)
+                if timeouts is not None:
+                    self.stats_vars['timeouts'].set('/'.join(f"{value:g}" for value in timeouts.snapshot().values()))
                 
-                # Обновление прогресса
-                total_sites = int(self.sites_var.get())
+                # Обновление прогресса (при продолжении - число сайтов из контрольной точки)
+                campaign = getattr(self.scanner, 'campaign', None)
+                total_sites = campaign['total_sites'] if campaign else int(self.sites_var.get())
                 if total_sites > 0:
                     progress = (stats['sites_processed'] / total_sites) * 100
                     self.progress_var.set(min(progress, 100))
                 
                 # Обновление статуса
-                self.status_var.set(f"Обработано: {stats['sites_processed']}/{total_sites} | Найдено email: {len(self.scanner.found_emails)}")
+                self.status_var.set(f"Обработано: {stats['sites_processed']}/{total_sites} | Найдено email: {stats['unique_emails']}")
             except Exception as e:
                 print(f"Ошибка обновления статистики: {e}")
         
@@ -432,6 +574,11 @@ class EmailScannerGUI:
         if self.is_scanning:
             self.root.after(1000, self.monitor_progress)
     
+    def scanner_stats(self):
+        """Копия статистики сканера (у заглушки stats - обычный словарь)"""
+        stats = self.scanner.stats
+        return stats.snapshot() if hasattr(stats, 'snapshot') else dict(stats)
+    
     def update_time(self):
         """Обновление времени работы"""
         if self.is_scanning and self.start_time:
@@ -454,24 +601,47 @@ class EmailScannerGUI:
             self.start_button.config(state=tk.NORMAL)
             self.stop_button.config(state=tk.DISABLED)
     
+    def reset_visited(self):
+        """Очистка списка доменов, проверенных в прошлых запусках"""
+        # После остановки поток сканирования ещё сохраняет фильтр
+        if self.is_scanning or (self.scan_thread and self.scan_thread.is_alive()):
+            messagebox.showwarning("Внимание", "Дождитесь окончания сканирования")
+            return
+        if not messagebox.askyesno("Проверенные домены", "Очистить список проверенных доменов? Они будут проверены заново."):
+            return
+        try:
+            scanner = self.scanner or MassWebsiteEmailScanner()
+            scanner.reset_visited()
+            self.log_message("🧹 Список проверенных доменов очищен", "SUCCESS")
+        except Exception as e:
+            self.log_message(f"❌ Ошибка очистки проверенных доменов: {e}", "ERROR")
+    
     def scanning_finished(self):
         """Завершение сканирования"""
         self.is_scanning = False
         self.start_button.config(state=tk.NORMAL)
         self.stop_button.config(state=tk.DISABLED)
+        self.reset_visited_button.config(state=tk.NORMAL)
         
         if self.scanner:
             # Вывод финальной статистики
             self.log_message("=" * 50)
             self.log_message("📊 СКАНИРОВАНИЕ ЗАВЕРШЕНО", "SUCCESS")
             self.log_message("=" * 50)
-            self.log_message(f"✅ Всего проверено сайтов: {self.scanner.stats['total_sites_checked']}")
-            self.log_message(f"🎯 Сайтов с email: {self.scanner.stats['sites_with_emails']}")
-            self.log_message(f"📧 Всего найдено email: {self.scanner.stats['total_emails_found']}")
+            stats = self.scanner_stats()
+            self.log_message(f"✅ Всего проверено сайтов: {stats['total_sites_checked']}")
+            self.log_message(f"🎯 Сайтов с email: {stats['sites_with_emails']}")
+            self.log_message(f"📧 Всего найдено email: {stats['total_emails_found']}")
             self.log_message(f"🔑 Уникальных email: {len(self.scanner.found_emails)}")
+            if stats.get('visited_skipped'):
+                self.log_message(f"⏭️ Пропущено уже проверенных доменов: {stats['visited_skipped']}")
+            if stats.get('robots_blocked'):
+                self.log_message(f"🤖 Запрещено в robots.txt: {stats['robots_blocked']}")
             
-            # Показ найденных email
-            if self.scanner.found_emails:
+            # Показ найденных email (в режиме масштаба их слишком много для лога)
+            if getattr(self.scanner, 'scale_mode', False) and self.scanner.found_emails:
+                self.log_message("📬 Список email сохранён в found_emails.txt", "SUCCESS")
+            elif self.scanner.found_emails:
                 self.log_message("\n📬 Найденные email адреса:", "SUCCESS")
                 for email in sorted(self.scanner.found_emails):
                     self.log_message(f"  📧 {email}")
@@ -500,9 +670,7 @@ class EmailScannerGUI:
         
         if filename:
             try:
-                with open(filename, 'w', encoding='utf-8') as f:
-                    for email in sorted(self.scanner.found_emails):
-                        f.write(f"{email}\n")
+                self.scanner.export_emails(filename)
                 self.log_message(f"✅ Email экспортированы в файл: {filename}", "SUCCESS")
                 messagebox.showinfo("Успех", f"Email успешно экспортированы в файл:\n{filename}")
             except Exception as e:
@@ -517,9 +685,7 @@ class EmailScannerGUI:
                 timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
                 filename = f"found_emails_{timestamp}.txt"
                 
-                with open(filename, 'w', encoding='utf-8') as f:
-                    for email in sorted(self.scanner.found_emails):
-                        f.write(f"{email}\n")
+                self.scanner.export_emails(filename)
                 
                 self.log_message(f"✅ Email автоматически сохранены в: {filename}", "SUCCESS")
                 
@@ -553,4 +719,6 @@ def main():
     root.mainloop()
 
 if __name__ == "__main__":
+    # Процессы пула поиска email в собранном exe
+    multiprocessing.freeze_support()
     main()
\ No newline at end of file
@@ -1,44 +1,206 @@
+import asyncio
 import json
 import time
-import requests
 import re
 from datetime import datetime
 import random
-import socket
-import concurrent.futures
 import os
 from bs4 import BeautifulSoup
 import threading
-from queue import Queue
+from queue import Queue, Empty, Full
 import logging
 from urllib.parse import quote_plus, urlparse
 import itertools
+import multiprocessing
+import socket
+import sys
+import gc
+
+import psutil
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from async_engine import AsyncFetchEngine
+from session_pool import SessionPool
+from extractor import StreamingEmailExtractor, extract_emails
+from charset import CharsetResolver
+from dns_resolver import AsyncDNSResolver
+from dns_cache import DNSCache
+from disk_state import DiskStore, DiskSet, DiskFrontier, DiskCheckpoint
+from bloom import ScalableBloomFilter
+from email_journal import EmailJournal
+from stats import ScanStats
+from extraction_pool import ExtractionPool, PageBuffer
+from result_store import ResultStore
+from politeness import PolitenessScheduler, RobotsBody, RobotsCache, robots_urls, robots_verdict, site_host
+from scheme_probe import SchemeCache, probe_ports
+from timeouts import AdaptiveTimeouts
+from concurrency import ConcurrencyController
+
+# Доступные движки загрузки страниц
+ENGINES = ('threads', 'async')
+
+# Нетекстовые media type, в которых тоже ищем email (помимо text/*)
+TEXT_MEDIA_TYPES = {'application/xhtml+xml', 'application/xml', 'application/rss+xml', 'application/json'}
+PAGE_CHUNK_SIZE = 16384
+# Окончательные статусы сайта: домен больше не проверяется (visited.bloom).
+# 'failed' и 'error' (таймаут, обрыв соединения) могут быть временными
+VISITED_STATUSES = {'success', 'no_emails', 'http_error', 'non_text', 'robots_disallowed'}
 
 # Настройка логирования
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+def dns_cache_hit_rate(stats):
+    total = stats['dns_cache_hits'] + stats['dns_cache_misses']
+    return round(stats['dns_cache_hits'] / total, 4) if total else 0.0
+
 class MassWebsiteEmailScanner:
-    def __init__(self, proxies=None, max_workers=20):
-        self.stats = {
-            'total_sites_checked': 0,
-            'sites_with_emails': 0,
-            'total_emails_found': 0,
-            'start_time': datetime.now().isoformat(),
-            'sites_processed': 0,
-            'search_sites_found': 0
-        }
+    def __init__(self, proxies=None, max_workers=20, scale_mode=False, state_dir='scan_state', memory_budget_mb=None):
+        # Счётчики - по шардам потоков, без общей блокировки; согласованная копия - stats.snapshot()
+        self.stats = ScanStats(
+            counters={
+                'total_sites_checked': 0,
+                'sites_with_emails': 0,
+                'total_emails_found': 0,
+                'sites_processed': 0,
+                'bytes_downloaded': 0,
+                'bytes_saved': 0,
+                'non_text_skipped': 0,
+                'dns_cache_hits': 0,
+                'dns_cache_misses': 0,
+                'memory_pauses': 0,
+                'visited_skipped': 0,
+                'robots_blocked': 0,
+                'politeness_deferred': 0,
+                'groups_deprioritized': 0,
+                'scheme_cache_hits': 0,
+                'fetch_errors': 0,
+                # Размер found_emails: в режиме масштаба len() - запрос к базе под блокировкой
+                'unique_emails': 0
+            },
+            gauges={
+                'start_time': datetime.now().isoformat(),
+                'search_sites_found': 0,
+                'pool_hits': 0,
+                'pool_misses': 0,
+                'first_email_seconds': None,
+                'rss_mb': 0,
+                'concurrency': 0
+            },
+            derived={'dns_cache_hit_rate': dns_cache_hit_rate}
+        )
         self.found_emails = set()
-        self.visited_urls = set()
+        
+        # Фронтир и контрольная точка сканирования хранятся на диске в state_dir,
+        # чтобы прерванное сканирование можно было продолжить (resume). Там же - все
+        # остальные файлы между запусками: фильтр проверенных доменов, журнал email,
+        # результаты по сайтам, кэши DNS, robots.txt и схем. Файлы открываются при
+        # первом обращении и закрываются в конце сканирования (close_state)
+        self.scale_mode = scale_mode
+        self.state_dir = state_dir
+        self.state_store = DiskStore(state_dir)
+        self.frontier = DiskFrontier(self.state_store)
+        self.checkpoint = DiskCheckpoint(self.state_store)
+        self.checkpoint_interval = 30
+        self.campaign = None
+        self.discovery_finished = threading.Event()
+        # Проверенные домены, которые ещё не удалены из фронтира (пишутся порциями)
+        self.frontier_done = []
+        self.frontier_lock = threading.Lock()
+        self.interrupted = False
+        # Режим масштаба: и найденные email хранятся на диске
+        if scale_mode:
+            self.found_emails = DiskSet(self.state_store, 'emails')
+        
+        # Проверенные домены (в том числе в прошлых запусках): фильтр Блума в файле.
+        # Домен попадает в него, только когда загрузка закончилась окончательным
+        # статусом (VISITED_STATUSES): таймауты, ошибки подключения и домены,
+        # не дождавшиеся загрузки до остановки, проверяются в следующий раз.
+        # dedup_error_rate - доля новых доменов, ошибочно принятых за проверенные
+        self.dedup_error_rate = 0.001
+        self.visited_path = os.path.join(state_dir, 'visited.bloom')
+        self.visited_urls = ScalableBloomFilter(self.visited_path, error_rate=self.dedup_error_rate)
+        # Домены, отправленные на загрузку в этом запуске (повторы в кандидатах)
+        self.run_domains = ScalableBloomFilter(error_rate=self.dedup_error_rate)
+        
+        # Новые уникальные email дописываются в журнал отдельным потоком;
+        # отсортированный found_emails.txt пишется в конце сканирования
+        self.email_journal = EmailJournal(os.path.join(state_dir, 'emails.journal'))
+        # Результат каждого сайта (статус, URL, время, байты, email) в SQLite; None - не сохранять
+        self.result_store = ResultStore(os.path.join(state_dir, 'results.sqlite'))
+        # Снимок статистики для внешнего контроля, раз в progress_interval секунд
+        self.progress_path = 'scan_progress.json'
+        self.progress_interval = 5
+        self.last_progress_snapshot = None
+        
+        # Бюджет RSS процесса, МБ: при превышении приём новых доменов замедляется
+        if memory_budget_mb is None and scale_mode:
+            memory_budget_mb = 1024
+        self.memory_budget_mb = memory_budget_mb
+        self.memory_pressure = threading.Event()
+        self.process = psutil.Process()
+        # Сколько доменов передано на загрузку (для оценки числа сайтов в работе)
+        self.sites_enqueued = 0
         self.proxies = proxies or []
         self.current_proxy = None
-        self.session = requests.Session()
         self.max_workers = max_workers
-        self.url_queue = Queue()
+        # Число одновременных загрузок подбирается по ходу сканирования (ConcurrencyController)
+        # между min_workers и max_workers; False - всегда max_workers
+        self.adaptive_concurrency = True
+        self.min_workers = 1
+        self.concurrency = None
+        # Очередь между стадиями DNS и загрузки: ограничена, чтобы стадии шли вровень
+        self.url_queue = Queue(maxsize=max(100, max_workers * 2))
+        # Откуда воркеры берут сайты: url_queue или, в вежливом режиме, очередь после планировщика
+        self.fetch_queue = self.url_queue
         self.email_lock = threading.Lock()
-        self.stats_lock = threading.Lock()
         self.stop_event = threading.Event()
         
+        # Бюджет на загрузку одной страницы
+        self.max_page_bytes = 500000
+        self.max_page_seconds = 10
+        
+        # Политика ранней остановки чтения страницы: после N email / после </footer>
+        self.stop_after_emails = None
+        self.stop_at_footer = False
+        
+        # Поиск email в отдельных процессах (0 - в процессе загрузки), страницы передаются порциями
+        self.extract_processes = 0
+        self.extraction_pool = None
+        
+        # Вежливый режим (None - выключен, см. enable_politeness): ограничения на хост и IP,
+        # паузы crawl-delay; сайты, главная которых запрещена в robots.txt, пропускаются
+        self.politeness = None
+        self.respect_robots = True
+        self.robots_agent = '*'
+        # Решения по robots.txt между запусками (None - без кэша)
+        self.robots_cache = RobotsCache(os.path.join(state_dir, 'robots_cache.sqlite'))
+        # Сколько сайтов планировщик может держать отложенными, прежде чем ждать с чтением url_queue
+        self.max_deferred = 10000
+        
+        # Для домена без схемы https и http пробуются наперегонки: http стартует через
+        # scheme_stagger секунд, если https ещё не подключился (None - по очереди, как раньше).
+        # Итоговый URL сайта запоминается между запусками (None - без кэша)
+        self.scheme_stagger = 0.3
+        self.scheme_cache = SchemeCache(os.path.join(state_dir, 'scheme_cache.sqlite'))
+        # Итог гонки схем для сайтов в работе {домен: [url, ...]}: robots.txt и страница
+        # используют одну гонку; подключённый сокет победителя {(домен, порт): сокет}
+        # забирает пул соединений, и первый запрос идёт без второго подключения
+        self.scheme_races = {}
+        self.race_sockets = {}
+        
+        # Кодировки страниц: заголовки, BOM и <meta> вместо статистического определения
+        self.charset_resolver = CharsetResolver()
+        
+        # Проверка доменов через DNS: серверы (None - системные), одновременные запросы, таймаут попытки
+        self.dns_servers = None
+        self.dns_concurrency = 500
+        self.dns_timeout = 2.0
+        self.dns_ipv6 = False
+        # Результаты DNS между запусками (None - без кэша)
+        self.dns_cache = DNSCache(os.path.join(state_dir, 'dns_cache.sqlite'))
+        
         # Случайные User-Agents
         self.user_agents = [
             'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
@@ -48,8 +210,15 @@ class MassWebsiteEmailScanner:
             'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:90.0) Gecko/20100101 Firefox/90.0'
         ]
         
-        # Настройка сессии
-        self.session.headers.update({
+        # Адреса проверенных доменов {домен: [ip, ...]}: загрузка идёт без повторного DNS
+        self.resolved_ips = {}
+        
+        # Таймауты подключения, TLS, первого байта и всей загрузки сайта: по процентилям
+        # задержек текущего запуска; set_override задаёт фазе постоянное значение
+        self.timeouts = AdaptiveTimeouts()
+        
+        # Пул сессий: у каждого рабочего потока своя сессия, соединения общие
+        self.session_pool = SessionPool(max_workers, resolved_ips=self.resolved_ips, timeouts=self.timeouts, headers={
             'User-Agent': random.choice(self.user_agents),
             'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
             'Accept-Language': 'ru-RU,ru;q=0.9,en-US;q=0.8,en;q=0.7',
@@ -57,8 +226,10 @@ class MassWebsiteEmailScanner:
             'DNT': '1',
             'Connection': 'keep-alive',
             'Upgrade-Insecure-Requests': '1',
-        })
+        }, ready_sockets=self.race_sockets)
         
+        # Сессия для поиска, проверки прокси и загрузки списков доменов
+        self.session = self.session_pool.new_session()
         self.session.timeout = 10
         
         # Отключаем предупреждения SSL
@@ -90,7 +261,7 @@ class MassWebsiteEmailScanner:
             test_response = self.session.get(
                 'http://httpbin.org/ip',
                 proxies=proxies,
-                timeout=5,
+                timeout=self.timeouts.requests_timeout('http://httpbin.org/ip', adaptive=False),
                 verify=False
             )
             
@@ -147,15 +318,11 @@ class MassWebsiteEmailScanner:
             all_domains.update(backup_domains)
         
         # Проверяем существование найденных доменов
-        valid_domains = []
-        for domain in list(all_domains)[:max_results]:
-            if self.check_domain_exists(domain):
-                valid_domains.append(domain)
+        valid_domains = self.find_existing_domains(list(all_domains)[:max_results], max_domains=max_results)
         
         logger.info(f"✅ Всего валидных сайтов после проверки: {len(valid_domains)}")
         
-        with self.stats_lock:
-            self.stats['search_sites_found'] = len(valid_domains)
+        self.stats.set('search_sites_found', len(valid_domains))
             
         return valid_domains
 
@@ -184,12 +351,13 @@ class MassWebsiteEmailScanner:
                 search_url,
                 headers=headers,
                 proxies=self.current_proxy,
-                timeout=15,
+                timeout=self.timeouts.requests_timeout(search_url, adaptive=False),
                 verify=False
             )
             
             if response.status_code == 200:
-                soup = BeautifulSoup(response.text, 'html.parser')
+                page = self.response_text(response)
+                soup = BeautifulSoup(page, 'html.parser')
                 
                 # Ищем обычные ссылки в результатах
                 for link in soup.find_all('a', href=True):
@@ -204,7 +372,7 @@ class MassWebsiteEmailScanner:
                 
                 # Альтернативный метод поиска ссылок
                 if not domains:
-                    links = re.findall(r'https?://[^\s&]+', response.text)
+                    links = re.findall(r'https?://[^\s&]+', page)
                     for link in links:
                         domain = self.extract_domain(link)
                         if domain and 'google' not in domain and domain not in domains:
@@ -234,12 +402,12 @@ class MassWebsiteEmailScanner:
                 search_url,
                 headers=headers,
                 proxies=self.current_proxy,
-                timeout=15,
+                timeout=self.timeouts.requests_timeout(search_url, adaptive=False),
                 verify=False
             )
             
             if response.status_code == 200:
-                soup = BeautifulSoup(response.text, 'html.parser')
+                soup = BeautifulSoup(self.response_text(response), 'html.parser')
                 
                 # Ищем ссылки в результатах Bing
                 for link in soup.find_all('a', href=True):
@@ -274,13 +442,13 @@ class MassWebsiteEmailScanner:
                 search_url,
                 headers=headers,
                 proxies=self.current_proxy,
-                timeout=15,
+                timeout=self.timeouts.requests_timeout(search_url, adaptive=False),
                 verify=False
             )
             
             if response.status_code == 200:
                 # Yandex часто использует JavaScript, но попробуем найти ссылки
-                links = re.findall(r'https?://[^\s"<>]+', response.text)
+                links = re.findall(r'https?://[^\s"<>]+', self.response_text(response))
                 for link in links:
                     if 'yandex' not in link and 'yandex' not in link:
                         domain = self.extract_domain(link)
@@ -304,12 +472,12 @@ class MassWebsiteEmailScanner:
             response = self.session.get(
                 search_url,
                 proxies=self.current_proxy,
-                timeout=15,
+                timeout=self.timeouts.requests_timeout(search_url, adaptive=False),
                 verify=False
             )
             
             if response.status_code == 200:
-                soup = BeautifulSoup(response.text, 'html.parser')
+                soup = BeautifulSoup(self.response_text(response), 'html.parser')
                 
                 for link in soup.find_all('a', {'class': 'result__url'}):
                     url = link.text.strip()
@@ -349,9 +517,9 @@ class MassWebsiteEmailScanner:
                 if len(domains) >= max_results:
                     break
                 try:
-                    response = self.session.get(url, timeout=10, verify=False)
+                    response = self.session.get(url, timeout=self.timeouts.requests_timeout(url, adaptive=False), verify=False)
                     if response.status_code == 200:
-                        found_domains = re.findall(r'https?://([^/]+)', response.text)
+                        found_domains = re.findall(r'https?://([^/]+)', self.response_text(response))
                         for domain in found_domains:
                             if domain and 'dmoz' not in domain:
                                 domains.add(domain.replace('www.', ''))
@@ -386,8 +554,13 @@ class MassWebsiteEmailScanner:
         return None
 
     def load_domains_from_sources(self, max_domains=10000):
-        """Загрузка доменов из различных источников с ограничением"""
-        domains = set()
+        """Домены из различных источников с ограничением (генератор).
+
+        Домены отдаются по одному по мере чтения: списки скачиваются
+        потоком, генерация и domains.txt читаются лениво, поэтому в памяти
+        не держится весь набор из max_domains строк.
+        """
+        loaded = 0
         
         # 1. Используем публичные списки доменов
         public_domain_sources = [
@@ -396,47 +569,50 @@ class MassWebsiteEmailScanner:
         ]
         
         for source in public_domain_sources:
+            if loaded >= max_domains:
+                break
             try:
                 logger.info(f"Загрузка доменов из: {source}")
-                response = self.session.get(source, timeout=10)
-                if response.status_code == 200:
-                    lines = response.text.split('\n')
-                    for line in lines:
-                        if len(domains) >= max_domains:
-                            break
-                        domain = line.strip().lower()
-                        if domain and '.' in domain and not domain.startswith('#'):
-                            domains.add(domain)
-                    logger.info(f"Загружено {len(domains)} доменов из {source}")
+                source_count = 0
+                with self.session.get(source, timeout=self.timeouts.requests_timeout(source, adaptive=False), stream=True) as response:
+                    if response.status_code == 200:
+                        for line in response.iter_lines():
+                            if loaded >= max_domains:
+                                break
+                            domain = line.decode('utf-8', errors='ignore').strip().lower()
+                            if domain and '.' in domain and not domain.startswith('#'):
+                                loaded += 1
+                                source_count += 1
+                                yield domain
+                        logger.info(f"Загружено {source_count} доменов из {source}")
             except Exception as e:
                 logger.error(f"Ошибка загрузки из {source}: {e}")
         
         # 2. Генерация доменов по шаблонам
-        needed_domains = max_domains - len(domains)
+        needed_domains = max_domains - loaded
         if needed_domains > 0:
             logger.info(f"Генерация {needed_domains} дополнительных доменов")
-            generated_domains = self.generate_domains(needed_domains)
-            domains.update(generated_domains)
+            for domain in self.generate_domains(needed_domains):
+                loaded += 1
+                yield domain
         
         # 3. Загрузка из файла, если есть
         try:
             with open('domains.txt', 'r', encoding='utf-8') as f:
                 for line in f:
-                    if len(domains) >= max_domains:
+                    if loaded >= max_domains:
                         break
                     domain = line.strip()
                     if domain:
-                        domains.add(domain)
+                        loaded += 1
+                        yield domain
         except FileNotFoundError:
             pass
             
-        logger.info(f"Итого загружено доменов: {len(domains)}")
-        return list(domains)
+        logger.info(f"Итого загружено доменов: {loaded}")
 
     def generate_domains(self, count=10000):
-        """Генерация доменов по шаблонам"""
-        domains = set()
-        
+        """Генерация доменов по шаблонам (генератор, все домены различны)"""
         # Базовые слова для генерации
         words = [
             'tech', 'digital', 'global', 'smart', 'quick', 'easy', 'fast', 'neo', 
@@ -447,226 +623,666 @@ class MassWebsiteEmailScanner:
         
         tlds = ['com', 'net', 'org', 'info', 'biz', 'ru', 'ua', 'by', 'kz']
         
-        # Генерация комбинаций
-        for word1 in words:
-            for word2 in words:
-                if len(domains) >= count:
-                    return list(domains)
-                for tld in tlds:
-                    if len(domains) >= count:
-                        return list(domains)
-                    domains.add(f"{word1}{word2}.{tld}")
-        
-        # Добавляем домены с числами
-        for word in words:
-            for i in range(100, 500):
-                if len(domains) >= count:
-                    return list(domains)
-                for tld in ['com', 'net']:
-                    if len(domains) >= count:
-                        return list(domains)
-                    domains.add(f"{word}{i}.{tld}")
+        # Комбинации слов, затем домены с числами
+        combinations = (
+            f"{word1}{word2}.{tld}"
+            for word1 in words for word2 in words for tld in tlds
+        )
+        numbered = (
+            f"{word}{i}.{tld}"
+            for word in words for i in range(100, 500) for tld in ['com', 'net']
+        )
         
-        return list(domains)
+        return itertools.islice(itertools.chain(combinations, numbered), count)
+
+    def resolve_domains(self, domains, on_result=None):
+        """Разрешение доменов: сначала кэш на диске, затем асинхронный резолвер по настройкам dns_*.
+
+        domains может быть ленивым генератором. on_result(result) вызывается
+        для каждого домена, True останавливает проверку; on_result может быть
+        корутинной функцией. Без on_result возвращается {domain: result}.
+        """
+        results = {}
+        
+        def record(result):
+            self.record_dns_lookup(result['cached'])
+            if on_result is None:
+                results[result['domain']] = result
+                return False
+            return on_result(result)
+        
+        resolver = AsyncDNSResolver(
+            nameservers=self.dns_servers,
+            concurrency=self.dns_concurrency,
+            timeout=self.dns_timeout,
+            ipv6=self.dns_ipv6,
+            cache=self.dns_cache
+        )
+        resolver.resolve_many(domains, record)
+        return results
+
+    def record_dns_lookup(self, cached):
+        """Учёт обращения к кэшу DNS"""
+        self.stats.add('dns_cache_hits' if cached else 'dns_cache_misses')
 
     def check_domain_exists(self, domain):
         """Проверка существования домена через DNS"""
         try:
-            socket.gethostbyname(domain)
-            return True
-        except:
+            return self.resolve_domains([domain])[domain]['status'] == 'ok'
+        except Exception:
             return False
 
     def find_existing_domains(self, domains_list, max_domains=5000):
-        """Многопоточная проверка существования доменов"""
+        """Асинхронная проверка существования доменов через DNS"""
         logger.info(f"Проверка существования {len(domains_list)} доменов...")
         existing_domains = []
         
-        # Используем ThreadPoolExecutor для DNS проверок
-        with concurrent.futures.ThreadPoolExecutor(max_workers=min(50, self.max_workers)) as executor:
-            future_to_domain = {
-                executor.submit(self.check_domain_exists, domain): domain 
-                for domain in domains_list[:max_domains * 3]
-            }
-            
-            for future in concurrent.futures.as_completed(future_to_domain):
-                if len(existing_domains) >= max_domains:
-                    break
-                    
-                domain = future_to_domain[future]
-                try:
-                    result = future.result(timeout=5)
-                    if result:
-                        existing_domains.append(domain)
-                        if len(existing_domains) % 100 == 0:
-                            logger.info(f"Найдено существующих доменов: {len(existing_domains)}")
-                except Exception as e:
-                    continue
+        def on_result(result):
+            if result['status'] == 'ok' and len(existing_domains) < max_domains:
+                existing_domains.append(result['domain'])
+                self.resolved_ips[result['domain']] = result['ips']
+                if len(existing_domains) % 100 == 0:
+                    logger.info(f"Найдено существующих доменов: {len(existing_domains)}")
+            return len(existing_domains) >= max_domains or self.stop_event.is_set()
+        
+        try:
+            self.resolve_domains(domains_list[:max_domains * 3], on_result)
+        except Exception as e:
+            logger.error(f"Ошибка DNS-проверки: {e}")
         
         logger.info(f"Найдено существующих доменов: {len(existing_domains)}")
         return existing_domains
 
     def extract_emails_from_text(self, text):
         """Извлечение email адресов из текста"""
-        email_pattern = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
-        emails = re.findall(email_pattern, text)
-        return list(set(emails))
+        return list(extract_emails(text))
 
     def scan_single_url(self, url):
         """Сканирование одного URL на наличие email"""
         if self.stop_event.is_set():
             return
             
+        result = self.new_site_result(url)
+        requeued = False
         try:
-            # Случайный User-Agent для каждого запроса
-            self.session.headers['User-Agent'] = random.choice(self.user_agents)
+            if self.politeness is not None and self.respect_robots:
+                decision = self.check_robots(url)
+                if decision == 'defer':
+                    requeued = True
+                    return None
+                if decision == 'deny':
+                    result['status'] = 'robots_disallowed'
+                    self.record_site_failure(result)
+                    return None
             
-            # Пробуем оба протокола если не указан
-            if not url.startswith('http'):
-                test_urls = [f'https://{url}', f'http://{url}']
-                original_url = url
-            else:
-                test_urls = [url]
-                original_url = url
+            # Случайный User-Agent для каждого запроса (сессия потока не меняется)
+            request_headers = {'User-Agent': random.choice(self.user_agents)}
+            fingerprint = self.politeness.fingerprint(url) if self.politeness is not None else None
             
+            original_url = url
             response = None
             final_url = None
+            emails = None
+            # Общий срок загрузки сайта (все попытки, редиректы и тело страницы)
+            fetch_started = time.monotonic()
+            total_timeout = self.timeouts.get('total')
+            deadline = fetch_started + total_timeout
             
-            for test_url in test_urls:
+            # Сохранённый адрес сайта, затем обе схемы, если не указана
+            for test_url in self.candidate_urls(url):
+                if time.monotonic() >= deadline:
+                    self.timeouts.expired('total')
+                    break
                 try:
                     logger.debug(f"Попытка подключения к: {test_url}")
-                    response = self.session.get(
+                    response = self.session_pool.get(
                         test_url,
+                        headers=request_headers,
                         proxies=self.current_proxy,
-                        timeout=8,
+                        timeout=self.timeouts.requests_timeout(),
                         allow_redirects=True,
                         verify=False,
                         stream=True
                     )
+                    self.record_first_byte(result, response.status_code)
                     
                     if response.status_code == 200:
                         final_url = test_url
-                        # Ограничиваем размер контента
-                        response.raw.decode_content = True
-                        content = response.content[:500000]
-                        response._content = content
+                        result['final_url'] = response.url
+                        self.remember_site_url(url, response.url)
+                        # Ищем email по мере загрузки тела
+                        emails = self.scan_response_body(response, result, fingerprint, deadline)
+                        if emails is None:
+                            logger.debug(f"Пропуск {test_url}: {response.headers.get('Content-Type')}")
+                            result['status'] = 'non_text'
+                            self.record_site_failure(result)
+                            return None
+                        self.record_sample(url, fingerprint)
+                        self.record_total_time(time.monotonic() - fetch_started, total_timeout)
                         break
                     else:
                         logger.debug(f"Статус {response.status_code} для {test_url}")
+                        result['status'] = 'http_error'
+                        response.close()
                         response = None
                 except Exception as e:
                     logger.debug(f"Ошибка подключения к {test_url}: {e}")
+                    if response is not None:
+                        response.close()
+                    response = None
                     continue
             
-            if not response or response.status_code != 200:
-                with self.stats_lock:
-                    self.stats['total_sites_checked'] += 1
-                    self.stats['sites_processed'] += 1
+            if emails is None:
+                self.record_site_failure(result)
                 return None
             
-            # Определяем кодировку
-            if response.encoding is None:
-                response.encoding = 'utf-8'
-            
-            try:
-                text = response.text
-            except UnicodeDecodeError:
-                for encoding in ['windows-1251', 'cp1251', 'iso-8859-1']:
-                    try:
-                        text = response.content.decode(encoding)
-                        break
-                    except:
-                        continue
-                else:
-                    text = response.content.decode('utf-8', errors='ignore')
-            
-            emails = self.extract_emails_from_text(text)
-            
-            # Также ищем в ссылках mailto:
-            mailto_emails = re.findall(r'mailto:([A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,})', text)
-            emails.extend(mailto_emails)
-            
-            # Обновляем статистику
-            with self.stats_lock:
-                self.stats['total_sites_checked'] += 1
-                self.stats['sites_processed'] += 1
-                
-                if emails:
-                    self.stats['sites_with_emails'] += 1
-                    self.stats['total_emails_found'] += len(emails)
-                    with self.email_lock:
-                        self.found_emails.update(emails)
-                    
-                    logger.info(f"🎯 Найдено {len(emails)} email на {original_url}")
-                    for email in emails:
-                        logger.info(f"  📧 {email}")
-                    
-                    # Сохраняем каждый найденный email сразу
-                    self.save_emails_to_file()
-                    
-                    return {
-                        'url': final_url or original_url,
-                        'emails': emails,
-                        'status': 'success'
-                    }
-                else:
-                    if self.stats['sites_processed'] % 20 == 0:
-                        logger.info(f"📊 Обработано сайтов: {self.stats['sites_processed']}, найдено email: {len(self.found_emails)}")
-                    return {
-                        'url': final_url or original_url,
-                        'emails': [],
-                        'status': 'no_emails'
-                    }
+            return self.record_page_emails(original_url, final_url, emails, result)
                         
         except Exception as e:
-            with self.stats_lock:
-                self.stats['total_sites_checked'] += 1
-                self.stats['sites_processed'] += 1
+            result['status'] = 'error'
+            self.record_site_failure(result)
             logger.debug(f"Ошибка при сканировании {url}: {e}")
             return {
                 'url': url,
                 'emails': [],
                 'status': f'error: {str(e)}'
             }
+        finally:
+            self.finish_site(url, requeued)
+
+    def candidate_urls(self, url):
+        """URL для загрузки сайта по очереди.
+
+        Для домена без схемы сначала идёт итоговый URL из прошлого запуска
+        (scheme_cache); если страница по нему не загрузилась, запись
+        удаляется, и https/http пробуются в порядке гонки подключений.
+        """
+        if url.startswith('http'):
+            yield url
+            return
+        cached = self.cached_site_url(url)
+        if cached:
+            yield cached
+            # Сюда доходим, только если по сохранённому адресу страница не загрузилась
+            self.scheme_cache.forget(url)
+        yield from self.race_schemes(url)
+
+    def race_schemes(self, domain):
+        """https:// и http:// домена в порядке гонки TCP-подключений (probe_ports).
+
+        https получает фору scheme_stagger секунд; не ответивший вовремя
+        или закрытый порт 443 не стоит воркеру полного таймаута. Через
+        прокси и при scheme_stagger None - по очереди, как раньше.
+
+        Гонка идёт один раз на сайт (scheme_races), а сокет победителя
+        передаётся пулу соединений (race_sockets) - первый запрос, к
+        robots.txt или к странице, идёт по нему.
+        """
+        urls = {443: f'https://{domain}', 80: f'http://{domain}'}
+        if self.scheme_stagger is None or self.current_proxy:
+            return list(urls.values())
+        if domain in self.scheme_races:
+            return self.scheme_races[domain]
+        ip = (self.resolved_ips.get(domain) or [None])[0]
+        if ip is None:
+            try:
+                ip = socket.getaddrinfo(domain, None, type=socket.SOCK_STREAM)[0][4][0]
+            except OSError:
+                return []
+        connected = {}
+        ports = probe_ports(ip, list(urls), self.scheme_stagger, self.timeouts.get('connect'), connected)
+        for port, sock in connected.items():
+            self.race_sockets[(domain, port)] = sock
+        self.scheme_races[domain] = [urls[port] for port in ports]
+        return self.scheme_races[domain]
+
+    def cached_site_url(self, domain):
+        """Итоговый URL сайта из прошлого запуска или None"""
+        if self.scheme_cache is None:
+            return None
+        url = self.scheme_cache.get(domain)
+        if url:
+            self.stats.add('scheme_cache_hits')
+        return url
+
+    def remember_site_url(self, url, final_url):
+        """Сохранение URL, по которому загрузилась страница домена (для следующих запусков)"""
+        if self.scheme_cache is not None and final_url and not url.startswith('http'):
+            self.scheme_cache.put(url, final_url)
+
+    def finish_site(self, url, requeue=False):
+        """Сайт обработан: разрешение планировщика освобождается, адрес больше не нужен.
+
+        При requeue сайт вернётся из планировщика после паузы crawl-delay,
+        поэтому его адрес сохраняется.
+        """
+        if self.politeness is not None:
+            self.politeness.release(url, requeue)
+        # Неиспользованный сокет гонки схем (например, страница не загрузилась по победителю)
+        for port in (443, 80):
+            sock = self.race_sockets.pop((url, port), None)
+            if sock is not None:
+                sock.close()
+        if not requeue:
+            # Адрес и итог гонки схем нужны только на время сканирования сайта
+            self.resolved_ips.pop(url, None)
+            self.scheme_races.pop(url, None)
+
+    def check_robots(self, url):
+        """Проверка robots.txt перед загрузкой главной страницы: 'allow', 'deny' или 'defer'"""
+        if self.politeness.take_robots_checked(url):
+            return 'allow'
+        verdict = self.robots_cached(url)
+        if verdict is not None:
+            return self.robots_decision(url, verdict, fetched=False)
+        status, text = self.fetch_robots(url)
+        return self.robots_decision(url, self.robots_fetched(url, status, text), fetched=True)
+
+    def fetch_robots(self, url):
+        """Загрузка robots.txt сайта: (код ответа или None, если подключиться не удалось; текст)"""
+        if url.startswith('http'):
+            bases = [url]
+        else:
+            # Схема - как у страницы: сохранённая в прошлом запуске или по гонке подключений
+            known = self.scheme_cache.get(url) if self.scheme_cache is not None else None
+            bases = [known] if known else self.race_schemes(url)
+        for robots_url in [robots_url for base in bases for robots_url in robots_urls(base)]:
+            try:
+                response = self.session_pool.get(
+                    robots_url,
+                    headers={'User-Agent': random.choice(self.user_agents)},
+                    proxies=self.current_proxy,
+                    timeout=self.timeouts.requests_timeout(),
+                    allow_redirects=True,
+                    verify=False,
+                    stream=True
+                )
+            except Exception as e:
+                logger.debug(f"Ошибка загрузки {robots_url}: {e}")
+                continue
+            try:
+                body = RobotsBody()
+                if response.status_code == 200:
+                    for chunk in response.iter_content(chunk_size=PAGE_CHUNK_SIZE):
+                        if body.feed(chunk):
+                            break
+                return response.status_code, body.text
+            finally:
+                response.close()
+        return None, ''
+
+    def robots_cached(self, url):
+        """Сохранённое решение robots.txt для хоста сайта или None"""
+        if self.robots_cache is None:
+            return None
+        return self.robots_cache.get(site_host(url))
+
+    def robots_fetched(self, url, status, text):
+        """Решение по загруженному robots.txt; сохраняется в robots_cache"""
+        verdict = robots_verdict(status, text, self.robots_agent)
+        if self.robots_cache is not None:
+            self.robots_cache.put(site_host(url), status, verdict)
+        return verdict
+
+    def robots_decision(self, url, verdict, fetched):
+        """Что делать с сайтом по решению robots.txt: 'allow', 'deny' или 'defer'.
+
+        Crawl-delay передаётся планировщику. Если robots.txt только что
+        загружен и хост просит паузу, главная загружается после неё: сайт
+        возвращается в планировщик ('defer'), а воркер берёт другой хост.
+        """
+        allowed, delay = verdict
+        if not allowed:
+            self.stats.add('robots_blocked')
+            return 'deny'
+        if delay:
+            self.politeness.set_crawl_delay(site_host(url), delay)
+            if fetched:
+                return 'defer'
+        return 'allow'
+
+    def record_sample(self, url, fingerprint):
+        """Отпечаток загруженной страницы - в образцы группы адресов планировщика"""
+        if fingerprint is None:
+            return
+        group = self.politeness.record_sample(url, fingerprint.digest())
+        if group:
+            self.stats.add('groups_deprioritized')
+            logger.info(f"🅿️ Одинаковые страницы в сети {group}: остальные её сайты - в конец очереди")
+
+    def is_text_content_type(self, content_type):
+        """Имеет ли смысл искать email в ответе с таким Content-Type"""
+        if not content_type:
+            return True
+        media_type = content_type.split(';', 1)[0].strip().lower()
+        return media_type.startswith('text/') or media_type in TEXT_MEDIA_TYPES
+
+    def response_text(self, response):
+        """Текст ответа requests без медленного apparent_encoding.
+
+        response.text для ответа без charset в Content-Type определяет
+        кодировку статистически по всему телу; здесь она берётся из
+        заголовка, BOM или <meta>, а для хоста без них запоминается.
+        """
+        host = urlparse(response.url).hostname
+        return self.charset_resolver.decode(response.content, response.headers.get('Content-Type'), host)
+
+    def create_extractor(self, encoding):
+        """Потоковый экстрактор email с политикой остановки сканера.
+
+        Кодировка нужна только чтобы распознать UTF-16/UTF-32: остальные
+        страницы просматриваются как байты без декодирования. При пуле
+        процессов страница только накапливается и ищется в пуле (PageBuffer).
+        """
+        if self.extraction_pool is not None:
+            return PageBuffer(self.extraction_pool, encoding)
+        return StreamingEmailExtractor(
+            encoding,
+            max_emails=self.stop_after_emails,
+            stop_at_footer=self.stop_at_footer
+        )
+
+    def scan_response_body(self, response, result=None, fingerprint=None, deadline=None):
+        """Потоковое чтение тела ответа (stream=True) с поиском email на лету.
+
+        Части тела сразу передаются в экстрактор. Чтение прекращается, когда
+        исчерпан бюджет max_page_bytes (распакованных байт) или
+        max_page_seconds, наступил deadline (time.monotonic(), общий срок
+        загрузки сайта), либо когда сработала политика ранней остановки
+        экстрактора. Для нетекстового Content-Type тело не скачивается и
+        возвращается None. Скачанные байты записываются в result сайта,
+        начало страницы - в fingerprint (PageFingerprint), если он передан.
+        """
+        try:
+            content_length = int(response.headers.get('Content-Length', 0))
+        except ValueError:
+            content_length = 0
+        
+        if not self.is_text_content_type(response.headers.get('Content-Type')):
+            response.close()
+            self.record_non_text_skip(content_length)
+            return None
+        
+        extractor = self.create_extractor(
+            self.charset_resolver.from_content_type(response.headers.get('Content-Type'))
+        )
+        size = 0
+        page_deadline = time.monotonic() + self.max_page_seconds
+        if deadline is not None:
+            page_deadline = min(page_deadline, deadline)
+        try:
+            for chunk in response.iter_content(chunk_size=PAGE_CHUNK_SIZE):
+                chunk = chunk[:self.max_page_bytes - size]
+                size += len(chunk)
+                if fingerprint is not None:
+                    fingerprint.feed(chunk)
+                if extractor.feed(chunk):
+                    break
+                if size >= self.max_page_bytes or time.monotonic() >= page_deadline:
+                    break
+            # Байты, реально полученные из сети (до распаковки)
+            downloaded = response.raw.tell()
+        finally:
+            response.close()
+        
+        saved = max(0, content_length - downloaded) if content_length else 0
+        self.record_transfer(downloaded, saved)
+        if result is not None:
+            result['bytes'] += downloaded
+        return extractor.finish()
+
+    def record_transfer(self, downloaded, saved):
+        """Учёт скачанных байт и байт, которые не пришлось скачивать"""
+        self.stats.update({'bytes_downloaded': downloaded, 'bytes_saved': saved})
+
+    def record_non_text_skip(self, content_length):
+        """Учёт ответа, тело которого не скачивалось из-за Content-Type"""
+        self.stats.update({'non_text_skipped': 1, 'bytes_saved': content_length})
+
+    def update_pool_stats(self):
+        """Перенос счётчиков пула соединений в статистику"""
+        hits, misses = self.session_pool.pool_counters()
+        self.stats.set('pool_hits', hits)
+        self.stats.set('pool_misses', misses)
+
+    def new_site_result(self, url):
+        """Запись о сканировании сайта для result_store; движки дополняют её по ходу загрузки.
+
+        status до загрузки - 'failed' (не удалось подключиться), затем
+        'http_error', 'non_text', 'error', 'success' или 'no_emails';
+        'robots_disallowed' - главная запрещена в robots.txt (вежливый режим).
+        """
+        return {
+            'domain': urlparse(url).hostname if url.startswith('http') else url,
+            'status': 'failed',
+            'final_url': None,
+            'http_status': None,
+            'first_byte_seconds': None,
+            'total_seconds': None,
+            'bytes': 0,
+            'emails': [],
+            'run_started': self.stats['start_time'],
+            'started': time.monotonic()
+        }
+
+    def record_total_time(self, seconds, total_timeout):
+        """Замер загрузки сайта для адаптивного таймаута; обрезанная по сроку загрузка - истёкший таймаут"""
+        if seconds >= total_timeout:
+            self.timeouts.expired('total')
+        else:
+            self.timeouts.observe('total', seconds)
+
+    def record_first_byte(self, result, http_status):
+        """Код ответа и время от начала сканирования сайта до получения заголовков"""
+        result['http_status'] = http_status
+        result['first_byte_seconds'] = round(time.monotonic() - result['started'], 3)
+
+    def store_result(self, result):
+        """Передача записи о сайте в result_store (запись в базу - в потоке хранилища),
+        отметка домена проверенным во фронтире и, при окончательном статусе, в фильтре"""
+        if result is None:
+            return
+        if self.stopped_midway(result):
+            return
+        self.mark_frontier_done(result['domain'])
+        self.mark_visited(result)
+        if self.result_store is None:
+            return
+        result['total_seconds'] = round(time.monotonic() - result['started'], 3)
+        self.result_store.add(result)
+
+    def stopped_midway(self, result):
+        """Загрузка прервана остановкой: домен остаётся во фронтире до продолжения
+        и не учитывается в статистике, иначе при продолжении он будет посчитан дважды"""
+        return result is not None and result['status'] not in VISITED_STATUSES and self.stop_event.is_set()
+
+    def mark_frontier_done(self, domain):
+        """Домен проверен: удаляется из фронтира порциями по 200"""
+        with self.frontier_lock:
+            self.frontier_done.append(domain)
+            if len(self.frontier_done) < 200:
+                return
+            done, self.frontier_done = self.frontier_done, []
+        self.frontier.done_many(done)
+
+    def flush_frontier_done(self):
+        with self.frontier_lock:
+            done, self.frontier_done = self.frontier_done, []
+        if done:
+            self.frontier.done_many(done)
+
+    def record_site_failure(self, result=None):
+        """Учёт сайта, который не удалось загрузить"""
+        if self.stopped_midway(result):
+            return
+        counts = {'total_sites_checked': 1, 'sites_processed': 1}
+        if result is not None and result['status'] in ('failed', 'error'):
+            # Не подключились или оборвалось соединение (сигнал перегрузки для ConcurrencyController)
+            counts['fetch_errors'] = 1
+        self.stats.update(counts)
+        self.store_result(result)
+
+    def record_page_emails(self, original_url, final_url, emails, result=None):
+        """Учёт найденных на странице email и обновление статистики.
+
+        Общая часть для всех движков загрузки: результат и изменения
+        stats/found_emails не зависят от того, как была получена страница.
+        """
+        if result is not None:
+            result['status'] = 'success' if emails else 'no_emails'
+            result['emails'] = list(emails)
+            result['final_url'] = result['final_url'] or final_url or original_url
+            self.store_result(result)
+        
+        # Новые адреса - в found_emails и журнал
+        if emails:
+            with self.email_lock:
+                if self.scale_mode:
+                    new_emails = self.found_emails.update(emails)
+                else:
+                    new_emails = [email for email in emails if email not in self.found_emails]
+                    self.found_emails.update(new_emails)
+            self.email_journal.append(new_emails)
+            if new_emails:
+                self.stats.add('unique_emails', len(new_emails))
+        
+        # Обновляем статистику (прогресс выводит monitor_scan)
+        if emails:
+            self.stats.update({'total_sites_checked': 1, 'sites_processed': 1, 'sites_with_emails': 1, 'total_emails_found': len(emails)})
+            if self.stats['first_email_seconds'] is None:
+                started = datetime.fromisoformat(self.stats['start_time'])
+                self.stats.set_once('first_email_seconds', round((datetime.now() - started).total_seconds(), 2))
+        else:
+            self.stats.update({'total_sites_checked': 1, 'sites_processed': 1})
+        
+        if emails:
+            logger.info(f"🎯 Найдено {len(emails)} email на {original_url}")
+            for email in emails:
+                logger.info(f"  📧 {email}")
+            return {
+                'url': final_url or original_url,
+                'emails': emails,
+                'status': 'success'
+            }
+        
+        return {
+            'url': final_url or original_url,
+            'emails': [],
+            'status': 'no_emails'
+        }
 
     def save_emails_to_file(self):
-        """Сохранение email в файл"""
+        """Дозапись журнала и экспорт всех email в found_emails.txt"""
         try:
-            with open('found_emails.txt', 'w', encoding='utf-8') as f:
-                for email in sorted(self.found_emails):
-                    f.write(f"{email}\n")
+            self.email_journal.flush(timeout=60)
+            self.export_emails('found_emails.txt')
         except Exception as e:
             logger.error(f"Ошибка сохранения email: {e}")
 
+    def export_emails(self, filename):
+        """Запись всех найденных email в файл в алфавитном порядке.
+
+        В режиме масштаба адреса читаются с диска порциями, уже упорядоченными.
+        """
+        emails = self.found_emails if self.scale_mode else sorted(self.found_emails)
+        with open(filename, 'w', encoding='utf-8') as f:
+            for email in emails:
+                f.write(f"{email}\n")
+
     def save_progress(self):
-        """Сохранение полного прогресса в JSON"""
+        """Снимок прогресса в scan_progress.json.
+
+        В снимке только статистика и пути к журналу email и базам, поэтому
+        его размер не зависит от числа найденных адресов. Файл пишется во
+        временный и переименовывается - при сбое остаётся прежний снимок;
+        если с прошлого снимка ничего не изменилось, запись пропускается.
+        """
         try:
+            statistics = self.stats.snapshot()
             data = {
-                'statistics': self.stats,
-                'emails_found': list(self.found_emails),
-                'last_update': datetime.now().isoformat()
+                'statistics': statistics,
+                'emails_count': statistics['unique_emails'],
+                'emails_journal': self.email_journal.path,
+                'results_db': self.result_store.path if self.result_store is not None else None,
+                'state_db': self.state_store.path
             }
-            with open('scan_progress.json', 'w', encoding='utf-8') as f:
+            snapshot = json.dumps(data, ensure_ascii=False, sort_keys=True)
+            if snapshot == self.last_progress_snapshot:
+                return
+            data['last_update'] = datetime.now().isoformat()
+            temp_path = f"{self.progress_path}.tmp"
+            with open(temp_path, 'w', encoding='utf-8') as f:
                 json.dump(data, f, ensure_ascii=False, indent=2)
+            os.replace(temp_path, self.progress_path)
+            self.last_progress_snapshot = snapshot
         except Exception as e:
             logger.error(f"Ошибка при сохранении прогресса: {e}")
 
-    def worker(self):
-        """Рабочий поток для обработки URL"""
+    def run_progress_snapshots(self, finished):
+        """Фоновый поток: снимок прогресса раз в progress_interval секунд и последний - по finished"""
+        while not finished.wait(self.progress_interval):
+            self.save_progress()
+        self.save_progress()
+
+    def worker(self, index=0):
+        """Рабочий поток для обработки URL; воркер index ждёт, пока он в пределах числа загрузок"""
         while not self.stop_event.is_set():
+            if self.concurrency is not None and not self.concurrency.wait_for_slot(index, timeout=1):
+                continue
             try:
-                url = self.url_queue.get(timeout=1)
+                url = self.fetch_queue.get(timeout=1)
                 if url is None:
+                    if self.concurrency is not None:
+                        self.concurrency.finish()
                     break
                 
                 self.scan_single_url(url)
-                self.url_queue.task_done()
+                self.fetch_queue.task_done()
                 
             except:
                 continue
 
-    def run_mass_scan(self, total_sites=1000, search_query=None):
-        """Запуск массового сканирования с возможностью поиска по запросу"""
+    def run_mass_scan(self, total_sites=1000, search_query=None, engine='threads', resume=False, extract_processes=None):
+        """Запуск массового сканирования с возможностью поиска по запросу.
+
+        Стадии работают одновременно, как конвейер: поиск кандидатов ->
+        фронтир на диске -> проверка DNS (dns_concurrency запросов) ->
+        загрузка страниц (max_workers). Домен уходит на загрузку сразу
+        после того, как разрешился; между DNS и загрузкой - ограниченная
+        url_queue.
+
+        engine: 'threads' - поток на каждый запрос (requests),
+                'async' - асинхронный движок, max_workers задаёт число одновременных загрузок.
+        resume: продолжить прерванное сканирование из контрольной точки в
+                state_dir - с тем же запросом и числом сайтов, без повторного
+                поиска и без уже проверенных доменов. Если незавершённого
+                сканирования нет, оно начинается заново.
+        extract_processes: искать email в пуле из стольких процессов, чтобы
+                разбор страниц не упирался в одно ядро (None - self.extract_processes).
+        """
+        if engine not in ENGINES:
+            raise ValueError(f"Неизвестный движок сканирования: {engine}")
+        if extract_processes is not None:
+            self.extract_processes = extract_processes
+        os.makedirs(self.state_dir, exist_ok=True)
+        try:
+            self.run_campaign(total_sites, search_query, engine, resume)
+        finally:
+            self.close_state()
+
+    def run_campaign(self, total_sites, search_query, engine, resume):
+        """Стадии run_mass_scan: контрольная точка, конвейер, итоги"""
+        # Сайты, загруженные до прерывания, входят в total_sites
+        processed_before = 0
+        if resume and self.restore_checkpoint():
+            total_sites = self.campaign['total_sites']
+            search_query = self.campaign['search_query']
+            processed_before = self.stats['sites_processed']
+        else:
+            if resume:
+                logger.info("ℹ️ Незавершённого сканирования нет, запуск с начала")
+            self.start_campaign(total_sites, search_query)
+        
         logger.info(f"🎯 Запуск массового сканирования на {total_sites} сайтов...")
         
         if search_query:
@@ -676,94 +1292,584 @@ class MassWebsiteEmailScanner:
         if not self.setup_proxy():
             logger.info("⚠️ Работа без прокси")
         
-        all_domains = []
+        logger.info(f"🚀 Конвейер: поиск → DNS (до {self.dns_concurrency} запросов) → загрузка (до {self.max_workers})")
         
-        # Если есть поисковый запрос, сначала ищем сайты по нему
-        if search_query:
-            search_domains = self.search_sites_by_query(search_query, max_results=min(200, total_sites))
-            all_domains.extend(search_domains)
-            logger.info(f"✅ Добавлено {len(search_domains)} сайтов из поиска")
-            
-            # Если нашли достаточно сайтов по запросу, используем только их
-            if len(search_domains) >= total_sites:
-                existing_domains = search_domains[:total_sites]
-            else:
-                # Дополняем сайтами из других источников
-                remaining_sites = total_sites - len(search_domains)
-                other_domains = self.load_domains_from_sources(max_domains=remaining_sites * 2)
-                existing_other_domains = self.find_existing_domains(other_domains, max_domains=remaining_sites)
-                all_domains.extend(existing_other_domains)
-                existing_domains = all_domains
+        threads, consumers = self.start_scan_stage(engine, self.max_workers)
+        stage_threads = []
+        # Поиск складывает кандидатов во фронтир на диске, DNS читает оттуда
+        self.discovery_finished.clear()
+        if self.campaign['discovery_finished']:
+            self.discovery_finished.set()
         else:
-            # Старый режим - только случайные сайты
-            all_domains = self.load_domains_from_sources(max_domains=total_sites * 2)
-            existing_domains = self.find_existing_domains(all_domains, max_domains=total_sites)
+            candidates = itertools.islice(
+                self.iter_candidate_domains(total_sites, search_query), self.campaign['candidates_consumed'], None
+            )
+            discovery = threading.Thread(target=self.fill_frontier, args=(candidates,))
+            discovery.daemon = True
+            discovery.start()
+            stage_threads.append(discovery)
+        
+        resolver = threading.Thread(
+            target=self.resolve_stage, args=(self.iter_frontier(), total_sites - processed_before, consumers)
+        )
+        resolver.daemon = True
+        resolver.start()
+        
+        self.monitor_scan(stage_threads + [resolver] + threads, total_sites)
+        self.campaign['completed'] = self.campaign['resolve_finished'] and not self.interrupted
+        self.save_checkpoint()
+        self.save_emails_to_file()
+        
+        self.print_final_stats()
+
+    def start_campaign(self, total_sites, search_query):
+        """Новое сканирование: пустые фронтир и найденные email, новая контрольная точка"""
+        self.frontier.clear()
+        # В режиме масштаба found_emails на диске: там email прошлых сканирований
+        self.found_emails.clear()
+        self.campaign = {
+            'total_sites': total_sites,
+            'search_query': search_query,
+            # Результаты поиска сохраняются, чтобы при продолжении не искать заново
+            'search_domains': None,
+            # Сколько кандидатов из iter_candidate_domains уже во фронтире
+            'candidates_consumed': 0,
+            'discovery_finished': False,
+            'resolve_finished': False,
+            'completed': False,
+            'stats': None
+        }
+        self.save_checkpoint()
+
+    def restore_checkpoint(self):
+        """Загрузка незавершённого сканирования: статистика, найденные email,
+        возврат во фронтир доменов, проверка которых была прервана.
+
+        False, если продолжать нечего.
+        """
+        campaign = self.checkpoint.load()
+        if not campaign or campaign['completed']:
+            return False
         
-        if not existing_domains:
-            logger.error("❌ Не удалось найти существующие домены")
+        self.campaign = campaign
+        self.campaign['resolve_finished'] = False
+        if campaign['stats']:
+            self.stats.load(campaign['stats'])
+        # Email этого сканирования (run_started - время его первого запуска)
+        if not self.scale_mode and self.result_store is not None:
+            rows = self.result_store.query(
+                'SELECT DISTINCT emails.email FROM emails JOIN sites ON sites.id = emails.site_id WHERE sites.run_started = ?',
+                (self.stats['start_time'],)
+            )
+            self.found_emails.update(email for (email,) in rows)
+        # Контрольные точки прошлых версий не содержат счётчика
+        self.stats.set('unique_emails', len(self.found_emails))
+        # Домены, взятые из фронтира до прерывания, проверяются заново
+        self.frontier.release_taken()
+        logger.info(f"♻️ Продолжение сканирования от {self.stats['start_time']}: проверено {self.stats['sites_processed']}, "
+                    f"во фронтире {len(self.frontier)} доменов, email: {self.stats['unique_emails']}")
+        return True
+
+    def save_checkpoint(self):
+        """Контрольная точка: проверенные домены (фильтр и фронтир), позиция поиска, статистика"""
+        if self.campaign is None:
             return
+        try:
+            self.flush_frontier_done()
+            self.save_visited()
+            self.campaign['stats'] = self.stats.snapshot()
+            self.checkpoint.save(self.campaign)
+        except Exception as e:
+            logger.error(f"Ошибка сохранения контрольной точки: {e}")
+
+    def iter_candidate_domains(self, total_sites, search_query=None):
+        """Стадия поиска: домены-кандидаты (генератор).
+
+        Сначала сайты по запросу (если он задан), затем публичные списки,
+        генерация и domains.txt - с запасом в два раза на несуществующие.
+        Результаты поиска запоминаются в контрольной точке, поэтому при
+        продолжении сканирования последовательность кандидатов та же.
+        """
+        remaining_sites = total_sites
         
-        logger.info(f"🚀 Начинаем сканирование {len(existing_domains)} сайтов...")
         if search_query:
-            logger.info(f"📋 Из них по запросу '{search_query}': {self.stats['search_sites_found']}")
+            found_domains = self.campaign['search_domains']
+            if found_domains is None:
+                found_domains = self.search_sites_by_query(search_query, max_results=min(200, total_sites))
+                self.campaign['search_domains'] = found_domains
+                logger.info(f"✅ Добавлено {len(found_domains)} сайтов из поиска")
+            yield from found_domains
+            # Если нашли достаточно сайтов по запросу, используем только их
+            remaining_sites = total_sites - len(found_domains)
+            if remaining_sites <= 0:
+                return
         
-        # Заполняем очередь URL
-        for domain in existing_domains:
-            self.url_queue.put(domain)
+        yield from self.load_domains_from_sources(max_domains=remaining_sites * 2)
+
+    def claim_domain(self, domain):
+        """Домен уходит на загрузку; False, если он уже проверен или был в этом запуске (повтор в кандидатах)"""
+        if domain not in self.visited_urls and self.run_domains.add(domain):
+            return True
+        self.stats.add('visited_skipped')
+        return False
+
+    def mark_visited(self, result):
+        """Отметка домена проверенным, если загрузка закончилась окончательным статусом"""
+        if result['status'] in VISITED_STATUSES:
+            self.visited_urls.add(result['domain'])
+
+    def save_visited(self):
+        """Сохранение фильтра проверенных доменов на диск"""
+        try:
+            self.visited_urls.save()
+        except Exception as e:
+            logger.error(f"Ошибка сохранения проверенных доменов: {e}")
+
+    def reset_visited(self):
+        """Очистка фильтра проверенных доменов: все домены будут проверены заново"""
+        self.visited_urls.clear()
+        if os.path.exists(self.visited_path):
+            os.remove(self.visited_path)
+        logger.info("🧹 Список проверенных доменов очищен")
+
+    def fill_frontier(self, candidates):
+        """Стадия поиска: новые кандидаты порциями сохраняются во фронтир.
+
+        Домены, уже проверенные в этом или прошлых запусках, пропускаются
+        ещё до DNS; число просмотренных кандидатов попадает в контрольную точку.
+        """
+        batch = []
+        consumed = self.campaign['candidates_consumed']
+        try:
+            for domain in candidates:
+                if self.stop_event.is_set():
+                    break
+                consumed += 1
+                if domain in self.visited_urls:
+                    self.stats.add('visited_skipped')
+                else:
+                    batch.append(domain)
+                if len(batch) >= 1000:
+                    self.frontier.push_many(batch)
+                    self.campaign['candidates_consumed'] = consumed
+                    batch = []
+            else:
+                self.frontier.push_many(batch)
+                self.campaign['candidates_consumed'] = consumed
+                self.campaign['discovery_finished'] = True
+        except Exception as e:
+            logger.error(f"Ошибка стадии поиска: {e}")
+        finally:
+            self.discovery_finished.set()
+
+    def iter_frontier(self):
+        """Домены из фронтира, пока поиск не закончен или фронтир не пуст"""
+        while not self.stop_event.is_set():
+            finished = self.discovery_finished.is_set()
+            batch = self.frontier.pop_many(256)
+            if batch:
+                yield from batch
+            elif finished:
+                return
+            else:
+                time.sleep(0.1)
+
+    def resolve_stage(self, candidates, max_sites, consumers):
+        """Стадия DNS: живые домены сразу уходят в url_queue на загрузку.
+
+        Когда url_queue заполнена, воркеры резолвера ждут свободного места,
+        поэтому DNS не убегает далеко вперёд загрузки. По окончании в
+        очередь ставится сигнал завершения для consumers читателей.
+        """
+        live = 0
         
-        # Запускаем рабочие потоки
-        threads = []
-        worker_count = min(self.max_workers, len(existing_domains))
+        async def on_result(result):
+            nonlocal live
+            if result['status'] == 'ok' and live < max_sites and self.claim_domain(result['domain']):
+                live += 1
+                self.resolved_ips[result['domain']] = result['ips']
+                await self.enqueue_url(result['domain'])
+            else:
+                self.mark_frontier_done(result['domain'])
+            return live >= max_sites or self.stop_event.is_set()
+        
+        try:
+            self.resolve_domains(candidates, on_result)
+            self.campaign['resolve_finished'] = not self.stop_event.is_set()
+        except Exception as e:
+            logger.error(f"Ошибка DNS-проверки: {e}")
+        finally:
+            logger.info(f"Найдено существующих доменов: {live}")
+            if not live:
+                logger.error("❌ Не удалось найти существующие домены")
+            self.feed_url_queue([], consumers)
+
+    async def enqueue_url(self, url):
+        """Постановка URL в ограниченную url_queue из event loop без его блокировки"""
+        while not self.stop_event.is_set():
+            if self.intake_allowed():
+                try:
+                    self.url_queue.put_nowait(url)
+                    self.sites_enqueued += 1
+                    return True
+                except Full:
+                    pass
+            await asyncio.sleep(0.05)
+        return False
+
+    def intake_allowed(self):
+        """Можно ли принять новый домен: при превышении бюджета памяти в работе
+        (в очереди и в загрузке) держится не больше половины max_workers сайтов"""
+        if not self.memory_pressure.is_set():
+            return True
+        in_progress = self.sites_enqueued - self.stats['sites_processed']
+        return in_progress < max(1, self.max_workers // 2)
+
+    def feed_url_queue(self, urls, consumers):
+        """Подача URL в ограниченную url_queue с ожиданием места, затем сигнал окончания для consumers читателей"""
+        for url in itertools.chain(urls, [None] * consumers):
+            while not self.stop_event.is_set():
+                if url is not None and not self.intake_allowed():
+                    time.sleep(0.1)
+                    continue
+                try:
+                    self.url_queue.put(url, timeout=1)
+                    if url is not None:
+                        self.sites_enqueued += 1
+                    break
+                except Full:
+                    continue
+
+    def iter_url_queue(self):
+        """URL из fetch_queue до сигнала окончания (источник для асинхронного движка)"""
+        while not self.stop_event.is_set():
+            try:
+                url = self.fetch_queue.get(timeout=1)
+            except Empty:
+                continue
+            if url is None:
+                return
+            yield url
+
+    def enable_politeness(self, per_host=1, per_ip=4, min_delay=0.0, max_delay=10.0, per_group=16, group_prefix=24):
+        """Вежливый режим: не больше per_host загрузок на хост, per_ip на IP и
+        per_group на сеть /group_prefix, паузы crawl-delay (не дольше
+        max_delay) и проверка robots.txt; сети, где первые страницы
+        одинаковы, загружаются в последнюю очередь"""
+        self.politeness = PolitenessScheduler(
+            per_host, per_ip, min_delay, max_delay, per_group=per_group, group_prefix=group_prefix
+        )
+        return self.politeness
+
+    def set_timeouts(self, connect=None, tls=None, first_byte=None, total=None):
+        """Постоянные таймауты фаз загрузки, сек (None - по замерам текущего запуска)"""
+        for phase, seconds in (('connect', connect), ('tls', tls), ('first_byte', first_byte), ('total', total)):
+            self.timeouts.set_override(phase, seconds)
+        return self.timeouts
+
+    def dispatch_polite(self, consumers):
+        """Вежливая раздача сайтов: url_queue -> планировщик -> fetch_queue.
+
+        Сайт уходит воркерам, только когда планировщик разрешает загрузку
+        с его хоста, IP и сети; иначе он откладывается, и воркеры получают
+        сайты других хостов. Сайты сетей с одинаковыми страницами выдаются,
+        только когда url_queue пуста. Когда отложено max_deferred сайтов,
+        url_queue не читается, чтобы DNS не убегал вперёд. После сигнала
+        окончания в url_queue и загрузки отложенных сайтов сигнал получают
+        consumers читателей fetch_queue.
+        """
+        scheduler = self.politeness
+        ended = False
+        # Новых сайтов нет: можно загружать сайты сетей с одинаковыми страницами
+        drained = False
+        try:
+            while not self.stop_event.is_set():
+                for url in scheduler.pop_ready(drained or ended):
+                    self.put_fetch(url)
+                pending = scheduler.pending()
+                drained = pending >= self.max_deferred
+                if ended:
+                    if scheduler.idle():
+                        break
+                elif not drained:
+                    try:
+                        # Пока есть отложенные сайты, ждём не url_queue, а освобождения слотов
+                        url = self.url_queue.get_nowait() if pending else self.url_queue.get(timeout=0.02)
+                    except Empty:
+                        url = False
+                        drained = True
+                    if url is None:
+                        ended = True
+                        continue
+                    if url:
+                        ip = (self.resolved_ips.get(url) or self.resolved_ips.get(site_host(url)) or [None])[0]
+                        if scheduler.submit(url, site_host(url), ip):
+                            self.put_fetch(url)
+                        else:
+                            self.stats.add('politeness_deferred')
+                        continue
+                    if not pending:
+                        continue
+                scheduler.wait(0.02)
+        except Exception as e:
+            logger.error(f"Ошибка планировщика загрузки: {e}")
+        finally:
+            for _ in range(consumers):
+                self.put_fetch(None)
+
+    def put_fetch(self, url):
+        """Передача сайта воркерам через ограниченную fetch_queue"""
+        while not self.stop_event.is_set():
+            try:
+                self.fetch_queue.put(url, timeout=1)
+                return
+            except Full:
+                continue
+
+    def start_scan_stage(self, engine, concurrency):
+        """Стадия загрузки: воркеры читают url_queue до сигнала окончания.
+
+        В вежливом режиме url_queue читает планировщик, а воркеры - fetch_queue.
+        Возвращает (потоки стадии, число читателей url_queue).
+        """
+        if self.extract_processes and self.extraction_pool is None:
+            self.extraction_pool = ExtractionPool(
+                self.extract_processes, max_emails=self.stop_after_emails, stop_at_footer=self.stop_at_footer
+            )
+            logger.info(f"🧮 Поиск email в {self.extraction_pool.processes} процессах")
+        
+        if self.politeness is None:
+            self.fetch_queue = self.url_queue
+            return self.start_fetch_workers(engine, concurrency)
         
-        for i in range(worker_count):
-            t = threading.Thread(target=self.worker)
+        logger.info(f"🤝 Вежливый режим: до {self.politeness.per_host} загрузок на хост, до {self.politeness.per_ip} на IP")
+        self.fetch_queue = Queue(maxsize=max(1, concurrency))
+        threads, consumers = self.start_fetch_workers(engine, concurrency)
+        # Планировщик выдаёт сайтов не больше, чем сейчас загрузок
+        self.politeness.capacity = self.concurrency.limit
+        self.concurrency.listeners.append(self.sync_politeness_capacity)
+        dispatcher = threading.Thread(target=self.dispatch_polite, args=(consumers,))
+        dispatcher.daemon = True
+        dispatcher.start()
+        return [dispatcher] + threads, 1
+
+    def start_fetch_workers(self, engine, concurrency):
+        """Воркеры загрузки, читающие fetch_queue: (потоки, число читателей).
+
+        Запускается concurrency воркеров; сколько из них загружают сайты
+        одновременно, решает ConcurrencyController (self.concurrency).
+        """
+        self.concurrency = ConcurrencyController(concurrency, self.min_workers, enabled=self.adaptive_concurrency)
+        self.stats.set('concurrency', self.concurrency.limit)
+        if self.adaptive_concurrency:
+            logger.info(f"🎚️ Число загрузок подбирается автоматически: от {self.concurrency.limit} до {concurrency}")
+        if engine == 'async':
+            logger.info(f"⚡ Асинхронный движок: до {concurrency} одновременных загрузок")
+            async_engine = AsyncFetchEngine(self, concurrency=concurrency)
+            runner = threading.Thread(target=async_engine.run, args=(self.iter_url_queue(),))
+            runner.daemon = True
+            runner.start()
+            return [runner], 1
+        
+        threads = []
+        for i in range(concurrency):
+            t = threading.Thread(target=self.worker, args=(i,))
             t.daemon = True
             t.start()
             threads.append(t)
+        return threads, concurrency
+
+    def sync_politeness_capacity(self):
+        self.politeness.capacity = self.concurrency.limit
+
+    def run_concurrency_control(self, finished):
+        """Шаги регулятора числа загрузок раз в его interval, пока работают стадии"""
+        while self.concurrency is not None and not finished.wait(self.concurrency.interval):
+            self.adjust_concurrency()
+
+    def adjust_concurrency(self):
+        """Шаг регулятора числа загрузок по статистике, таймаутам и загрузке CPU"""
+        if self.concurrency is None:
+            return
+        stats = self.stats.snapshot()
+        before = self.concurrency.limit
+        limit = self.concurrency.update(
+            stats['sites_processed'],
+            stats['fetch_errors'],
+            sum(self.timeouts.expired_counts.values()),
+            psutil.cpu_percent(interval=None),
+            # Сайты ждут в очереди - воркеров не хватает
+            self.fetch_queue.qsize() > 0
+        )
+        if limit != before:
+            logger.debug(f"🎚️ Одновременных загрузок: {before} → {limit}")
+            self.stats.set('concurrency', limit)
+
+    def scan_domains(self, domains, engine='threads'):
+        """Сканирование списка или генератора доменов/URL выбранным движком.
+
+        Домены подаются в ограниченную url_queue по мере её освобождения,
+        поэтому генератор читается не быстрее, чем идёт загрузка.
+        """
+        total = len(domains) if hasattr(domains, '__len__') else None
+        if total == 0:
+            return
         
-        # Мониторим прогресс
+        os.makedirs(self.state_dir, exist_ok=True)
+        try:
+            threads, consumers = self.start_scan_stage(engine, min(self.max_workers, total or self.max_workers))
+            feeder = threading.Thread(target=self.feed_url_queue, args=(domains, consumers))
+            feeder.daemon = True
+            feeder.start()
+            
+            self.monitor_scan([feeder] + threads, total or '?')
+            self.save_emails_to_file()
+        finally:
+            self.close_state()
+
+    def close_state(self):
+        """Конец сканирования: запись очередей и закрытие файлов состояния.
+
+        Хранилища не пропадают: при следующем обращении (например, экспорт
+        email из интерфейса) файлы открываются снова.
+        """
+        for writer in (self.email_journal, self.result_store):
+            if writer is not None and not writer.close(timeout=60):
+                logger.warning(f"⚠️ Не всё записано в {writer.path}")
+        for store in (self.robots_cache, self.scheme_cache, self.dns_cache, self.state_store):
+            if store is not None:
+                store.close()
+
+    def monitor_scan(self, threads, total):
+        """Вывод прогресса и контрольные точки, пока работают стадии; снимки прогресса - в отдельном потоке"""
+        snapshots_finished = threading.Event()
+        snapshots = threading.Thread(target=self.run_progress_snapshots, args=(snapshots_finished,))
+        snapshots.daemon = True
+        snapshots.start()
+        control = threading.Thread(target=self.run_concurrency_control, args=(snapshots_finished,))
+        control.daemon = True
+        control.start()
         try:
             last_count = 0
-            while not self.url_queue.empty():
+            last_checkpoint = time.time()
+            while any(t.is_alive() for t in threads):
                 current_processed = self.stats['sites_processed']
+                self.update_pool_stats()
+                self.check_memory()
+                
+                if time.time() - last_checkpoint >= self.checkpoint_interval:
+                    self.save_checkpoint()
+                    last_checkpoint = time.time()
                 
                 if current_processed >= last_count + 10:
-                    logger.info(f"📈 Прогресс: {current_processed}/{len(existing_domains)} сайтов, email: {len(self.found_emails)}")
+                    logger.info(f"📈 Прогресс: {current_processed}/{total} сайтов, email: {self.stats['unique_emails']}")
                     last_count = current_processed
-                    self.save_progress()
                 
-                time.sleep(1)
-                
-                if current_processed >= len(existing_domains):
-                    break
+                # Раз в секунду, но сразу после окончания стадий, а не на следующем такте
+                tick_end = time.monotonic() + 1
+                for t in threads:
+                    t.join(max(0.0, tick_end - time.monotonic()))
                     
         except KeyboardInterrupt:
             logger.info("⏹️ Сканирование прервано пользователем")
             self.stop_event.set()
         finally:
-            self.url_queue.join()
+            # Остановка до окончания стадий (stop_scan, Ctrl+C): сканирование можно продолжить
+            self.interrupted = self.stop_event.is_set()
+            for t in threads:
+                t.join()
             self.stop_event.set()
-            time.sleep(2)
+            self.update_pool_stats()
+            if self.extraction_pool is not None:
+                self.extraction_pool.close()
+                self.extraction_pool = None
+            # Ожидание записи ограничено: зависший диск не должен держать окончание сканирования
+            if self.result_store is not None and not self.result_store.flush(timeout=60):
+                logger.warning("⚠️ Не все результаты по сайтам записаны в базу")
+            snapshots_finished.set()
+            snapshots.join()
+            control.join()
+
+    def check_memory(self):
+        """Сравнение RSS процесса с memory_budget_mb.
+
+        При превышении число сайтов в работе уменьшается вдвое (см.
+        intake_allowed), сбрасываются кодировки хостов и кэши страниц SQLite;
+        обычный режим возвращается, когда RSS опустится ниже 90% бюджета.
+
+        Бюджет мягкий: уже загружаемые сайты дорабатывают, found_emails в
+        обычном режиме (множество в памяти) не сокращается, а освобождённую
+        память аллокатор часто не возвращает системе, поэтому RSS может
+        оставаться выше бюджета и после снижения нагрузки. Для больших
+        сканирований - режим масштаба.
+        """
+        rss_mb = self.process.memory_info().rss / 1048576
+        self.stats.set('rss_mb', round(rss_mb, 1))
+        if not self.memory_budget_mb:
+            return
         
-        self.print_final_stats()
+        if rss_mb > self.memory_budget_mb:
+            if not self.memory_pressure.is_set():
+                self.memory_pressure.set()
+                self.stats.add('memory_pauses')
+                logger.warning(f"⚠️ Память {rss_mb:.0f} МБ превышает бюджет {self.memory_budget_mb} МБ, число сайтов в работе уменьшено")
+                self.charset_resolver.host_cache.clear()
+                for cache in (self.dns_cache, self.robots_cache, self.scheme_cache):
+                    if cache is not None:
+                        cache.shrink_memory()
+                gc.collect()
+        elif self.memory_pressure.is_set() and rss_mb < self.memory_budget_mb * 0.9:
+            self.memory_pressure.clear()
+            logger.info(f"✅ Память {rss_mb:.0f} МБ, обычный режим приёма доменов")
 
     def print_final_stats(self):
         """Вывод финальной статистики"""
+        stats = self.stats.snapshot()
         logger.info("\n" + "="*60)
         logger.info("📊 ФИНАЛЬНАЯ СТАТИСТИКА")
         logger.info("="*60)
-        logger.info(f"Всего проверено сайтов: {self.stats['total_sites_checked']}")
-        if self.stats['search_sites_found'] > 0:
-            logger.info(f"Сайтов из поиска: {self.stats['search_sites_found']}")
-        logger.info(f"Сайтов с email: {self.stats['sites_with_emails']}")
-        logger.info(f"Всего найдено email: {self.stats['total_emails_found']}")
-        logger.info(f"Уникальных email: {len(self.found_emails)}")
-        
-        start_time = datetime.fromisoformat(self.stats['start_time'])
+        logger.info(f"Всего проверено сайтов: {stats['total_sites_checked']}")
+        if stats['search_sites_found'] > 0:
+            logger.info(f"Сайтов из поиска: {stats['search_sites_found']}")
+        logger.info(f"Сайтов с email: {stats['sites_with_emails']}")
+        logger.info(f"Всего найдено email: {stats['total_emails_found']}")
+        logger.info(f"Уникальных email: {stats['unique_emails']}")
+        if stats['visited_skipped']:
+            logger.info(f"Пропущено уже проверенных доменов: {stats['visited_skipped']} (в фильтре {len(self.visited_urls)}, {self.visited_urls.size_bytes() / 1048576:.1f} МБ)")
+        if stats['robots_blocked'] or stats['politeness_deferred']:
+            logger.info(f"Вежливый режим: запрещено robots.txt {stats['robots_blocked']}, отложено планировщиком {stats['politeness_deferred']}")
+        if stats['groups_deprioritized']:
+            logger.info(f"Сетей с одинаковыми страницами (сайты отложены в конец): {stats['groups_deprioritized']}")
+        if stats['memory_pauses']:
+            logger.info(f"Память: {stats['rss_mb']} МБ, бюджет превышался {stats['memory_pauses']} раз")
+        if stats['first_email_seconds'] is not None:
+            logger.info(f"Первый email найден через {stats['first_email_seconds']} с")
+        logger.info(f"Скачано: {stats['bytes_downloaded'] / 1048576:.1f} МБ, сэкономлено: {stats['bytes_saved'] / 1048576:.1f} МБ")
+        if self.result_store is not None:
+            logger.info(f"Результаты по сайтам: {self.result_store.path}")
+        if self.concurrency is not None and self.concurrency.enabled:
+            logger.info(f"Одновременных загрузок в конце: {self.concurrency.limit} из {self.concurrency.max_limit} (снижений: {self.concurrency.decreases})")
+        if stats['pool_hits'] or stats['pool_misses']:
+            logger.info(f"Пул соединений: переиспользовано {stats['pool_hits']}, открыто новых {stats['pool_misses']}")
+        if stats['scheme_cache_hits']:
+            logger.info(f"Сайтов по сохранённому адресу (без перебора схем и редиректов): {stats['scheme_cache_hits']}")
+        timeouts = self.timeouts.snapshot()
+        expired = self.timeouts.expired_counts
+        logger.info(
+            f"Таймауты, с: подключение {timeouts['connect']}, TLS {timeouts['tls']}, первый байт {timeouts['first_byte']}, "
+            f"загрузка {timeouts['total']} (истекло: {expired['connect']}/{expired['tls']}/{expired['first_byte']}/{expired['total']})"
+        )
+        if stats['dns_cache_hits'] or stats['dns_cache_misses']:
+            logger.info(f"Кэш DNS: из кэша {stats['dns_cache_hits']}, запрошено {stats['dns_cache_misses']} ({stats['dns_cache_hit_rate']:.0%} попаданий)")
+        
+        start_time = datetime.fromisoformat(stats['start_time'])
         work_time = datetime.now() - start_time
         logger.info(f"Время работы: {work_time}")
 
 if __name__ == "__main__":
+    # Процессы пула поиска email в собранном exe
+    multiprocessing.freeze_support()
+    
     # Прокси список
     proxy_list = [
         "191.102.154.117:9571:D2mBXc:SLokbJ",
@@ -789,13 +1895,16 @@ if __name__ == "__main__":
         
         choice = input("Введите номер (1 или 2): ").strip()
         
+        scale_mode = input("Режим масштаба - состояние на диске (y/N): ").strip().lower() == "y"
+        resume = input("Продолжить прерванное сканирование, если оно есть (y/N): ").strip().lower() == "y"
+        
         if choice == "1":
-            scanner = MassWebsiteEmailScanner(proxies=proxy_list, max_workers=max_workers)
+            scanner = MassWebsiteEmailScanner(proxies=proxy_list, max_workers=max_workers, scale_mode=scale_mode)
         else:
-            scanner = MassWebsiteEmailScanner(proxies=[], max_workers=max_workers)
+            scanner = MassWebsiteEmailScanner(proxies=[], max_workers=max_workers, scale_mode=scale_mode)
         
         # Запускаем сканирование
-        scanner.run_mass_scan(total_sites=total_sites, search_query=search_query if search_query else None)
+        scanner.run_mass_scan(total_sites=total_sites, search_query=search_query if search_query else None, resume=resume)
         
     except KeyboardInterrupt:
         print("\n⏹️ Сканирование прервано пользователем")
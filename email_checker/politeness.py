@@ -0,0 +1,437 @@
+import hashlib
+import heapq
+import ipaddress
+import math
+import threading
+import time
+from collections import deque
+from urllib.parse import urlsplit
+from urllib.robotparser import RobotFileParser
+
+from sqlite_cache import SQLiteCache
+
+# Google и RFC 9309: robots.txt читается не дальше первых 500 КиБ
+ROBOTS_MAX_BYTES = 512000
+
+
+def site_host(url):
+    """Хост сайта: для URL - имя из него, для домена без схемы - сам домен"""
+    return urlsplit(url).hostname if url.startswith('http') else url
+
+
+def robots_urls(url):
+    """Адреса robots.txt сайта: для домена без схемы - сначала https, затем http"""
+    if url.startswith('http'):
+        parts = urlsplit(url)
+        return [f'{parts.scheme}://{parts.netloc}/robots.txt']
+    return [f'https://{url}/robots.txt', f'http://{url}/robots.txt']
+
+
+def robots_crawl_delay(text, agent='*'):
+    """Crawl-delay из robots.txt для agent, в том числе дробный (RobotFileParser понимает только целые).
+
+    Группа выбирается как в RobotFileParser: первая, где имя из User-agent
+    входит в имя робота, иначе первая группа '*'. Crawl-delay других
+    групп не учитывается, даже если в выбранной его нет.
+    """
+    agent = agent.split('/')[0].lower()
+    groups = []
+    rules = False
+    for line in text.splitlines():
+        name, sep, value = line.split('#', 1)[0].partition(':')
+        if not sep:
+            continue
+        name, value = name.strip().lower(), value.strip()
+        if name == 'user-agent':
+            # User-agent после правил начинает новую группу
+            if rules or not groups:
+                groups.append(([], []))
+                rules = False
+            groups[-1][0].append(value.lower())
+        elif groups:
+            rules = True
+            if name == 'crawl-delay':
+                groups[-1][1].append(value)
+    matched = next((group for group in groups if any(name != '*' and name in agent for name in group[0])), None)
+    if matched is None:
+        matched = next((group for group in groups if '*' in group[0]), None)
+    if matched is None:
+        return None
+    for value in matched[1]:
+        try:
+            delay = float(value)
+        except ValueError:
+            continue
+        if math.isfinite(delay) and delay >= 0:
+            return delay
+    return None
+
+
+def robots_verdict(status, text, agent='*'):
+    """Решение по ответу на запрос robots.txt: (можно ли загружать главную, crawl-delay).
+
+    По RFC 9309: 200 - правила файла, 4xx - ограничений нет, 5xx -
+    сайт временно закрыт целиком. status None (не удалось подключиться)
+    считается отсутствием ограничений: главная страница всё равно будет
+    запрошена и, скорее всего, тоже не ответит.
+
+    Проверяется только путь '/': сканер загружает главную страницу, и
+    решение хранится в RobotsCache для хоста целиком. Запрет отдельных
+    разделов (Disallow: /private) не мешает сканированию, а страница, на
+    которую ведёт редирект с главной, по robots.txt не проверяется.
+    """
+    if status == 200:
+        parser = RobotFileParser()
+        parser.parse(text.splitlines())
+        return parser.can_fetch(agent, '/'), robots_crawl_delay(text, agent) or None
+    if status is not None and status >= 500:
+        return False, None
+    return True, None
+
+
+class RobotsBody:
+    """Тело robots.txt с интерфейсом экстрактора (feed/finish) для движков загрузки"""
+
+    def __init__(self, limit=ROBOTS_MAX_BYTES):
+        self.limit = limit
+        self.chunks = []
+        self.size = 0
+
+    def feed(self, chunk, final=False):
+        chunk = chunk[:self.limit - self.size]
+        self.chunks.append(chunk)
+        self.size += len(chunk)
+        return self.size >= self.limit
+
+    def finish(self):
+        return self.text
+
+    @property
+    def text(self):
+        return b''.join(self.chunks).decode('utf-8', 'replace')
+
+    @property
+    def emails(self):
+        return []
+
+
+class RobotsCache(SQLiteCache):
+    """Решения по robots.txt на диске (SQLite) между запусками.
+
+    Хранится не сам файл, а то, что нужно сканеру: разрешена ли главная
+    страница и crawl-delay хоста. Решение по файлу живёт ttl, по ошибке
+    сервера (5xx) - error_ttl; неудачные подключения не кэшируются.
+    """
+
+    table = 'robots'
+    key_column = 'host'
+    value_columns = ('allowed INTEGER NOT NULL', 'crawl_delay REAL')
+
+    def __init__(self, path='robots_cache.sqlite', ttl=86400, error_ttl=3600):
+        super().__init__(path)
+        self.ttl = ttl
+        self.error_ttl = error_ttl
+
+    def ttl_for(self, status):
+        if status is None:
+            return None
+        if status >= 500:
+            return self.error_ttl
+        return self.ttl
+
+    def get(self, host):
+        """Неустаревшее решение для хоста: (allowed, crawl_delay) или None"""
+        row = self.get_row(host)
+        if row is None:
+            return None
+        return bool(row[0]), row[1]
+
+    def put(self, host, status, verdict):
+        """Сохранение решения по ответу со статусом status; некэшируемые пропускаются"""
+        allowed, delay = verdict
+        self.put_rows([(host, (int(allowed), delay), self.ttl_for(status))])
+
+
+class PageFingerprint:
+    """Отпечаток начала страницы для сравнения страниц одной группы адресов.
+
+    Имя хоста из текста убирается: страницы парковки отличаются обычно
+    только им. Берутся первые limit байт - заглушки хостинга короткие.
+    """
+
+    def __init__(self, host, limit=65536):
+        self.host = host.encode('utf-8') if host else b''
+        self.limit = limit
+        self.chunks = []
+        self.size = 0
+
+    def feed(self, data):
+        if self.size < self.limit:
+            data = data[:self.limit - self.size]
+            self.chunks.append(data)
+            self.size += len(data)
+
+    def digest(self):
+        body = b''.join(self.chunks)
+        if self.host:
+            body = body.replace(self.host, b'')
+        return hashlib.blake2b(body, digest_size=8).digest()
+
+
+def ip_group(ip, prefix=24):
+    """Группа адреса: сеть /prefix для IPv4 (для IPv6 - /64)"""
+    try:
+        address = ipaddress.ip_address(ip)
+    except ValueError:
+        return ip
+    bits = prefix if address.version == 4 else 64
+    return str(ipaddress.ip_network(f'{ip}/{bits}', strict=False))
+
+
+class PolitenessScheduler:
+    """Планировщик вежливой загрузки: ограничения на хост, IP и группу адресов.
+
+    Одновременно загружается не больше per_host сайтов с одного хоста,
+    per_ip с одного адреса и per_group с одной сети /group_prefix
+    (виртуальный хостинг и парковки держат тысячи доменов на нескольких
+    соседних IP). После загрузки с хоста выдерживается его crawl-delay
+    (не дольше max_delay, по умолчанию - min_delay).
+
+    Сайт, который нельзя загрузить сейчас, не занимает воркер: он
+    откладывается, а воркеры получают сайты других хостов. Отложенный из-за
+    занятого ресурса сайт ждёт в очереди этого ресурса и возвращается при
+    освобождении слота, из-за паузы - в куче по времени.
+    Ключ сайта - строка, которую воркеры получают из очереди (домен или URL).
+
+    Группы проверяются по образцам: если первые sample_size страниц
+    группы одинаковы (парковка, заглушка хостинга), остальные её сайты
+    уходят в конец - загружаются, только когда других сайтов нет.
+    """
+
+    def __init__(self, per_host=1, per_ip=4, min_delay=0.0, max_delay=10.0, per_group=16, group_prefix=24, sample_size=5):
+        self.limits = {'host': per_host, 'ip': per_ip, 'group': per_group}
+        self.group_prefix = group_prefix
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.sample_size = sample_size
+        # Сколько сайтов могут загружаться одновременно (число воркеров); None - без ограничения
+        self.capacity = None
+        # Занятые слоты: {(вид, имя): число загрузок}
+        self.active = {}
+        # Когда хост снова можно загружать: {хост: time.monotonic()}
+        self.next_allowed = {}
+        self.crawl_delays = {}
+        # Выданные разрешения: {ключ: (хост, ресурсы)}
+        self.leases = {}
+        # Отложенные сайты: по занятому ресурсу, по времени, готовые к новой попытке и из похожих групп
+        self.blocked = {}
+        self.delayed = []
+        self.ready = deque()
+        self.low_priority = deque()
+        self.waiting = 0
+        # Отпечатки первых страниц групп и группы, где они совпали
+        self.group_samples = {}
+        self.deprioritized = set()
+        # Сайты, у которых robots.txt уже проверен (возвращены после паузы crawl-delay)
+        self.robots_checked = set()
+        self.sequence = 0
+        self.lock = threading.Lock()
+        # Устанавливается при освобождении слота: раздающему потоку пора вызвать pop_ready
+        self.changed = threading.Event()
+
+    @property
+    def per_host(self):
+        return self.limits['host']
+
+    @property
+    def per_ip(self):
+        return self.limits['ip']
+
+    @property
+    def per_group(self):
+        return self.limits['group']
+
+    def resources(self, host, ip):
+        if ip is None:
+            return (('host', host),)
+        return (('host', host), ('ip', ip), ('group', ip_group(ip, self.group_prefix)))
+
+    def blocker(self, host, resources, now):
+        """Что мешает загрузке: занятый ресурс, время окончания паузы или None"""
+        for resource in resources:
+            if self.active.get(resource, 0) >= self.limits[resource[0]]:
+                return resource
+        ready_at = self.next_allowed.get(host)
+        if ready_at is not None and ready_at > now:
+            return ready_at
+        return None
+
+    def try_lease(self, entry, now):
+        key, host, resources = entry
+        if self.blocker(host, resources, now) is not None:
+            return False
+        for resource in resources:
+            self.active[resource] = self.active.get(resource, 0) + 1
+        self.leases[key] = (host, resources)
+        return True
+
+    def park(self, entry, now):
+        reason = self.blocker(entry[1], entry[2], now)
+        if isinstance(reason, float):
+            self.sequence += 1
+            heapq.heappush(self.delayed, (reason, self.sequence, entry))
+        elif reason is not None:
+            self.blocked.setdefault(reason, deque()).append(entry)
+        else:
+            self.ready.append(entry)
+        self.waiting += 1
+
+    def wake(self, reason):
+        """Один сайт из очереди освободившегося ресурса - к новой попытке"""
+        waiters = self.blocked.get(reason)
+        if not waiters:
+            return
+        self.ready.append(waiters.popleft())
+        if not waiters:
+            del self.blocked[reason]
+
+    def submit(self, key, host, ip=None):
+        """Разрешение на загрузку сайта; False - сайт отложен и вернётся из pop_ready"""
+        resources = self.resources(host, ip)
+        entry = (key, host, resources)
+        with self.lock:
+            now = time.monotonic()
+            if len(resources) > 2 and resources[2] in self.deprioritized:
+                self.low_priority.append(entry)
+                self.waiting += 1
+                return False
+            if self.try_lease(entry, now):
+                return True
+            self.park(entry, now)
+            return False
+
+    def pop_ready(self, drained=False):
+        """Отложенные сайты, которые теперь можно загружать (разрешения уже выданы).
+
+        drained - новых сайтов сейчас нет: можно взять и сайты однородных
+        групп, но только на свободные места (выданных разрешений меньше capacity).
+        """
+        leased = []
+        with self.lock:
+            now = time.monotonic()
+            while self.delayed and self.delayed[0][0] <= now:
+                self.ready.append(heapq.heappop(self.delayed)[2])
+            for _ in range(len(self.ready)):
+                entry = self.ready.popleft()
+                self.waiting -= 1
+                if self.try_lease(entry, now):
+                    leased.append(entry[0])
+                else:
+                    self.park(entry, now)
+            if drained and not self.ready:
+                for _ in range(len(self.low_priority)):
+                    if self.capacity is not None and len(self.leases) >= self.capacity:
+                        break
+                    entry = self.low_priority.popleft()
+                    if self.try_lease(entry, now):
+                        self.waiting -= 1
+                        leased.append(entry[0])
+                    else:
+                        self.low_priority.append(entry)
+        return leased
+
+    def set_crawl_delay(self, host, delay):
+        """Crawl-delay хоста из robots.txt, не больше max_delay"""
+        with self.lock:
+            self.crawl_delays[host] = min(delay, self.max_delay)
+
+    def fingerprint(self, key):
+        """PageFingerprint для страницы сайта, если его группа ещё набирает образцы, иначе None"""
+        with self.lock:
+            lease = self.leases.get(key)
+            if lease is None or len(lease[1]) < 3:
+                return None
+            samples = self.group_samples.get(lease[1][2], ())
+            if len(samples) >= self.sample_size:
+                return None
+            return PageFingerprint(lease[0])
+
+    def record_sample(self, key, digest):
+        """Отпечаток страницы сайта в образцы его группы.
+
+        Возвращает сеть группы, если после этого образца группа признана
+        однородной и её остальные сайты уходят в конец, иначе None.
+        """
+        with self.lock:
+            lease = self.leases.get(key)
+            if lease is None or len(lease[1]) < 3:
+                return None
+            group = lease[1][2]
+            samples = self.group_samples.setdefault(group, [])
+            if len(samples) >= self.sample_size:
+                return None
+            samples.append(digest)
+            if len(samples) < self.sample_size or len(set(samples)) > 1:
+                return None
+            self.deprioritized.add(group)
+            # Уже отложенные сайты группы тоже уходят в конец
+            for resource in [resource for resource in self.blocked if resource == group or
+                             (resource[0] == 'ip' and ip_group(resource[1], self.group_prefix) == group[1])]:
+                self.low_priority.extend(self.blocked.pop(resource))
+            return group[1]
+
+    def release(self, key, requeue=False):
+        """Загрузка сайта закончена; пауза хоста отсчитывается с этого момента.
+
+        requeue - сайт возвращается в отложенные (например, после загрузки
+        robots.txt с crawl-delay главная страница загружается после паузы).
+        """
+        with self.lock:
+            lease = self.leases.pop(key, None)
+            if lease is None:
+                return
+            host, resources = lease
+            now = time.monotonic()
+            for resource in resources:
+                self.active[resource] -= 1
+                if not self.active[resource]:
+                    del self.active[resource]
+
+            delay = self.crawl_delays.get(host, self.min_delay)
+            if delay:
+                self.next_allowed[host] = now + delay
+            if requeue:
+                self.robots_checked.add(key)
+                self.park((key, host, resources), now)
+            else:
+                self.crawl_delays.pop(host, None)
+            for resource in resources:
+                self.wake(resource)
+
+            # Каждый хост загружается один-два раза: прошедшие паузы не храним
+            if len(self.next_allowed) > 10000:
+                self.next_allowed = {name: ready_at for name, ready_at in self.next_allowed.items() if ready_at > now}
+        self.changed.set()
+
+    def wait(self, timeout):
+        """Ожидание освобождения слота (или timeout секунд)"""
+        self.changed.wait(timeout)
+        self.changed.clear()
+
+    def take_robots_checked(self, key):
+        """True, если robots.txt сайта уже проверен до паузы crawl-delay"""
+        with self.lock:
+            if key in self.robots_checked:
+                self.robots_checked.discard(key)
+                return True
+            return False
+
+    def pending(self):
+        """Число отложенных сайтов"""
+        with self.lock:
+            return self.waiting
+
+    def idle(self):
+        """Нет ни отложенных сайтов, ни выданных разрешений"""
+        with self.lock:
+            return not self.waiting and not self.leases
@@ -0,0 +1,125 @@
+import logging
+import os
+import sqlite3
+import time
+
+from batch_writer import BatchWriter
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS sites ('
+    'id INTEGER PRIMARY KEY, domain TEXT NOT NULL, status TEXT NOT NULL, final_url TEXT, '
+    'http_status INTEGER, first_byte_seconds REAL, total_seconds REAL, bytes INTEGER NOT NULL DEFAULT 0, '
+    'scanned_at REAL NOT NULL, run_started TEXT)',
+    'CREATE TABLE IF NOT EXISTS emails (email TEXT NOT NULL, site_id INTEGER NOT NULL, domain TEXT NOT NULL)',
+    'CREATE INDEX IF NOT EXISTS sites_domain ON sites (domain)',
+    'CREATE INDEX IF NOT EXISTS emails_email ON emails (email)',
+    'CREATE INDEX IF NOT EXISTS emails_domain ON emails (domain)',
+)
+
+
+class ResultStore(BatchWriter):
+    """Результаты сканирования по сайтам в SQLite (WAL).
+
+    Для каждого сайта сохраняются статус, итоговый URL, код ответа,
+    время до первого байта и полное время, скачанные байты и найденные
+    email. Воркеры только кладут результат в очередь (add), в базу пишет
+    один поток порциями до batch_size сайтов в одной транзакции.
+    Повторный экспорт и выборки - запросы к базе, без пересканирования.
+    """
+
+    error_message = "Ошибка записи результатов"
+
+    def __init__(self, path='results.sqlite', batch_size=200):
+        super().__init__(batch_size)
+        self.path = path
+
+    def connect(self):
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        connection = sqlite3.connect(self.path, check_same_thread=False)
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.execute('PRAGMA synchronous=NORMAL')
+        for statement in SCHEMA:
+            connection.execute(statement)
+        if not connection.execute("SELECT 1 FROM sqlite_master WHERE name = 'emails_site_email'").fetchone():
+            # UNIQUE (site_id, email): в базах прошлых версий повторы удаляются перед созданием индекса
+            connection.execute('DELETE FROM emails WHERE rowid NOT IN (SELECT MIN(rowid) FROM emails GROUP BY site_id, email)')
+            connection.execute('CREATE UNIQUE INDEX IF NOT EXISTS emails_site_email ON emails (site_id, email)')
+        connection.commit()
+        return connection
+
+    def add(self, result):
+        """Постановка результата сайта в очередь на запись.
+
+        result - словарь: domain, status, final_url, http_status,
+        first_byte_seconds, total_seconds, bytes, emails, run_started.
+        """
+        self.put(result)
+
+    def open(self):
+        return self.connect()
+
+    def rollback(self, connection):
+        connection.rollback()
+
+    def close_resource(self, connection):
+        connection.close()
+
+    def write_batch(self, connection, batch):
+        now = time.time()
+        email_rows = []
+        for result in batch:
+            cursor = connection.execute(
+                'INSERT INTO sites (domain, status, final_url, http_status, first_byte_seconds, '
+                'total_seconds, bytes, scanned_at, run_started) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (
+                    result['domain'], result['status'], result.get('final_url'), result.get('http_status'),
+                    result.get('first_byte_seconds'), result.get('total_seconds'), result.get('bytes', 0),
+                    now, result.get('run_started')
+                )
+            )
+            email_rows.extend((email, cursor.lastrowid, result['domain']) for email in result.get('emails') or [])
+        connection.executemany('INSERT OR IGNORE INTO emails VALUES (?, ?, ?)', email_rows)
+        connection.commit()
+
+    def query(self, sql, params=(), timeout=60):
+        """Выборка из базы после записи очереди (отдельное соединение для чтения).
+
+        Запись очереди ждётся не дольше timeout секунд, затем выборка
+        делается по уже записанному.
+        """
+        if not self.flush(timeout):
+            logger.warning(f"⚠️ Результаты записаны не полностью, выборка по записанному: {self.path}")
+        connection = self.connect()
+        try:
+            return connection.execute(sql, params).fetchall()
+        finally:
+            connection.close()
+
+    def export_emails(self, filename, domain=None):
+        """Уникальные email в алфавитном порядке, при domain - только с этого домена"""
+        if domain:
+            rows = self.query('SELECT DISTINCT email FROM emails WHERE domain = ? ORDER BY email', (domain,))
+        else:
+            rows = self.query('SELECT DISTINCT email FROM emails ORDER BY email')
+        with open(filename, 'w', encoding='utf-8') as f:
+            for (email,) in rows:
+                f.write(f"{email}\n")
+        return len(rows)
+
+    def scanned_domains(self, status=None):
+        """Домены, уже сканированные в этом и прошлых запусках (при status - с этим статусом)"""
+        if status:
+            rows = self.query('SELECT DISTINCT domain FROM sites WHERE status = ?', (status,))
+        else:
+            rows = self.query('SELECT DISTINCT domain FROM sites')
+        return [domain for (domain,) in rows]
+
+    def email_sources(self, email):
+        """Сайты, на которых встречался email: [(domain, final_url), ...]"""
+        return self.query(
+            'SELECT DISTINCT emails.domain, sites.final_url FROM emails JOIN sites ON sites.id = emails.site_id '
+            'WHERE emails.email = ?', (email,)
+        )
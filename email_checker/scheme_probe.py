@@ -0,0 +1,109 @@
+import errno
+import selectors
+import socket
+import time
+
+from sqlite_cache import SQLiteCache
+
+# Коды "подключение идёт" у неблокирующего connect_ex (в Windows - WSAEWOULDBLOCK)
+CONNECT_IN_PROGRESS = {0, errno.EINPROGRESS, errno.EWOULDBLOCK, errno.EALREADY}
+if hasattr(errno, 'WSAEWOULDBLOCK'):
+    CONNECT_IN_PROGRESS.add(errno.WSAEWOULDBLOCK)
+
+
+def probe_ports(ip, ports, stagger=0.3, timeout=8, connected=None):
+    """Гонка TCP-подключений к портам одного адреса (happy eyeballs для схем).
+
+    Подключение к следующему порту начинается, если предыдущий не
+    ответил за stagger секунд или сразу отказал. Возвращает порты по
+    порядку: первым - подключившийся раньше всех, за ним те, что ещё не
+    ответили (на случай, если страница по первому не загрузится);
+    отказавшие порты в список не попадают. Если за timeout секунд не
+    подключился ни один порт - пустой список.
+
+    connected - словарь, в который кладётся подключённый сокет
+    победителя {порт: сокет} (в блокирующем режиме), чтобы запрос шёл
+    по нему без второго подключения; без него сокет закрывается.
+    """
+    family = socket.AF_INET6 if ':' in ip else socket.AF_INET
+    selector = selectors.DefaultSelector()
+    sockets = {}
+    failed = set()
+    waiting = list(ports)
+    winner = None
+    deadline = time.monotonic() + timeout
+    next_start = time.monotonic()
+    try:
+        while winner is None:
+            now = time.monotonic()
+            if now >= deadline:
+                break
+            if waiting and (now >= next_start or not sockets):
+                port = waiting.pop(0)
+                sock = socket.socket(family, socket.SOCK_STREAM)
+                sock.setblocking(False)
+                if sock.connect_ex((ip, port)) not in CONNECT_IN_PROGRESS:
+                    sock.close()
+                    failed.add(port)
+                    continue
+                selector.register(sock, selectors.EVENT_WRITE, port)
+                sockets[port] = sock
+                next_start = now + stagger
+                continue
+            if not sockets:
+                break
+            wait = deadline - now
+            if waiting:
+                wait = min(wait, next_start - now)
+            for key, _ in selector.select(max(wait, 0)):
+                port = key.data
+                sock = sockets.pop(port)
+                selector.unregister(sock)
+                error = sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+                if error == 0 and connected is not None:
+                    sock.setblocking(True)
+                    connected[port] = sock
+                else:
+                    sock.close()
+                if error == 0:
+                    winner = port
+                    break
+                failed.add(port)
+                # Отказ - следующий порт пробуем сразу, не дожидаясь форы
+                next_start = time.monotonic()
+    finally:
+        for sock in sockets.values():
+            sock.close()
+        selector.close()
+    if winner is None:
+        return []
+    return [winner] + [port for port in ports if port != winner and port not in failed]
+
+
+class SchemeCache(SQLiteCache):
+    """Итоговые адреса сайтов между запусками (SQLite).
+
+    Для домена хранится URL, по которому в прошлый раз была получена
+    страница: схема, ответившая первой, и цель редиректов. Следующий
+    запуск идёт сразу по нему, без гонки схем и без редиректов; если
+    адрес больше не отвечает, запись удаляется (forget).
+    """
+
+    table = 'schemes'
+    key_column = 'domain'
+    value_columns = ('url TEXT NOT NULL',)
+
+    def __init__(self, path='scheme_cache.sqlite', ttl=30 * 86400):
+        super().__init__(path)
+        self.ttl = ttl
+
+    def get(self, domain):
+        """Сохранённый итоговый URL домена или None"""
+        row = self.get_row(domain)
+        return row[0] if row else None
+
+    def put(self, domain, url):
+        self.put_rows([(domain, (url,), self.ttl)])
+
+    def forget(self, domain):
+        self.delete(domain)
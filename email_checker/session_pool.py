@@ -0,0 +1,227 @@
+import socket
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import ConnectTimeoutError
+
+
+class PinnedConnectionMixin:
+    """Подключение к заранее найденному адресу хоста.
+
+    Адрес берётся из словаря resolved_ips {домен: [ip, ...]}, который
+    заполняет сканер при проверке доменов. Подменяется только адрес
+    TCP-подключения: Host и SNI остаются именем домена. Для хостов без
+    записи (например, после редиректа на www.) работает обычный DNS.
+
+    ready_sockets {(домен, порт): сокет} - уже подключённые сокеты
+    (победители гонки схем): первое соединение к хосту берёт сокет
+    оттуда вместо нового подключения.
+    """
+
+    resolved_ips = {}
+    ready_sockets = {}
+
+    def _new_conn(self):
+        self.ready_socket = False
+        sock = self.ready_sockets.pop((self.host, self.port), None)
+        if sock is not None:
+            self.ready_socket = True
+            # Как у urllib3 create_connection: таймаут и опции сокета соединения
+            if self.timeout is None or isinstance(self.timeout, (int, float)):
+                sock.settimeout(self.timeout)
+            for option in self.socket_options or ():
+                sock.setsockopt(*option)
+            return sock
+        ips = self.resolved_ips.get(self.host)
+        if not ips:
+            return super()._new_conn()
+        dns_host = self._dns_host
+        self._dns_host = ips[0]
+        try:
+            return super()._new_conn()
+        finally:
+            self._dns_host = dns_host
+
+
+class TimedConnectionMixin:
+    """Замеры фаз соединения для AdaptiveTimeouts (атрибут timeouts).
+
+    TCP-подключение замеряется в _new_conn, TLS - как остаток connect,
+    ожидание ответа - в getresponse (после отправки запроса). Фаза, не
+    уложившаяся в таймаут, отмечается через timeouts.expired.
+    """
+
+    timeouts = None
+
+    def _new_conn(self):
+        started = time.monotonic()
+        try:
+            sock = super()._new_conn()
+        except ConnectTimeoutError:
+            if self.timeouts is not None:
+                self.timeouts.expired('connect')
+            raise
+        self.tcp_seconds = time.monotonic() - started
+        # Подключение готового сокета уже состоялось, в замеры оно не идёт
+        if self.timeouts is not None and not getattr(self, 'ready_socket', False):
+            self.timeouts.observe('connect', self.tcp_seconds)
+        return sock
+
+    def connect(self):
+        if self.timeouts is None or not isinstance(self, HTTPSConnection):
+            return super().connect()
+        started = time.monotonic()
+        self.tcp_seconds = None
+        try:
+            super().connect()
+        except (socket.timeout, TimeoutError):
+            # Таймаут TCP-подключения уже учтён в _new_conn
+            if self.tcp_seconds is not None:
+                self.timeouts.expired('tls')
+            raise
+        if self.tcp_seconds is not None:
+            self.timeouts.observe('tls', time.monotonic() - started - self.tcp_seconds)
+
+    def getresponse(self):
+        if self.timeouts is None:
+            return super().getresponse()
+        started = time.monotonic()
+        try:
+            response = super().getresponse()
+        except (socket.timeout, TimeoutError):
+            self.timeouts.expired('first_byte')
+            raise
+        self.timeouts.observe('first_byte', time.monotonic() - started)
+        return response
+
+
+def pinned_pool_classes(resolved_ips, timeouts=None, ready_sockets=None):
+    """Классы пулов urllib3, соединения которых используют resolved_ips и
+    ready_sockets и отдают замеры фаз в timeouts (AdaptiveTimeouts или None)"""
+    attrs = {'resolved_ips': resolved_ips, 'timeouts': timeouts, 'ready_sockets': {} if ready_sockets is None else ready_sockets}
+    http_connection = type('PinnedHTTPConnection', (TimedConnectionMixin, PinnedConnectionMixin, HTTPConnection), attrs)
+    https_connection = type('PinnedHTTPSConnection', (TimedConnectionMixin, PinnedConnectionMixin, HTTPSConnection), attrs)
+    return {
+        'http': type('PinnedHTTPConnectionPool', (HTTPConnectionPool,), {'ConnectionCls': http_connection}),
+        'https': type('PinnedHTTPSConnectionPool', (HTTPSConnectionPool,), {'ConnectionCls': https_connection}),
+    }
+
+
+class CountingHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter, который считает переиспользованные и новые соединения.
+
+    urllib3 ведёт счётчики num_requests/num_connections в каждом пуле хоста;
+    при вытеснении пула из LRU его счётчики переносятся в накопленные итоги.
+    """
+
+    def __init__(self, *args, resolved_ips=None, timeouts=None, ready_sockets=None, **kwargs):
+        self.counters_lock = threading.Lock()
+        self.managers = []
+        self.closed_requests = 0
+        self.closed_connections = 0
+        self.resolved_ips = resolved_ips
+        self.timeouts = timeouts
+        self.ready_sockets = ready_sockets
+        super().__init__(*args, **kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        # Прямые соединения - к уже найденным адресам; через прокси имя разрешает прокси
+        if self.resolved_ips is not None:
+            self.poolmanager.pool_classes_by_scheme = pinned_pool_classes(
+                self.resolved_ips, self.timeouts, self.ready_sockets
+            )
+        self.track_manager(self.poolmanager)
+
+    def proxy_manager_for(self, proxy, **proxy_kwargs):
+        is_new = proxy not in self.proxy_manager
+        manager = super().proxy_manager_for(proxy, **proxy_kwargs)
+        if is_new:
+            self.track_manager(manager)
+        return manager
+
+    def track_manager(self, manager):
+        with self.counters_lock:
+            self.managers.append(manager)
+        manager.pools.dispose_func = self.dispose_pool
+
+    def dispose_pool(self, pool):
+        with self.counters_lock:
+            self.closed_requests += pool.num_requests
+            self.closed_connections += pool.num_connections
+        pool.close()
+
+    def pool_counters(self):
+        """(попадания, промахи): запросы по живому соединению и открытия новых"""
+        with self.counters_lock:
+            total_requests = self.closed_requests
+            total_connections = self.closed_connections
+            managers = list(self.managers)
+
+        for manager in managers:
+            for key in manager.pools.keys():
+                pool = manager.pools.get(key)
+                if pool is not None:
+                    total_requests += pool.num_requests
+                    total_connections += pool.num_connections
+
+        return max(0, total_requests - total_connections), total_connections
+
+
+class SessionPool:
+    """Пул HTTP-сессий для рабочих потоков.
+
+    У каждого потока своя requests.Session (заголовки и cookies не делятся
+    между потоками), но все сессии монтируют один адаптер, поэтому
+    keep-alive соединения к хосту переиспользуются всеми воркерами.
+    Размеры пулов соединений выводятся из max_workers.
+
+    resolved_ips - общий словарь {домен: [ip, ...]}: соединения к этим
+    доменам открываются без повторного DNS-запроса. timeouts
+    (AdaptiveTimeouts) получает замеры фаз прямых соединений.
+    ready_sockets - общий словарь {(домен, порт): подключённый сокет}.
+    """
+
+    def __init__(self, max_workers, headers=None, resolved_ips=None, timeouts=None, ready_sockets=None):
+        self.headers = dict(headers or {})
+        self.adapter = CountingHTTPAdapter(
+            resolved_ips=resolved_ips,
+            timeouts=timeouts,
+            ready_sockets=ready_sockets,
+            # Хосты, для которых держим пулы: текущий и предыдущий сайт каждого воркера
+            pool_connections=max(10, max_workers * 2),
+            # Соединений на один хост: все воркеры могут ходить на один сервер
+            pool_maxsize=max(10, max_workers),
+            max_retries=0
+        )
+        self.local = threading.local()
+
+    def new_session(self):
+        """Новая сессия с общими заголовками и общим пулом соединений"""
+        session = requests.Session()
+        session.headers.update(self.headers)
+        session.mount('http://', self.adapter)
+        session.mount('https://', self.adapter)
+        return session
+
+    def session(self):
+        """Сессия текущего потока"""
+        session = getattr(self.local, 'session', None)
+        if session is None:
+            session = self.new_session()
+            self.local.session = session
+        return session
+
+    def get(self, url, headers=None, **kwargs):
+        """GET через сессию текущего потока; headers дополняют заголовки сессии только для этого запроса"""
+        return self.session().get(url, headers=headers, **kwargs)
+
+    def pool_counters(self):
+        return self.adapter.pool_counters()
+
+    def close(self):
+        self.adapter.close()
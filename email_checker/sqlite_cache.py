@@ -0,0 +1,97 @@
+import os
+import sqlite3
+import threading
+import time
+
+# Ограничение SQLite на число параметров запроса
+MAX_QUERY_PARAMS = 500
+
+
+class SQLiteCache:
+    """Таблица SQLite {ключ: значения} со сроком жизни записей - основа кэшей между запусками.
+
+    Подкласс задаёт table, key_column и value_columns (определения
+    столбцов значения, например 'url TEXT NOT NULL'); у таблицы есть ещё
+    столбец expires. Соединение открывается при первом обращении, тогда
+    же удаляются просроченные записи. Все обращения идут под одной
+    блокировкой: кэш общий для потоков сканера.
+    """
+
+    table = None
+    key_column = None
+    value_columns = ()
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.connection = None
+
+    def connect(self):
+        """Соединение с базой (под self.lock)"""
+        if self.connection is None:
+            # Папка состояния создаётся при первом обращении (кэш нужен и вне run_mass_scan)
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            connection = sqlite3.connect(self.path, check_same_thread=False)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            columns = ', '.join((f'{self.key_column} TEXT PRIMARY KEY',) + tuple(self.value_columns) + ('expires REAL NOT NULL',))
+            connection.execute(f'CREATE TABLE IF NOT EXISTS {self.table} ({columns})')
+            connection.execute(f'DELETE FROM {self.table} WHERE expires < ?', (time.time(),))
+            connection.commit()
+            self.connection = connection
+        return self.connection
+
+    def get_rows(self, keys):
+        """Неустаревшие записи: {ключ: (значения...)}"""
+        names = ', '.join(column.split()[0] for column in self.value_columns)
+        keys = list(keys)
+        rows = {}
+        now = time.time()
+        with self.lock:
+            connection = self.connect()
+            for offset in range(0, len(keys), MAX_QUERY_PARAMS):
+                batch = keys[offset:offset + MAX_QUERY_PARAMS]
+                cursor = connection.execute(
+                    f"SELECT {self.key_column}, {names}, expires FROM {self.table} "
+                    f"WHERE {self.key_column} IN ({','.join('?' * len(batch))})",
+                    batch
+                )
+                for row in cursor:
+                    if row[-1] >= now:
+                        rows[row[0]] = row[1:-1]
+        return rows
+
+    def get_row(self, key):
+        """Значения неустаревшей записи или None"""
+        return self.get_rows([key]).get(key)
+
+    def put_rows(self, rows):
+        """Сохранение записей [(ключ, (значения...), ttl сек)]; записи без ttl пропускаются"""
+        now = time.time()
+        values = [(key,) + tuple(row) + (now + ttl,) for key, row, ttl in rows if ttl]
+        if not values:
+            return
+        placeholders = ', '.join('?' * len(values[0]))
+        with self.lock:
+            connection = self.connect()
+            connection.executemany(f'INSERT OR REPLACE INTO {self.table} VALUES ({placeholders})', values)
+            connection.commit()
+
+    def delete(self, key):
+        with self.lock:
+            connection = self.connect()
+            connection.execute(f'DELETE FROM {self.table} WHERE {self.key_column} = ?', (key,))
+            connection.commit()
+
+    def shrink_memory(self):
+        """Освобождение кэша страниц SQLite этого соединения (при нехватке памяти)"""
+        with self.lock:
+            if self.connection is not None:
+                self.connection.execute('PRAGMA shrink_memory')
+
+    def close(self):
+        with self.lock:
+            if self.connection is not None:
+                self.connection.close()
+                self.connection = None
@@ -0,0 +1,71 @@
+import threading
+
+
+class ScanStats:
+    """Статистика сканирования: словарь под одной блокировкой.
+
+    Счётчики (counters) увеличиваются add/update, несколько счётчиков
+    одного update меняются под блокировкой вместе, поэтому снимок не бывает
+    "рваным" (сайтов с email не больше, чем обработанных). Под блокировкой
+    только изменение словаря, без логирования и ввода-вывода.
+
+    Показатели (gauges) - значения, которые задаются, а не суммируются:
+    время запуска, RSS, счётчики пула. derived - значения, вычисляемые из
+    снимка, например доля попаданий в кэш.
+    """
+
+    def __init__(self, counters, gauges=None, derived=None):
+        self.values = dict(counters)
+        self.values.update(gauges or {})
+        self.derived = dict(derived or {})
+        self.lock = threading.Lock()
+
+    def add(self, name, value=1):
+        with self.lock:
+            self.values[name] = self.values.get(name, 0) + value
+
+    def update(self, deltas):
+        """Увеличение нескольких счётчиков сразу; читатели видят их вместе"""
+        with self.lock:
+            values = self.values
+            for name, value in deltas.items():
+                values[name] = values.get(name, 0) + value
+
+    def set(self, name, value):
+        with self.lock:
+            self.values[name] = value
+
+    def set_once(self, name, value):
+        """Задать показатель, если он ещё None; True, если задан этим вызовом"""
+        with self.lock:
+            if self.values.get(name) is not None:
+                return False
+            self.values[name] = value
+            return True
+
+    def snapshot(self):
+        """Согласованная копия всей статистики (словарь)"""
+        with self.lock:
+            values = dict(self.values)
+        for name, compute in self.derived.items():
+            values[name] = compute(values)
+        return values
+
+    def load(self, values):
+        """Восстановление сохранённого снимка (продолжение сканирования)"""
+        with self.lock:
+            for name, value in values.items():
+                if name not in self.derived:
+                    self.values[name] = value
+
+    def __getitem__(self, name):
+        if name in self.derived:
+            return self.snapshot()[name]
+        with self.lock:
+            return self.values[name]
+
+    def get(self, name, default=None):
+        try:
+            return self[name]
+        except KeyError:
+            return default
@@ -0,0 +1,132 @@
+import threading
+from collections import deque
+
+# Фазы загрузки: TCP-подключение, TLS-рукопожатие, ожидание заголовков ответа
+# после отправки запроса и вся загрузка страницы сайта (с редиректами и телом)
+PHASES = ('connect', 'tls', 'first_byte', 'total')
+
+
+class AdaptiveTimeouts:
+    """Таймауты фаз загрузки по задержкам, замеренным в текущем запуске.
+
+    Для каждой фазы хранится окно последних window замеров; таймаут -
+    percentile-й процентиль окна, умноженный на multiplier, в пределах
+    от floors до limits. Пока замеров меньше min_samples, действует
+    предел limits (прежнее поведение). Медленный хвост сайтов (дольше
+    процентиля с запасом) обрывается раньше, а запас multiplier
+    оставляет время обычным сайтам.
+
+    Истёкшие таймауты (expired) в окно замеров не попадают, но
+    учитываются в доле попыток: если её больше max_expired_share, сеть в
+    целом замедлилась, и таймаут удваивается (не выше limits), пока доля
+    не снизится.
+
+    overrides - значения, заданные вручную (например, из интерфейса):
+    для такой фазы таймаут постоянный, замеры на него не влияют.
+
+    Подключение вместе с TLS не дольше handshake_limit - прежнего общего
+    таймаута подключения (timeout=8 у requests): пока замеров мало,
+    сайт ждут не дольше, чем раньше. Заданные вручную connect/tls
+    складываются без этого предела.
+    """
+
+    def __init__(self, limits=None, floors=None, percentile=90, multiplier=3.0, window=500, min_samples=50,
+                 max_expired_share=0.25, handshake_limit=8.0):
+        self.limits = {'connect': 8.0, 'tls': 8.0, 'first_byte': 8.0, 'total': 15.0}
+        self.limits.update(limits or {})
+        self.floors = {'connect': 1.5, 'tls': 1.5, 'first_byte': 2.0, 'total': 4.0}
+        self.floors.update(floors or {})
+        self.percentile = percentile
+        self.multiplier = multiplier
+        self.handshake_limit = handshake_limit
+        self.min_samples = min_samples
+        self.max_expired_share = max_expired_share
+        # Процентиль пересчитывается не на каждый замер, а раз в recompute_every
+        self.recompute_every = 20
+        self.overrides = {}
+        self.samples = {phase: deque(maxlen=window) for phase in PHASES}
+        # Исходы последних попыток фазы: True - таймаут истёк
+        self.outcomes = {phase: deque(maxlen=window) for phase in PHASES}
+        self.pending = {phase: 0 for phase in PHASES}
+        self.current = dict(self.limits)
+        self.expired_counts = {phase: 0 for phase in PHASES}
+        self.lock = threading.Lock()
+
+    def set_override(self, phase, seconds):
+        """Постоянный таймаут фазы (None - снова по замерам)"""
+        with self.lock:
+            if seconds is None:
+                self.overrides.pop(phase, None)
+            else:
+                self.overrides[phase] = float(seconds)
+
+    def get(self, phase):
+        """Текущий таймаут фазы, сек"""
+        override = self.overrides.get(phase)
+        if override is not None:
+            return override
+        return self.current[phase]
+
+    def limit(self, phase):
+        """Предел фазы без адаптации: заданный вручную или limits"""
+        override = self.overrides.get(phase)
+        return override if override is not None else self.limits[phase]
+
+    def requests_timeout(self, url=None, adaptive=True):
+        """Таймаут для requests: (подключение вместе с TLS, ожидание ответа).
+
+        Для url со схемой http:// время на TLS не добавляется (None - с
+        ним, на случай редиректа на https). adaptive=False - пределы без
+        адаптации, для поисковиков и проверки прокси: их задержки не
+        похожи на задержки сканируемых сайтов.
+        """
+        value = self.get if adaptive else self.limit
+        secure = url is None or not url.startswith('http://')
+        return self.handshake(secure, adaptive), value('first_byte')
+
+    def handshake(self, secure=True, adaptive=True):
+        """Таймаут подключения вместе с TLS (secure=False - только TCP), сек"""
+        value = self.get if adaptive else self.limit
+        seconds = value('connect') + (value('tls') if secure else 0)
+        if 'connect' in self.overrides or (secure and 'tls' in self.overrides):
+            return seconds
+        return min(seconds, self.handshake_limit)
+
+    def observe(self, phase, seconds):
+        """Замер успешно завершённой фазы"""
+        with self.lock:
+            self.samples[phase].append(seconds)
+            self.record_outcome(phase, False)
+
+    def expired(self, phase):
+        """Фаза не уложилась в таймаут"""
+        with self.lock:
+            self.expired_counts[phase] += 1
+            self.record_outcome(phase, True)
+
+    def record_outcome(self, phase, expired):
+        """Исход попытки; раз в recompute_every попыток таймаут пересчитывается (под self.lock)"""
+        self.outcomes[phase].append(expired)
+        self.pending[phase] += 1
+        if self.pending[phase] >= self.recompute_every:
+            self.recompute(phase)
+
+    def recompute(self, phase):
+        """Пересчёт таймаута фазы по окну замеров (под self.lock)"""
+        self.pending[phase] = 0
+        outcomes = self.outcomes[phase]
+        if sum(outcomes) > len(outcomes) * self.max_expired_share:
+            # Истекает слишком часто: медленные не отдельные сайты, а сеть
+            self.current[phase] = min(self.limits[phase], self.current[phase] * 2)
+            return
+        samples = self.samples[phase]
+        if len(samples) < self.min_samples:
+            self.current[phase] = self.limits[phase]
+            return
+        ordered = sorted(samples)
+        value = ordered[min(len(ordered) - 1, len(ordered) * self.percentile // 100)] * self.multiplier
+        self.current[phase] = min(self.limits[phase], max(self.floors[phase], value))
+
+    def snapshot(self):
+        """{фаза: текущий таймаут} для статистики и интерфейса"""
+        return {phase: round(self.get(phase), 2) for phase in PHASES}
@@ -1,6 +1,7 @@
 import os
 import sys
 import gc
+import multiprocessing
 
 # Принудительная сборка мусора перед импортами
 gc.collect()
@@ -73,4 +74,7 @@ def main():
         messagebox.showerror("Критическая ошибка", f"Не удалось запустить приложение: {e}")
 
 if __name__ == "__main__":
+    # В собранном exe процессы пула извлечения запускают этот же файл:
+    # freeze_support выполняет в них задачу пула вместо повторного запуска интерфейса
+    multiprocessing.freeze_support()
     main()
\ No newline at end of file
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Модули сканера импортируются по имени, как в main.py и бенчмарках
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'email_checker'))
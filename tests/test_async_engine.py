@@ -0,0 +1,140 @@
+import asyncio
+import gzip
+
+import pytest
+
+from async_engine import AsyncFetchEngine
+from mass_scanner import MassWebsiteEmailScanner
+
+
+@pytest.fixture
+def engine(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    scanner = MassWebsiteEmailScanner(state_dir=str(tmp_path / 'scan_state'))
+    yield AsyncFetchEngine(scanner)
+    scanner.close_state()
+
+
+def stream(data):
+    """StreamReader с уже полученными данными (создаётся внутри event loop)"""
+    reader = asyncio.StreamReader()
+    reader.feed_data(data)
+    reader.feed_eof()
+    return reader
+
+
+async def body_chunks(engine, data, headers):
+    return [chunk async for chunk in engine.iter_body(stream(data), headers)]
+
+
+def test_read_head_skips_informational(engine):
+    data = (b'HTTP/1.1 100 Continue\r\n\r\n'
+            b'HTTP/1.1 200 OK\r\nContent-Type: text/html\r\nX-Empty:\r\n\r\nbody')
+
+    async def check():
+        reader = stream(data)
+        status, headers = await engine.read_head(reader)
+        assert (status, headers) == (200, {'content-type': 'text/html', 'x-empty': ''})
+        assert await reader.read() == b'body'
+
+    asyncio.run(check())
+
+
+def test_chunked_body(engine):
+    data = b'4\r\nWiki\r\n5;name=value\r\npedia\r\nE\r\n in\r\n\r\nchunks.\r\n0\r\n\r\n'
+    chunks = asyncio.run(body_chunks(engine, data, {'transfer-encoding': 'chunked'}))
+    assert chunks == [b'Wiki', b'pedia', b' in\r\n\r\nchunks.']
+
+
+def test_content_length_body(engine):
+    # Данные после Content-Length не читаются (следующий ответ на том же соединении)
+    chunks = asyncio.run(body_chunks(engine, b'0123456789extra', {'content-length': '10'}))
+    assert b''.join(chunks) == b'0123456789'
+
+
+def test_body_until_close(engine):
+    chunks = asyncio.run(body_chunks(engine, b'x' * 100000, {}))
+    assert b''.join(chunks) == b'x' * 100000
+
+
+def test_read_body_gzip(engine):
+    page = b'<p>mail: info@example.com</p>' * 10
+    headers = {'content-encoding': 'gzip'}
+
+    async def check():
+        extractor = engine.scanner.create_extractor(None)
+        downloaded = await engine.read_body(stream(gzip.compress(page)), headers, extractor)
+        extractor.finish()
+        return downloaded, extractor.emails
+
+    downloaded, emails = asyncio.run(check())
+    assert downloaded == len(gzip.compress(page))
+    assert emails == ['info@example.com']
+
+
+class RedirectServer:
+    """HTTP-сервер для проверки редиректов: путь -> (код, заголовки, тело)"""
+
+    def __init__(self, routes):
+        self.routes = routes
+        self.paths = []
+
+    async def handle(self, reader, writer):
+        head = await reader.readuntil(b'\r\n\r\n')
+        path = head.split(b' ', 2)[1].decode()
+        self.paths.append(path)
+        status, headers, body = self.routes(path, self.port)
+        lines = [f'HTTP/1.1 {status} X'] + [f'{name}: {value}' for name, value in headers.items()]
+        writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + body)
+        await writer.drain()
+        writer.close()
+
+    async def start(self):
+        self.server = await asyncio.start_server(self.handle, '127.0.0.1', 0)
+        self.port = self.server.sockets[0].getsockname()[1]
+
+
+def fetch(engine, routes, path):
+    server = RedirectServer(routes)
+    result = engine.scanner.new_site_result('127.0.0.1')
+
+    async def run():
+        await server.start()
+        async with server.server:
+            return await engine.fetch(f'http://127.0.0.1:{server.port}{path}', result)
+
+    return asyncio.run(run()), result, server
+
+
+def test_fetch_follows_redirects(engine):
+    def routes(path, port):
+        if path == '/':
+            return 301, {'Location': '/about', 'Content-Length': 0}, b''
+        if path == '/about':
+            return 302, {'Location': f'http://127.0.0.1:{port}/contacts?lang=ru'}, b''
+        body = b'5\r\nmail \r\n11\r\nsales@example.org\r\n0\r\n\r\n'
+        return 200, {'Content-Type': 'text/html', 'Transfer-Encoding': 'chunked'}, body
+
+    (status, headers, extractor), result, server = fetch(engine, routes, '/')
+    assert status == 200
+    assert server.paths == ['/', '/about', '/contacts?lang=ru']
+    assert result['final_url'] == f'http://127.0.0.1:{server.port}/contacts?lang=ru'
+    assert extractor.emails == ['sales@example.org']
+
+
+def test_fetch_stops_redirect_loop(engine):
+    engine.max_redirects = 3
+
+    def routes(path, port):
+        return 302, {'Location': '/loop'}, b''
+
+    with pytest.raises(ConnectionError):
+        fetch(engine, routes, '/loop')
+
+
+def test_fetch_skips_non_text_body(engine):
+    def routes(path, port):
+        return 200, {'Content-Type': 'image/png', 'Content-Length': 4}, b'\x89PNG'
+
+    (status, headers, extractor), result, server = fetch(engine, routes, '/logo.png')
+    assert (status, extractor) == (200, None)
@@ -0,0 +1,56 @@
+import pytest
+
+from bloom import ScalableBloomFilter
+
+
+def test_false_positive_rate():
+    # Малая начальная ёмкость: фильтр несколько раз вырастет
+    bloom = ScalableBloomFilter(error_rate=0.01, initial_capacity=2000)
+    added = [f'site{i}.example' for i in range(30000)]
+    rejected = sum(not bloom.add(domain) for domain in added)
+    assert rejected / len(added) <= 0.01
+    assert len(bloom.filters) > 1
+    assert len(bloom) == len(added) - rejected
+    # Ложноотрицательных не бывает
+    assert all(domain in bloom for domain in added)
+    assert not any(bloom.add(domain) for domain in added[:1000])
+
+    checked = 50000
+    false_positives = sum(f'other{i}.example' in bloom for i in range(checked))
+    assert false_positives / checked <= 0.01
+
+
+def test_save_and_load(tmp_path):
+    path = str(tmp_path / 'visited.bloom')
+    bloom = ScalableBloomFilter(path, error_rate=0.001, initial_capacity=100)
+    domains = [f'site{i}.test' for i in range(500)]
+    for domain in domains:
+        bloom.add(domain)
+    bloom.save()
+
+    loaded = ScalableBloomFilter(path)
+    assert (loaded.error_rate, loaded.initial_capacity) == (0.001, 100)
+    assert len(loaded) == len(bloom)
+    assert loaded.size_bytes() == bloom.size_bytes()
+    assert all(domain in loaded for domain in domains)
+    # Загруженный фильтр продолжает расти так же
+    assert loaded.add('new.test')
+    assert len(loaded.filters) == len(bloom.filters) or loaded.filters[-1].count == 1
+
+
+def test_load_rejects_other_files(tmp_path):
+    path = tmp_path / 'visited.bloom'
+    path.write_bytes(b'not a filter')
+    with pytest.raises(ValueError):
+        ScalableBloomFilter(str(path))
+
+
+def test_clear(tmp_path):
+    path = str(tmp_path / 'visited.bloom')
+    bloom = ScalableBloomFilter(path)
+    bloom.add('site.test')
+    bloom.clear()
+    assert 'site.test' not in bloom
+    assert len(bloom) == 0
+    bloom.save()
+    assert len(ScalableBloomFilter(path)) == 0
@@ -0,0 +1,32 @@
+import codecs
+
+from charset import CharsetResolver
+
+TEXT = 'Контакты: почта@пример.рф'
+
+
+def test_resolution_order():
+    resolver = CharsetResolver()
+    meta = b'<meta charset="koi8-r">'
+    # BOM важнее заголовка, заголовок важнее <meta>
+    assert resolver.resolve(codecs.BOM_UTF8 + meta, 'text/html; charset=windows-1251') == 'utf-8-sig'
+    assert resolver.resolve(meta, 'text/html; charset="Windows-1251"') == 'cp1251'
+    assert resolver.resolve(b'<meta http-equiv="Content-Type" content="text/html; charset=KOI8-R">', 'text/html') == 'koi8-r'
+    # Неизвестное имя кодировки пропускается
+    assert resolver.resolve(meta, 'text/html; charset=x-unknown') == 'koi8-r'
+
+
+def test_meta_only_in_sniffed_head():
+    resolver = CharsetResolver(sniff_bytes=100)
+    body = b' ' * 200 + b'<meta charset="koi8-r">' + TEXT.encode('koi8-r')
+    assert resolver.resolve(body) == 'windows-1251'
+
+
+def test_fallback_and_host_cache():
+    resolver = CharsetResolver()
+    assert resolver.resolve(TEXT.encode('utf-8')) == 'utf-8'
+    assert resolver.resolve(TEXT.encode('cp1251')) == 'windows-1251'
+    # Кодировка, указанная на одной странице хоста, применяется к другим его страницам без указания
+    assert resolver.resolve(b'<meta charset="koi8-r">', host='shop.test') == 'koi8-r'
+    assert resolver.decode(TEXT.encode('koi8-r'), host='shop.test') == TEXT
+    assert resolver.decode(TEXT.encode('cp1251'), host='other.test') == TEXT
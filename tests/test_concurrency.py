@@ -0,0 +1,87 @@
+import threading
+
+from concurrency import ConcurrencyController
+
+
+class Intervals:
+    """Счётчики сканирования по интервалам в 1 с для ConcurrencyController.update"""
+
+    def __init__(self, controller):
+        self.controller = controller
+        self.now = 0.0
+        self.processed = self.errors = self.timeouts = 0
+        controller.update(0, 0, 0, 0.0, True, now=self.now)
+
+    def step(self, sites=100, errors=0, timeouts=0, cpu=10.0, waiting=True):
+        self.now += 1.0
+        self.processed += sites
+        self.errors += errors
+        self.timeouts += timeouts
+        return self.controller.update(self.processed, self.errors, self.timeouts, cpu, waiting, now=self.now)
+
+
+def test_slow_start_doubles_while_sites_wait():
+    intervals = Intervals(ConcurrencyController(100, initial=4, interval=1.0))
+    assert [intervals.step() for _ in range(3)] == [8, 16, 32]
+    # Сайты не ждут воркеров - расти незачем
+    assert intervals.step(waiting=False) == 32
+    assert [intervals.step() for _ in range(2)] == [64, 100]
+
+
+def test_multiplicative_decrease_then_additive_increase():
+    controller = ConcurrencyController(1000, initial=64, interval=1.0, step=5)
+    intervals = Intervals(controller)
+    assert intervals.step(cpu=95.0) == 48
+    # Интервал после снижения пропускается: в нём досчитываются ошибки той же перегрузки
+    assert intervals.step() == 48
+    assert intervals.step() == 53
+    assert intervals.step() == 58
+    assert controller.decreases == 1 and not controller.slow_start
+
+
+def test_error_growth_is_congestion_but_steady_errors_are_not():
+    intervals = Intervals(ConcurrencyController(1000, initial=100, interval=1.0, step=10, error_margin=0.05))
+    # Много мёртвых доменов с самого начала: доля ошибок высокая, но не растёт
+    limits = [intervals.step(errors=40) for _ in range(3)]
+    assert limits == [200, 400, 800]
+    assert intervals.step(errors=60) == 600
+
+
+def test_throughput_drop_after_increase():
+    intervals = Intervals(ConcurrencyController(1000, initial=10, interval=1.0, drop_share=0.2))
+    assert intervals.step(sites=100) == 20
+    # Больше загрузок - меньше сайтов в секунду
+    assert intervals.step(sites=70) == 15
+
+
+def test_probe_above_last_congestion():
+    controller = ConcurrencyController(1000, initial=40, interval=1.0, step=10, probe_every=3)
+    intervals = Intervals(controller)
+    intervals.step(cpu=95.0)
+    intervals.step()
+    assert controller.ceiling == 40
+    # До прошлого предела - обычным шагом, дальше - пробами раз в probe_every интервалов,
+    # после каждой удачной пробы вдвое большими
+    limits = [intervals.step() for _ in range(12)]
+    assert limits == [39, 39, 40, 40, 40, 41, 41, 41, 43, 43, 43, 47]
+    assert controller.probe_size == 4
+
+
+def test_disabled_keeps_max_limit():
+    controller = ConcurrencyController(50, initial=4, enabled=False)
+    intervals = Intervals(controller)
+    assert intervals.step(cpu=100.0, errors=100) == 50
+
+
+def test_workers_wait_for_slot():
+    controller = ConcurrencyController(10, initial=2)
+    assert controller.wait_for_slot(1, timeout=0)
+    assert not controller.wait_for_slot(5, timeout=0)
+    woken = []
+    waiter = threading.Thread(target=lambda: woken.append(controller.wait_for_slot(5, timeout=5)))
+    waiter.start()
+    controller.set_limit(8)
+    waiter.join()
+    assert woken == [True]
+    controller.finish()
+    assert controller.wait_for_slot(9, timeout=0)
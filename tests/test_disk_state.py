@@ -0,0 +1,73 @@
+import os
+
+from disk_state import DiskCheckpoint, DiskFrontier, DiskSet, DiskStore
+
+
+def open_state(state_dir):
+    store = DiskStore(str(state_dir))
+    return store, DiskFrontier(store), DiskCheckpoint(store)
+
+
+def test_nothing_created_before_use(tmp_path):
+    state_dir = tmp_path / 'scan_state'
+    store, _, _ = open_state(state_dir)
+    DiskSet(store, 'emails')
+    store.close()
+    assert not os.path.exists(state_dir)
+
+
+def test_frontier_round_trip(tmp_path):
+    store, frontier, _ = open_state(tmp_path)
+    frontier.push_many([f'site{i}.test' for i in range(10)])
+    assert frontier.pop_many(4) == ['site0.test', 'site1.test', 'site2.test', 'site3.test']
+    frontier.done_many(['site0.test', 'site1.test'])
+    assert len(frontier) == 6
+    store.close()
+
+    # Прерванное сканирование: взятые, но не проверенные домены возвращаются в очередь
+    store, frontier, _ = open_state(tmp_path)
+    assert sorted(frontier.release_taken()) == ['site2.test', 'site3.test']
+    assert frontier.pop_many(100) == [f'site{i}.test' for i in range(2, 10)]
+    assert frontier.pop_many(100) == []
+    frontier.clear()
+    assert frontier.release_taken() == []
+    store.close()
+
+
+def test_checkpoint_round_trip(tmp_path):
+    campaign = {
+        'total_sites': 1000, 'search_query': 'кафе москва', 'candidates_consumed': 250,
+        'search_domains': ['cafe.ru'], 'completed': False, 'stats': {'sites_processed': 10}
+    }
+    store, _, checkpoint = open_state(tmp_path)
+    assert checkpoint.load() is None
+    checkpoint.save(campaign)
+    store.close()
+
+    store, _, checkpoint = open_state(tmp_path)
+    assert checkpoint.load() == campaign
+    campaign['completed'] = True
+    checkpoint.save(campaign)
+    assert checkpoint.load()['completed']
+    checkpoint.clear()
+    assert checkpoint.load() is None
+    store.close()
+
+
+def test_disk_set(tmp_path):
+    store = DiskStore(str(tmp_path))
+    emails = DiskSet(store, 'emails')
+    assert not emails
+    assert emails.update(['b@example.com', 'a@example.com', 'b@example.com']) == ['b@example.com', 'a@example.com']
+    assert emails.add('c@example.com')
+    assert not emails.add('a@example.com')
+    store.close()
+
+    store = DiskStore(str(tmp_path))
+    emails = DiskSet(store, 'emails')
+    assert len(emails) == 3
+    assert 'a@example.com' in emails and 'x@example.com' not in emails
+    assert list(emails) == ['a@example.com', 'b@example.com', 'c@example.com']
+    emails.clear()
+    assert len(emails) == 0 and list(emails) == []
+    store.close()
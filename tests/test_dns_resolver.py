@@ -0,0 +1,231 @@
+import asyncio
+import socket
+import struct
+import threading
+
+import pytest
+
+import dns_resolver
+from dns_resolver import (
+    QTYPE_A, QCLASS_IN, AsyncDNSResolver, DNSProtocol, build_query, encode_name,
+    is_truncated, parse_response, randomize_case, skip_name, system_nameservers
+)
+
+QTYPE_CNAME = 5
+
+
+def question_of(query):
+    """Вопрос запроса (имя, тип, класс) и имя домена в нижнем регистре"""
+    end = skip_name(query, 12)
+    labels = []
+    offset = 12
+    while query[offset]:
+        labels.append(query[offset + 1:offset + 1 + query[offset]].decode('ascii').lower())
+        offset += 1 + query[offset]
+    return query[12:end + 4], '.'.join(labels)
+
+
+def response(query, answers=b'', ancount=0, rcode=0, truncated=False):
+    """Ответ на запрос: флаги QR, RD, RA, заданный rcode и записи answers"""
+    query_id = struct.unpack_from('!H', query)[0]
+    flags = 0x8180 | rcode | (0x0200 if truncated else 0)
+    question, _ = question_of(query)
+    return struct.pack('!HHHHHH', query_id, flags, 1, ancount, 0, 0) + question + answers
+
+
+def a_record(ip, ttl=300, name=b'\xc0\x0c'):
+    return name + struct.pack('!HHIH', QTYPE_A, QCLASS_IN, ttl, 4) + socket.inet_aton(ip)
+
+
+class StubDNSServer:
+    """DNS-сервер для тестов на одном порту UDP и TCP.
+
+    answer(query, transport) возвращает ответ или None (запрос потерян);
+    transport - 'udp' или 'tcp'. Принятые запросы - в self.queries.
+    """
+
+    def __init__(self, answer):
+        self.answer = answer
+        self.queries = []
+        self.udp = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.udp.bind(('127.0.0.1', 0))
+        self.port = self.udp.getsockname()[1]
+        self.tcp = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.tcp.bind(('127.0.0.1', self.port))
+        self.tcp.listen(16)
+        threading.Thread(target=self.serve_udp, daemon=True).start()
+        threading.Thread(target=self.serve_tcp, daemon=True).start()
+
+    def serve_udp(self):
+        while True:
+            try:
+                query, addr = self.udp.recvfrom(512)
+            except OSError:
+                return
+            self.queries.append(('udp', query))
+            data = self.answer(query, 'udp')
+            if data is not None:
+                self.udp.sendto(data, addr)
+
+    def serve_tcp(self):
+        while True:
+            try:
+                connection, _ = self.tcp.accept()
+            except OSError:
+                return
+            with connection:
+                length = struct.unpack('!H', connection.recv(2))[0]
+                query = connection.recv(length)
+                self.queries.append(('tcp', query))
+                data = self.answer(query, 'tcp')
+                if data is not None:
+                    connection.sendall(struct.pack('!H', len(data)) + data)
+
+    def close(self):
+        self.udp.close()
+        self.tcp.close()
+
+
+@pytest.fixture
+def stub_dns():
+    servers = []
+
+    def start(answer):
+        server = StubDNSServer(answer)
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.close()
+
+
+def resolve(server, domains, **options):
+    options.setdefault('timeout', 0.3)
+    resolver = AsyncDNSResolver(nameservers=[('127.0.0.1', server.port)], concurrency=4, **options)
+    return resolver.resolve_many(domains)
+
+
+def test_encode_name():
+    assert encode_name('www.example.com.') == b'\x03www\x07example\x03com\x00'
+    assert encode_name('пример.рф') == b'\x0cxn--e1afmkfd\x08xn--p1ai\x00'
+    for domain in ('', 'a..b', 'x' * 64 + '.com'):
+        with pytest.raises(UnicodeError):
+            encode_name(domain)
+
+
+def test_build_query():
+    query = build_query(0x1234, encode_name('example.com'), QTYPE_A)
+    assert struct.unpack_from('!HHHHHH', query) == (0x1234, 0x0100, 1, 0, 0, 0)
+    assert query[12:] == b'\x07example\x03com\x00' + struct.pack('!HH', QTYPE_A, QCLASS_IN)
+
+
+def test_randomize_case_keeps_name():
+    qname = encode_name('abcdefghijklmnopqrstuvwxyz.example.com')
+    mixed = {randomize_case(qname) for _ in range(20)}
+    assert all(name.lower() == qname for name in mixed)
+    assert len(mixed) > 1
+
+
+def test_parse_cname_chain():
+    query = build_query(1, encode_name('www.example.com'), QTYPE_A)
+    # www.example.com CNAME cdn.example.net, cdn.example.net CNAME edge.example.net, две A-записи
+    cdn = b'\x03cdn\x07example\x03net\x00'
+    answers = (
+        b'\xc0\x0c' + struct.pack('!HHIH', QTYPE_CNAME, QCLASS_IN, 3600, len(cdn)) + cdn
+        + b'\xc0\x2d' + struct.pack('!HHIH', QTYPE_CNAME, QCLASS_IN, 600, 7) + b'\x04edge\xc0\x31'
+        + a_record('192.0.2.1', ttl=120, name=b'\xc0\x4a')
+        + a_record('192.0.2.2', ttl=60, name=b'\xc0\x4a')
+    )
+    rcode, ips, ttl = parse_response(response(query, answers, ancount=4), QTYPE_A)
+    assert (rcode, ips, ttl) == (0, ['192.0.2.1', '192.0.2.2'], 60)
+
+
+def test_parse_nxdomain():
+    query = build_query(1, encode_name('missing.example'), QTYPE_A)
+    assert parse_response(response(query, rcode=3), QTYPE_A) == (3, [], None)
+
+
+def test_truncated_flag():
+    query = build_query(1, encode_name('example.com'), QTYPE_A)
+    assert is_truncated(response(query, truncated=True))
+    assert not is_truncated(response(query))
+
+
+def test_protocol_checks_question_case():
+    async def check():
+        protocol = DNSProtocol()
+        qname = b'\x07ExAmPlE\x03cOm\x00'
+        question = qname + struct.pack('!HH', QTYPE_A, QCLASS_IN)
+        future = asyncio.get_running_loop().create_future()
+        protocol.pending[7] = (question, future)
+        # Сервер вернул вопрос в другом регистре: ответ не принимается
+        protocol.datagram_received(response(build_query(7, qname.lower(), QTYPE_A)), None)
+        assert not future.done()
+        assert not protocol.preserves_case
+        protocol.datagram_received(response(build_query(7, qname, QTYPE_A)), None)
+        assert future.done()
+
+    asyncio.run(check())
+
+
+def test_resolve_statuses(stub_dns):
+    def answer(query, transport):
+        _, domain = question_of(query)
+        if domain == 'live.test':
+            return response(query, a_record('127.0.0.2'), ancount=1)
+        if domain == 'empty.test':
+            return response(query)
+        if domain == 'broken.test':
+            return response(query, rcode=2)
+        return response(query, rcode=3)
+
+    server = stub_dns(answer)
+    results = resolve(server, ['live.test', 'empty.test', 'broken.test', 'missing.test', 'bad..name'])
+    assert {domain: result['status'] for domain, result in results.items()} == {
+        'live.test': 'ok', 'empty.test': 'nodata', 'broken.test': 'servfail',
+        'missing.test': 'nxdomain', 'bad..name': 'invalid'
+    }
+    assert results['live.test']['ips'] == ['127.0.0.2']
+    assert results['live.test']['ttl'] == 300
+
+
+def test_truncated_answer_retried_over_tcp(stub_dns):
+    def answer(query, transport):
+        if transport == 'udp':
+            return response(query, truncated=True)
+        return response(query, a_record('127.0.0.3'), ancount=1)
+
+    server = stub_dns(answer)
+    result = resolve(server, ['big.test'])['big.test']
+    assert (result['status'], result['ips']) == ('ok', ['127.0.0.3'])
+    assert [transport for transport, _ in server.queries] == ['udp', 'tcp']
+
+
+def test_lost_query_is_retried(stub_dns):
+    def answer(query, transport):
+        # Первый запрос каждого домена теряется
+        _, domain = question_of(query)
+        if sum(1 for _, seen in server.queries if question_of(seen)[1] == domain) == 1:
+            return None
+        return response(query, a_record('127.0.0.4'), ancount=1)
+
+    server = stub_dns(answer)
+    assert resolve(server, ['retry.test'], retries=1)['retry.test']['status'] == 'ok'
+    assert resolve(server, ['once.test'], retries=0)['once.test']['status'] == 'timeout'
+
+
+def test_system_nameservers(tmp_path):
+    path = tmp_path / 'resolv.conf'
+    path.write_text('# comment\nnameserver 192.0.2.53\nnameserver fe80::1%eth0\nsearch example\n')
+    assert system_nameservers(str(path)) == [('192.0.2.53', 53), ('fe80::1', 53)]
+    assert system_nameservers(str(tmp_path / 'missing.conf')) == []
+
+
+def test_getaddrinfo_without_nameservers(monkeypatch):
+    monkeypatch.setattr(dns_resolver, 'system_nameservers', lambda: [])
+    resolver = AsyncDNSResolver(timeout=2.0)
+    results = resolver.resolve_many(['localhost', 'bad..name'])
+    assert results['localhost']['status'] == 'ok'
+    assert '127.0.0.1' in results['localhost']['ips']
+    assert results['bad..name']['status'] == 'invalid'
@@ -0,0 +1,47 @@
+from extractor import StreamingEmailExtractor, extract_emails
+
+PAGE = (
+    '<html><body><p>Пишите: <a href="mailto:info@example.com">info@example.com</a>, '
+    'отдел продаж sales.team+ru@shop.example.org.</p>'
+    '<img src="logo@2x.png"><footer>support@example.net</footer></body></html>'
+).encode('utf-8')
+
+
+def stream_emails(chunks, **options):
+    extractor = StreamingEmailExtractor(**options)
+    for chunk in chunks:
+        if extractor.feed(chunk):
+            break
+    return sorted(extractor.finish())
+
+
+def test_every_chunk_boundary():
+    expected = sorted(extract_emails(PAGE))
+    assert expected == ['info@example.com', 'sales.team+ru@shop.example.org', 'support@example.net']
+    # Граница частей в каждой позиции страницы, в том числе внутри адресов
+    for split in range(1, len(PAGE)):
+        assert stream_emails([PAGE[:split], PAGE[split:]]) == expected, split
+
+
+def test_byte_by_byte():
+    assert stream_emails([PAGE[i:i + 1] for i in range(len(PAGE))]) == sorted(extract_emails(PAGE))
+
+
+def test_utf16_boundaries():
+    page = PAGE.decode('utf-8').encode('utf-16')
+    # BOM приходит в первой части
+    for split in range(2, len(page), 7):
+        assert stream_emails([page[:split], page[split:]]) == sorted(extract_emails(PAGE)), split
+
+
+def test_long_token_is_skipped():
+    # Слишком длинная последовательность символов адреса не должна давать ложных адресов из хвоста
+    page = b'a' * 5000 + b'@example.com real@example.com'
+    assert stream_emails([page[i:i + 100] for i in range(0, len(page), 100)]) == ['real@example.com']
+
+
+def test_stop_policies():
+    extractor = StreamingEmailExtractor(max_emails=1)
+    assert extractor.feed(PAGE[:90])
+    assert extractor.emails == ['info@example.com']
+    assert stream_emails([PAGE[:200], PAGE[200:]], stop_at_footer=True) == sorted(extract_emails(PAGE))
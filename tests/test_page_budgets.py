@@ -0,0 +1,100 @@
+import http.server
+import threading
+import time
+
+import pytest
+
+from mass_scanner import MassWebsiteEmailScanner
+
+FIRST = b'<p>info@example.com</p>'
+LAST = b'<p>late@example.com</p>'
+
+
+class PageHandler(http.server.BaseHTTPRequestHandler):
+    """/big - 2 МБ с Content-Length, /slow - части раз в 0.1 с, /logo.png - картинка"""
+
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        if self.path == '/slow':
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html')
+            self.send_header('Transfer-Encoding', 'chunked')
+            self.end_headers()
+            try:
+                for part in [FIRST] + [b' ' * 100] * 20 + [LAST]:
+                    self.wfile.write(b'%x\r\n%s\r\n' % (len(part), part))
+                    self.wfile.flush()
+                    time.sleep(0.1)
+                self.wfile.write(b'0\r\n\r\n')
+            except OSError:
+                pass
+            return
+        if self.path == '/logo.png':
+            body, content_type = b'\x89PNG' * 1000, 'image/png'
+        else:
+            body, content_type = FIRST + b' ' * 2000000 + LAST, 'text/html; charset=utf-8'
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except OSError:
+            pass
+
+    def log_message(self, *args):
+        pass
+
+
+class PageServer(http.server.ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Сканер закрывает соединение, не дочитав тело: так и задумано
+        pass
+
+
+@pytest.fixture
+def scanner(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    server = PageServer(('127.0.0.1', 0), PageHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    scanner = MassWebsiteEmailScanner(state_dir=str(tmp_path / 'scan_state'))
+    scanner.base_url = f'http://127.0.0.1:{server.server_address[1]}'
+    yield scanner
+    scanner.close_state()
+    server.shutdown()
+    server.server_close()
+
+
+def scan_page(scanner, path):
+    response = scanner.session_pool.get(scanner.base_url + path, stream=True, timeout=5)
+    result = scanner.new_site_result('127.0.0.1')
+    return scanner.scan_response_body(response, result), result
+
+
+def test_byte_budget(scanner):
+    scanner.max_page_bytes = 100000
+    emails, result = scan_page(scanner, '/big')
+    assert emails == ['info@example.com']
+    # Скачано около бюджета, остальное тело учтено как сэкономленное
+    assert 100000 <= result['bytes'] < 300000
+    stats = scanner.stats.snapshot()
+    assert stats['bytes_downloaded'] == result['bytes']
+    assert stats['bytes_saved'] == len(FIRST) + 2000000 + len(LAST) - result['bytes']
+
+
+def test_time_budget(scanner):
+    scanner.max_page_seconds = 0.3
+    started = time.monotonic()
+    emails, result = scan_page(scanner, '/slow')
+    assert time.monotonic() - started < 1.5
+    assert emails == ['info@example.com']
+
+
+def test_non_text_body_is_not_downloaded(scanner):
+    emails, result = scan_page(scanner, '/logo.png')
+    assert emails is None and result['bytes'] == 0
+    assert scanner.stats['non_text_skipped'] == 1
+    assert scanner.stats['bytes_saved'] == 4000
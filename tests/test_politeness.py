@@ -0,0 +1,65 @@
+from politeness import PolitenessScheduler, robots_crawl_delay, robots_verdict
+
+ROBOTS = '''
+User-agent: EmailBot
+User-agent: OtherBot
+Disallow: /private
+Crawl-delay: 0.5
+
+User-agent: *
+Disallow: /
+Crawl-delay: 2  # секунды
+'''
+
+
+def test_fractional_crawl_delay_of_matching_group():
+    assert robots_crawl_delay(ROBOTS, 'EmailBot/1.0') == 0.5
+    assert robots_crawl_delay(ROBOTS, 'otherbot') == 0.5
+    assert robots_crawl_delay(ROBOTS, 'SomeBot') == 2.0
+    # Без Crawl-delay в выбранной группе значение других групп не берётся
+    assert robots_crawl_delay('User-agent: EmailBot\nDisallow:\n\nUser-agent: *\nCrawl-delay: 3', 'EmailBot') is None
+    assert robots_crawl_delay('User-agent: *\nCrawl-delay: soon\nCrawl-delay: 1.5', '*') == 1.5
+    assert robots_crawl_delay('Crawl-delay: 1', '*') is None
+
+
+def test_robots_verdict():
+    assert robots_verdict(200, ROBOTS, 'EmailBot') == (True, 0.5)
+    assert robots_verdict(200, ROBOTS, '*') == (False, 2.0)
+    assert robots_verdict(200, 'User-agent: *\nCrawl-delay: 0', '*') == (True, None)
+    assert robots_verdict(404, '', '*') == (True, None)
+    assert robots_verdict(503, '', '*') == (False, None)
+    assert robots_verdict(None, '', '*') == (True, None)
+
+
+def test_group_limit():
+    scheduler = PolitenessScheduler(per_host=1, per_ip=2, per_group=3)
+    assert scheduler.submit('a.test', 'a.test', '10.0.0.1')
+    assert scheduler.submit('b.test', 'b.test', '10.0.0.1')
+    # Третий сайт на том же IP ждёт освобождения IP
+    assert not scheduler.submit('c.test', 'c.test', '10.0.0.1')
+    assert scheduler.submit('d.test', 'd.test', '10.0.0.2')
+    # Соседний адрес той же сети /24 ждёт освобождения группы, другая сеть - нет
+    assert not scheduler.submit('e.test', 'e.test', '10.0.0.3')
+    assert scheduler.submit('f.test', 'f.test', '10.0.1.5')
+    assert scheduler.pending() == 2
+
+    scheduler.release('d.test')
+    assert scheduler.pop_ready() == ['e.test']
+    scheduler.release('a.test')
+    assert scheduler.pop_ready() == ['c.test']
+    assert scheduler.pending() == 0
+
+
+def test_uniform_group_goes_last():
+    scheduler = PolitenessScheduler(per_ip=10, per_group=10, sample_size=2)
+    for key in ('a.test', 'b.test'):
+        assert scheduler.submit(key, key, '10.0.0.1')
+        assert scheduler.fingerprint(key) is not None
+    assert scheduler.record_sample('a.test', b'parked') is None
+    # Одинаковые страницы всех образцов: группа признана однородной
+    assert scheduler.record_sample('b.test', b'parked') == '10.0.0.0/24'
+    assert not scheduler.submit('c.test', 'c.test', '10.0.0.7')
+    assert scheduler.submit('other.test', 'other.test', '10.0.1.1')
+    # Сайты группы загружаются, только когда других сайтов нет
+    assert scheduler.pop_ready() == []
+    assert scheduler.pop_ready(drained=True) == ['c.test']
@@ -0,0 +1,57 @@
+import sqlite3
+import threading
+import time
+
+from result_store import ResultStore
+
+
+def site(domain, emails, status='success'):
+    return {'domain': domain, 'status': status, 'final_url': f'https://{domain}/', 'emails': emails}
+
+
+def test_emails_are_unique_per_site(tmp_path):
+    store = ResultStore(str(tmp_path / 'results.sqlite'))
+    store.add(site('a.test', ['info@a.test', 'info@a.test', 'sales@a.test']))
+    # Повторное сканирование - новая запись о сайте со своими email
+    store.add(site('a.test', ['info@a.test']))
+    assert store.query('SELECT site_id, email FROM emails ORDER BY site_id, email') == [
+        (1, 'info@a.test'), (1, 'sales@a.test'), (2, 'info@a.test')
+    ]
+    assert store.email_sources('info@a.test') == [('a.test', 'https://a.test/')]
+    assert store.close(timeout=5)
+
+
+def test_old_database_is_deduplicated(tmp_path):
+    path = str(tmp_path / 'results.sqlite')
+    connection = sqlite3.connect(path)
+    connection.execute('CREATE TABLE emails (email TEXT NOT NULL, site_id INTEGER NOT NULL, domain TEXT NOT NULL)')
+    connection.executemany('INSERT INTO emails VALUES (?, ?, ?)', [('info@a.test', 1, 'a.test')] * 3)
+    connection.commit()
+    connection.close()
+
+    store = ResultStore(path)
+    assert store.query('SELECT email, site_id FROM emails') == [('info@a.test', 1)]
+
+
+class SlowStore(ResultStore):
+    """Хранилище, поток записи которого ждёт разрешения перед каждой порцией"""
+
+    def __init__(self, path):
+        super().__init__(path)
+        self.allowed = threading.Event()
+
+    def write_batch(self, connection, batch):
+        self.allowed.wait(10)
+        super().write_batch(connection, batch)
+
+
+def test_query_waits_for_writes_at_most_timeout(tmp_path):
+    store = SlowStore(str(tmp_path / 'results.sqlite'))
+    store.add(site('a.test', []))
+    started = time.monotonic()
+    # Выборка по уже записанному, не дольше timeout
+    assert store.query('SELECT domain FROM sites', timeout=0.2) == []
+    assert time.monotonic() - started < 5
+    store.allowed.set()
+    assert store.query('SELECT domain FROM sites') == [('a.test',)]
+    assert store.close(timeout=5)
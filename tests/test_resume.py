@@ -0,0 +1,72 @@
+import pytest
+
+from mass_scanner import MassWebsiteEmailScanner
+
+DOMAINS = [f'site{i}.test' for i in range(6)]
+
+
+@pytest.fixture
+def open_scanner(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    scanners = []
+
+    def open_scanner(**options):
+        scanner = MassWebsiteEmailScanner(state_dir=str(tmp_path / 'scan_state'), **options)
+        scanners.append(scanner)
+        return scanner
+
+    yield open_scanner
+    for scanner in scanners:
+        scanner.close_state()
+
+
+def scan(scanner, domain, status):
+    result = scanner.new_site_result(domain)
+    if status == 'success':
+        scanner.record_page_emails(domain, f'https://{domain}/', [f'info@{domain}'], result)
+    else:
+        result['status'] = status
+        scanner.record_site_failure(result)
+
+
+def test_stop_mid_batch_is_not_counted_twice(open_scanner):
+    scanner = open_scanner()
+    scanner.start_campaign(len(DOMAINS), None)
+    scanner.frontier.push_many(DOMAINS)
+    batch = scanner.frontier.pop_many(len(DOMAINS))
+    scan(scanner, batch[0], 'success')
+    scan(scanner, batch[1], 'http_error')
+    # Остановка: загрузки остальных сайтов обрываются
+    scanner.stop_event.set()
+    for domain in batch[2:]:
+        scan(scanner, domain, 'failed')
+    # Окончательный статус, полученный уже после остановки, учитывается
+    scan(scanner, batch[2], 'no_emails')
+    scanner.save_checkpoint()
+    assert scanner.stats['sites_processed'] == 3
+    scanner.close_state()
+
+    scanner = open_scanner()
+    assert scanner.restore_checkpoint()
+    assert (scanner.stats['sites_processed'], scanner.stats['total_sites_checked']) == (3, 3)
+    remaining = scanner.frontier.pop_many(len(DOMAINS))
+    assert sorted(remaining) == DOMAINS[3:]
+    for domain in remaining:
+        scan(scanner, domain, 'failed')
+    assert scanner.stats['sites_processed'] == len(DOMAINS)
+    assert scanner.stats['fetch_errors'] == 3
+
+
+def test_unique_emails_counter(open_scanner):
+    scanner = open_scanner(scale_mode=True)
+    scanner.start_campaign(len(DOMAINS), None)
+    scan(scanner, DOMAINS[0], 'success')
+    scanner.record_page_emails(DOMAINS[1], None, [f'info@{DOMAINS[0]}', f'sales@{DOMAINS[1]}'])
+    assert scanner.stats['unique_emails'] == len(scanner.found_emails) == 2
+    scanner.save_checkpoint()
+    scanner.close_state()
+
+    # В режиме масштаба email на диске: после продолжения счётчик совпадает с ними
+    scanner = open_scanner(scale_mode=True)
+    assert scanner.restore_checkpoint()
+    assert scanner.stats['unique_emails'] == len(scanner.found_emails) == 2
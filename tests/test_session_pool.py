@@ -0,0 +1,67 @@
+import http.server
+import threading
+
+import pytest
+import requests
+
+from session_pool import CountingHTTPAdapter, SessionPool
+
+
+class KeepAliveHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        body = self.headers['Host'].encode()
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def port():
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), KeepAliveHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server.server_address[1]
+    server.shutdown()
+    server.server_close()
+
+
+def test_workers_share_connections(port):
+    # Имя без DNS-записи: подключение - к адресу из resolved_ips, Host - имя сайта
+    pool = SessionPool(4, resolved_ips={'site.test': ['127.0.0.1']})
+    sessions = []
+
+    def worker():
+        sessions.append(pool.session())
+        for _ in range(5):
+            response = pool.get(f'http://site.test:{port}/')
+            assert response.text == f'site.test:{port}'
+
+    workers = [threading.Thread(target=worker) for _ in range(2)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    # У потоков свои сессии, соединения - из общего пула
+    assert len({id(session) for session in sessions}) == 2
+    hits, misses = pool.pool_counters()
+    assert hits + misses == 10
+    assert 1 <= misses <= 2
+    pool.close()
+
+
+def test_counters_survive_pool_eviction(port):
+    adapter = CountingHTTPAdapter(pool_connections=1, pool_maxsize=1)
+    session = requests.Session()
+    session.mount('http://', adapter)
+    for host in ('127.0.0.1', 'localhost', '127.0.0.1'):
+        for _ in range(3):
+            session.get(f'http://{host}:{port}/')
+    # Пул каждого хоста вытесняется следующим: его счётчики остаются в итогах
+    assert adapter.pool_counters() == (6, 3)
+    adapter.close()
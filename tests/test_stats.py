@@ -0,0 +1,56 @@
+import threading
+
+from stats import ScanStats
+
+
+def new_stats():
+    return ScanStats(
+        counters={'sites_processed': 0, 'sites_with_emails': 0, 'hits': 0, 'misses': 0},
+        gauges={'start_time': '2026-01-01T00:00:00', 'first_email_seconds': None},
+        derived={'hit_rate': lambda values: values['hits'] / max(1, values['hits'] + values['misses'])}
+    )
+
+
+def test_snapshot_sees_update_as_a_whole():
+    stats = new_stats()
+    finished = threading.Event()
+    torn = []
+
+    def reader():
+        while not finished.is_set():
+            values = stats.snapshot()
+            if values['sites_with_emails'] != values['sites_processed']:
+                torn.append(values)
+
+    def writer():
+        for _ in range(20000):
+            stats.update({'sites_processed': 1, 'sites_with_emails': 1})
+
+    watcher = threading.Thread(target=reader)
+    watcher.start()
+    workers = [threading.Thread(target=writer) for _ in range(8)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    finished.set()
+    watcher.join()
+    assert torn == []
+    assert stats['sites_processed'] == 8 * 20000
+
+
+def test_gauges_derived_and_load():
+    stats = new_stats()
+    stats.update({'hits': 3, 'misses': 1})
+    stats.add('new_counter')
+    assert stats['hit_rate'] == 0.75 and stats['new_counter'] == 1
+    assert stats.set_once('first_email_seconds', 1.5)
+    assert not stats.set_once('first_email_seconds', 9.0)
+    saved = stats.snapshot()
+
+    # Продолжение сканирования: счётчики и показатели из снимка, derived пересчитывается
+    resumed = new_stats()
+    resumed.load(saved)
+    resumed.add('hits')
+    assert resumed.snapshot() == dict(saved, hits=4, hit_rate=0.8)
+    assert resumed.get('missing') is None
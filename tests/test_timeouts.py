@@ -0,0 +1,45 @@
+from timeouts import AdaptiveTimeouts
+
+
+def observe(timeouts, phase, values):
+    for seconds in values:
+        timeouts.observe(phase, seconds)
+
+
+def test_p90_times_three_within_floor_and_limit():
+    timeouts = AdaptiveTimeouts(min_samples=50)
+    # Пока замеров мало - прежний предел
+    observe(timeouts, 'first_byte', [0.1] * 40)
+    assert timeouts.get('first_byte') == 8.0
+    # 90-й процентиль 1.0 с, таймаут - втрое больше; медленный хвост не выше процентиля
+    observe(timeouts, 'first_byte', [0.5] * 50 + [1.0] * 5 + [30.0] * 5)
+    assert timeouts.get('first_byte') == 3.0
+    # Снизу - floors, сверху - limits
+    observe(timeouts, 'connect', [0.05] * 100)
+    assert timeouts.get('connect') == 1.5
+    observe(timeouts, 'total', [10.0] * 100)
+    assert timeouts.get('total') == 15.0
+
+
+def test_expired_share_doubles_timeout():
+    timeouts = AdaptiveTimeouts(min_samples=20)
+    observe(timeouts, 'first_byte', [1.0] * 40)
+    assert timeouts.get('first_byte') == 3.0
+    for _ in range(20):
+        timeouts.expired('first_byte')
+    assert timeouts.get('first_byte') == 6.0
+    assert timeouts.expired_counts['first_byte'] == 20
+
+
+def test_overrides_and_handshake_limit():
+    timeouts = AdaptiveTimeouts()
+    # Подключение вместе с TLS - не дольше прежнего общего таймаута; для http - без TLS
+    assert timeouts.requests_timeout() == (8.0, 8.0)
+    observe(timeouts, 'connect', [1.0] * 60)
+    assert timeouts.requests_timeout('http://site.test/') == (3.0, 8.0)
+    timeouts.set_override('connect', 5)
+    timeouts.set_override('tls', 6)
+    assert timeouts.handshake() == 11.0
+    assert timeouts.requests_timeout(adaptive=False) == (11.0, 8.0)
+    timeouts.set_override('connect', None)
+    assert timeouts.get('connect') == 3.0